@@ -0,0 +1,374 @@
+import datetime
+import decimal
+import itertools
+import json
+import os
+import sys
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterable, Iterator, Sequence
+
+from sqlalchemy import Column
+from sqlalchemy import types as sqltypes
+
+from db_utils.enums import OutputFormat
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(
+            "Arrow and Parquet output require pyarrow: pip install 'db_utils[arrow]'"
+        )
+    return pyarrow
+
+
+def arrow_type_from_sqla(sqla_type: sqltypes.TypeEngine) -> "pa.DataType":
+    """Map a SQLAlchemy type, dialect specific or generic, to an Arrow type."""
+    pa = import_pyarrow()
+    try:
+        generic_type = sqla_type.as_generic()
+    except NotImplementedError:
+        return pa.string()
+    match generic_type:
+        case sqltypes.Boolean():
+            return pa.bool_()
+        case sqltypes.SmallInteger():
+            return pa.int16()
+        case sqltypes.BigInteger():
+            return pa.int64()
+        case sqltypes.Integer():
+            return pa.int64()
+        case sqltypes.Float():
+            return pa.float64()
+        case sqltypes.Numeric(precision=int(precision), scale=scale) if (
+            generic_type.asdecimal and precision <= 38
+        ):
+            return pa.decimal128(precision, scale or 0)
+        case sqltypes.Numeric():
+            return pa.float64()
+        case sqltypes.DateTime(timezone=True):
+            return pa.timestamp("us", tz="UTC")
+        case sqltypes.DateTime():
+            return pa.timestamp("us")
+        case sqltypes.Date():
+            return pa.date32()
+        case sqltypes.Time():
+            return pa.time64("us")
+        case sqltypes.Interval():
+            return pa.duration("us")
+        case sqltypes.LargeBinary() | sqltypes.BINARY() | sqltypes.VARBINARY():
+            return pa.binary()
+    return pa.string()
+
+
+def arrow_schema_from_columns(columns: Iterable[Column]) -> "pa.Schema":
+    """Get the Arrow schema for reflected table columns."""
+    pa = import_pyarrow()
+    return pa.schema(
+        [
+            pa.field(column.name, arrow_type_from_sqla(column.type), column.nullable)
+            for column in columns
+        ]
+    )
+
+
+# Postgres type OIDs of the cursor description, psycopg2 and psycopg, with
+# the pyarrow type factory and its arguments
+POSTGRES_OID_ARROW_TYPES: dict[int, tuple[str, ...]] = {
+    16: ("bool_",),
+    17: ("binary",),
+    20: ("int64",),
+    21: ("int16",),
+    23: ("int32",),
+    700: ("float32",),
+    701: ("float64",),
+    1082: ("date32",),
+    1083: ("time64", "us"),
+    1114: ("timestamp", "us"),
+    1184: ("timestamp", "us", "UTC"),
+    # text, varchar, char, json, jsonb and uuid
+    25: ("string",),
+    1042: ("string",),
+    1043: ("string",),
+    114: ("string",),
+    3802: ("string",),
+    2950: ("string",),
+}
+
+
+def _arrow_type_from_type_code(
+    type_code: Any, precision: Any, scale: Any
+) -> "pa.DataType | None":
+    """Map the type code of a cursor description column to an Arrow type.
+
+    pyodbc describes columns with Python types and the Postgres drivers with
+    type OIDs. Returns None for type codes without a known mapping.
+    """
+    pa = import_pyarrow()
+    match type_code:
+        case int() if type_code in POSTGRES_OID_ARROW_TYPES:
+            factory, *args = POSTGRES_OID_ARROW_TYPES[type_code]
+            return getattr(pa, factory)(*args)
+        case 1700:
+            # numeric, precision and scale are only known for typed columns
+            if isinstance(precision, int) and 0 < precision <= 38:
+                return pa.decimal128(precision, scale or 0)
+            return pa.float64()
+        case type() if issubclass(type_code, bool):
+            return pa.bool_()
+        case type() if issubclass(type_code, int):
+            return pa.int64()
+        case type() if issubclass(type_code, float):
+            return pa.float64()
+        case type() if issubclass(type_code, decimal.Decimal):
+            if isinstance(precision, int) and 0 < precision <= 38:
+                return pa.decimal128(precision, scale or 0)
+            return pa.float64()
+        case type() if issubclass(type_code, datetime.datetime):
+            return pa.timestamp("us")
+        case type() if issubclass(type_code, datetime.date):
+            return pa.date32()
+        case type() if issubclass(type_code, datetime.time):
+            return pa.time64("us")
+        case type() if issubclass(type_code, (bytes, bytearray)):
+            return pa.binary()
+        case type() if issubclass(type_code, str):
+            return pa.string()
+    return None
+
+
+def arrow_schema_from_description(
+    columns: Sequence[str], description: Sequence[Sequence[Any]] | None
+) -> "pa.Schema | None":
+    """Get the Arrow schema of a query from its cursor description.
+
+    Columns whose type is not known from the description have a null type,
+    to be inferred from the values. Returns None without a description or
+    when no column type is known.
+    """
+    if not description:
+        return None
+    pa = import_pyarrow()
+    fields = []
+    for name, column_description in zip(columns, description):
+        # (name, type_code, display_size, internal_size, precision, scale, ...)
+        _, type_code, _, _, precision, scale, *_ = column_description
+        arrow_type = _arrow_type_from_type_code(type_code, precision, scale)
+        fields.append(pa.field(name, arrow_type or pa.null()))
+    if all(pa.types.is_null(f.type) for f in fields):
+        return None
+    return pa.schema(fields)
+
+
+def _to_string(value: Any) -> str | None:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _prepare_values(values: Sequence[Any], arrow_type: "pa.DataType") -> Sequence[Any]:
+    """Convert values Arrow can not convert by itself to the target type."""
+    pa = import_pyarrow()
+    if pa.types.is_string(arrow_type):
+        return [_to_string(v) for v in values]
+    if pa.types.is_floating(arrow_type):
+        return [float(v) if isinstance(v, decimal.Decimal) else v for v in values]
+    if pa.types.is_integer(arrow_type):
+        # pyarrow truncates floats converted to integers
+        for v in values:
+            if isinstance(v, (float, decimal.Decimal)):
+                raise pa.ArrowInvalid(f"Value {v} is not an integer")
+    return values
+
+
+def _infer_schema(
+    columns: Sequence[str],
+    batch: Sequence[Sequence[Any]],
+    schema: "pa.Schema | None",
+) -> tuple["pa.Schema", set[str]]:
+    """Fill the unknown types of a schema from the values of a batch.
+
+    Columns with only nulls in the batch are strings. Returns the schema and
+    the names of the inferred columns.
+    """
+    pa = import_pyarrow()
+    inferred_batch = pa.RecordBatch.from_pylist(
+        [dict(zip(columns, row)) for row in batch]
+    )
+    fields = []
+    inferred = set()
+    for index, name in enumerate(columns):
+        arrow_type = schema.field(index).type if schema is not None else pa.null()
+        if pa.types.is_null(arrow_type):
+            inferred.add(name)
+            if batch:
+                arrow_type = inferred_batch.schema.field(name).type
+            if pa.types.is_null(arrow_type):
+                arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields), inferred
+
+
+def _convert_error_types() -> tuple[type[Exception], ...]:
+    pa = import_pyarrow()
+    return (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError)
+
+
+def _widen_schema(
+    schema: "pa.Schema", batch: Sequence[Sequence[Any]], inferred: set[str]
+) -> "pa.Schema":
+    """Widen the inferred column types that can not hold the values of a batch.
+
+    Integers widen to floats and other types to strings.
+
+    Raises:
+        ValueError: if a column of a known type can not hold the values.
+    """
+    pa = import_pyarrow()
+    fields = list(schema)
+    for index, (values, field) in enumerate(zip(zip(*batch), schema)):
+        try:
+            pa.array(_prepare_values(values, field.type), type=field.type)
+            continue
+        except _convert_error_types() as e:
+            if field.name not in inferred:
+                raise ValueError(
+                    f"Column '{field.name}' does not hold {field.type} values: {e}"
+                )
+        widened = pa.string()
+        if pa.types.is_integer(field.type) and all(
+            v is None or isinstance(v, (int, float, decimal.Decimal)) for v in values
+        ):
+            widened = pa.float64()
+        fields[index] = pa.field(field.name, widened)
+    return pa.schema(fields)
+
+
+def _to_record_batch(
+    batch: Sequence[Sequence[Any]], schema: "pa.Schema"
+) -> "pa.RecordBatch":
+    pa = import_pyarrow()
+    arrays = [
+        pa.array(_prepare_values(values, field.type), type=field.type)
+        for values, field in zip(zip(*batch), schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _first_batch(
+    batches: Iterable[Sequence[Sequence[Any]]],
+) -> tuple[Sequence[Sequence[Any]], Iterator[Sequence[Sequence[Any]]]]:
+    batches = iter(batches)
+    return next(batches, []), batches
+
+
+def write_parquet(
+    columns: Sequence[str],
+    batches: Iterable[Sequence[Sequence[Any]]],
+    path: str,
+    schema: "pa.Schema | None" = None,
+    compression: str = "zstd",
+) -> int:
+    """Write row batches to a compressed Parquet file. Return the row count.
+
+    Column types missing from `schema` are inferred from the first batch.
+    When a later batch does not fit an inferred type, the type is widened and
+    the rows written so far are rewritten with the wider schema.
+    """
+    import_pyarrow()
+    import pyarrow.parquet as pq
+
+    first_batch, batches = _first_batch(batches)
+    schema, inferred = _infer_schema(columns, first_batch, schema)
+    row_count = 0
+    writer = pq.ParquetWriter(path, schema, compression=compression)
+    try:
+        for batch in itertools.chain([first_batch] if first_batch else [], batches):
+            try:
+                record_batch = _to_record_batch(batch, schema)
+            except _convert_error_types():
+                schema = _widen_schema(schema, batch, inferred)
+                writer.close()
+                writer = _rewrite_parquet(path, schema, compression)
+                record_batch = _to_record_batch(batch, schema)
+            writer.write_batch(record_batch)
+            row_count += record_batch.num_rows
+    finally:
+        writer.close()
+    return row_count
+
+
+def _rewrite_parquet(
+    path: str, schema: "pa.Schema", compression: str
+) -> "pq.ParquetWriter":
+    """Rewrite a Parquet file with a wider schema, returning an open writer."""
+    import pyarrow.parquet as pq
+
+    previous_path = f"{path}.previous"
+    os.replace(path, previous_path)
+    writer = pq.ParquetWriter(path, schema, compression=compression)
+    try:
+        for record_batch in pq.ParquetFile(previous_path).iter_batches():
+            writer.write_batch(record_batch.cast(schema))
+    except BaseException:
+        writer.close()
+        raise
+    os.remove(previous_path)
+    return writer
+
+
+def write_arrow_stream(
+    columns: Sequence[str],
+    batches: Iterable[Sequence[Sequence[Any]]],
+    file: "str | BinaryIO | None" = None,
+    schema: "pa.Schema | None" = None,
+    compression: str = "zstd",
+) -> int:
+    """Write row batches in the Arrow IPC stream format. Return the row count.
+
+    Column types missing from `schema` are inferred from the first batch.
+
+    Raises:
+        ValueError: if a later batch does not fit an inferred type, as the
+            batches already written can not be rewritten.
+    """
+    pa = import_pyarrow()
+    first_batch, batches = _first_batch(batches)
+    schema, _ = _infer_schema(columns, first_batch, schema)
+    row_count = 0
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_stream(
+        file or sys.stdout.buffer, schema, options=options
+    ) as writer:
+        for batch in itertools.chain([first_batch] if first_batch else [], batches):
+            try:
+                record_batch = _to_record_batch(batch, schema)
+            except _convert_error_types() as e:
+                raise ValueError(
+                    f"Values after row {row_count} do not fit the schema inferred "
+                    f"from the first rows, use Parquet output: {e}"
+                )
+            writer.write_batch(record_batch)
+            row_count += record_batch.num_rows
+    return row_count
+
+
+def write_arrow_output(
+    output: OutputFormat,
+    columns: Sequence[str],
+    batches: Iterable[Sequence[Sequence[Any]]],
+    output_file: str | None = None,
+    schema: "pa.Schema | None" = None,
+) -> int:
+    """Write row batches in a binary Arrow output format."""
+    if output == OutputFormat.PARQUET:
+        if not output_file:
+            raise ValueError("Parquet output requires an output file")
+        return write_parquet(columns, batches, output_file, schema)
+    return write_arrow_stream(columns, batches, output_file, schema)
@@ -1,16 +1,14 @@
 import os
-import subprocess
-from typing import List
+import pathlib
+from typing import Annotated, List, Optional
 
 import typer
-from sqlalchemy import MetaData, Table, create_engine
 
+from db_utils.cli_utils import typer_error_msg_to_stdout
 from db_utils.config import db_url_default_key_name
+from db_utils.enums import LoadFileFormat
 from db_utils.utils import autocomplete_tables
 
-from .ddl_generator import generate_table_ddl_string
-from .pydantic_basemodel_generator import main as pydantic_models_autogen
-
 app = typer.Typer()
 
 
@@ -23,79 +21,234 @@ def callback():
 
 @app.command("models")
 def autogen_database_models(
-    schema: str = typer.Option(None, "--schema", "-s"),
+    schemas: list[str] = typer.Option(
+        None, "--schema", "-s", help="Schemas to generate models for, a file each."
+    ),
     tables: list[str] = typer.Option(
         None,
         "--tables",
         "-t",
         autocompletion=autocomplete_tables,
-        help="Tables to generate models for.",
+        help="Tables to generate models for, as schema.table for a single schema.",
     ),
     output: str = typer.Option(
         "model", "--output", "-o", help="Generate SQLAlchemy code as table or model"
     ),
     output_filename: str = typer.Option("autogen_models.py", "--output-file", "-f"),
+    jobs: int = typer.Option(
+        1, "--jobs", "-j", help="Schemas generated in parallel processes."
+    ),
 ):
     """
     Autogenerate models from database to file.
     """
-    db_url = os.environ[db_url_default_key_name]
+    from sqlalchemy import create_engine
+
+    from .model_generator import GENERATOR_NAMES, generate_models
 
-    cmd = [
-        "sqlacodegen",
-    ]
-    if schema:
-        cmd += ["--schema", schema]
-        output_filename = f"{schema}_{output_filename}"
-    # export db tables as tables and not models
-    if output == "table":
-        cmd += ["--generator", "tables"]
-    if tables:
-        for table in tables:
-            cmd += ["--tables", table]
-        # cmd += ["--tables"]
-        # cmd += tables
-    cmd += [db_url, "--outfile", output_filename]
-    # with Progress(
-    #     SpinnerColumn(),
-    #     TextColumn("[bold blue]{task.description}"),
-    #     transient=False,
-    # ) as progress:
-    #     progress.add_task(" ".join(cmd), total=100)
-    # subprocess.run(cmd, check=True)
-    print(" ".join(cmd))
-    subprocess.run(cmd, check=True)
+    if output not in GENERATOR_NAMES:
+        typer_error_msg_to_stdout(f"Output must be one of {', '.join(GENERATOR_NAMES)}")
+    db_url = os.environ[db_url_default_key_name]
+    engine = create_engine(db_url, pool_size=max(jobs, 1), max_overflow=0)
+    try:
+        outfiles = generate_models(
+            engine,
+            list(dict.fromkeys(schemas)) or [None],
+            output_filename,
+            generator_name=GENERATOR_NAMES[output],
+            tables=tables or None,
+            jobs=jobs,
+        )
+    except ValueError as e:
+        typer_error_msg_to_stdout(e)
+    for outfile in outfiles.values():
+        print(outfile)
 
 
 @app.command("pydantic")
 def autogen_models_pydantic(
     schema: str = typer.Option(None, "--schema", "-s"),
     tables: List[str] = typer.Option(None, "--table", "-t"),
+    jobs: int = typer.Option(1, "--jobs", "-j", help="Tables reflected in parallel."),
+    output: str = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="Output module, or package directory with --per-table.",
+    ),
+    per_table: bool = typer.Option(
+        False, "--per-table", help="Write a module per table in a package."
+    ),
+    full: bool = typer.Option(
+        False, "--full", help="Regenerate all the models, ignoring the last run."
+    ),
 ):
     """
-    Create Pydantic models from SQLAlchemy models.
+    Create Pydantic models from database tables.
+
+    Only the tables changed since the last run to the same output are generated.
     """
+    from sqlalchemy import create_engine
+
+    from .pydantic_basemodel_generator import main as pydantic_models_autogen
 
+    if output is None:
+        output = "schemas_autogen" if per_table else "schemas_autogen.py"
     db_url = os.environ[db_url_default_key_name]
-    engine = create_engine(db_url)
-    pydantic_models_autogen(engine, schema, tables)
+    engine = create_engine(db_url, pool_size=max(jobs, 1), max_overflow=0)
+    report = pydantic_models_autogen(
+        engine, schema, tables, jobs, output=output, per_table=per_table, full=full
+    )
+    for table_name in report.generated:
+        print(f"generated {table_name}")
+    for table_name in report.removed:
+        print(f"removed {table_name}")
+    print(
+        f"{len(report.generated)} generated, {len(report.unchanged)} unchanged, "
+        f"{len(report.removed)} removed: {output}"
+    )
 
 
 @app.command("ddl")
 def autogen_ddl_for_table(
     table_names: List[str] = typer.Argument(
-        ..., help="Table name", autocompletion=autocomplete_tables
+        None, help="Table name", autocompletion=autocomplete_tables
     ),
+    schema: Optional[str] = typer.Option(None, "--schema", "-s"),
+    all_tables: bool = typer.Option(
+        False, "--all", "-a", help="DDL of all the tables of the schema."
+    ),
+    jobs: int = typer.Option(1, "--jobs", "-j", help="Tables reflected in parallel."),
 ):
     """Create DDL from table name"""
+    from sqlalchemy import MetaData, create_engine
+
+    from db_utils.catalog.main import reflect_metadata
+
+    from .ddl_generator import generate_table_ddl_string, generate_tables_ddl
 
     db_url = os.environ[db_url_default_key_name]
-    engine = create_engine(db_url)
-    schema = None
+    engine = create_engine(db_url, pool_size=max(jobs, 1), max_overflow=0)
+    if all_tables:
+        # one reflection of the whole schema, in dependency order
+        metadata = reflect_metadata(engine, schema, jobs=jobs)
+        # tables of other schemas referenced by foreign keys are reflected too
+        tables = [t for t in metadata.tables.values() if t.schema == schema]
+        for ddl_string in generate_tables_ddl(tables, engine):
+            print(f"{ddl_string.strip()};\n")
+        return
+    if not table_names:
+        typer_error_msg_to_stdout("Give table names or --all")
+
+    # tables are reflected once per schema
+    tables_by_schema: dict[str | None, list[str]] = {}
+    table_keys = []
     for table_name in table_names:
+        table_schema = schema
         if "." in table_name:
-            schema, table_name = table_name.split(".")
-        metadata = MetaData(schema=schema)
-        table = Table(table_name, metadata, autoload_with=engine)
-        ddl_string = generate_table_ddl_string(table, engine)
+            table_schema, table_name = table_name.split(".")
+        tables_by_schema.setdefault(table_schema, []).append(table_name)
+        table_keys.append(
+            f"{table_schema}.{table_name}" if table_schema else table_name
+        )
+    metadata = MetaData()
+    for table_schema, schema_table_names in tables_by_schema.items():
+        schema_metadata = reflect_metadata(
+            engine, table_schema, schema_table_names, jobs
+        )
+        for key, table in schema_metadata.tables.items():
+            if key not in metadata.tables:
+                table.to_metadata(metadata)
+    for table_key in table_keys:
+        ddl_string = generate_table_ddl_string(metadata.tables[table_key], engine)
         print(ddl_string)
+
+
+@app.command("load")
+def load_table_file(
+    file: Annotated[pathlib.Path, typer.Argument(exists=True, dir_okay=False)],
+    table_name: Annotated[
+        str,
+        typer.Argument(
+            help="Table name, as schema.table", autocompletion=autocomplete_tables
+        ),
+    ],
+    file_format: Annotated[
+        Optional[LoadFileFormat],
+        typer.Option(
+            "--format", "-f", help="File format, from the extension by default"
+        ),
+    ] = None,
+    batch_size: Annotated[
+        int, typer.Option("--batch-size", "-b", min=1, help="Rows per batch")
+    ] = 10000,
+    commit_rows: Annotated[
+        int,
+        typer.Option("--commit-rows", min=1, help="Rows written per transaction"),
+    ] = 100000,
+    jobs: Annotated[
+        Optional[int],
+        typer.Option(
+            "--jobs",
+            "-j",
+            min=1,
+            help="Processes parsing the file, all CPUs by default",
+        ),
+    ] = None,
+    delimiter: Annotated[
+        Optional[str],
+        typer.Option("--delimiter", "-d", help="CSV delimiter, tab for .tsv files"),
+    ] = None,
+    null_value: Annotated[
+        str, typer.Option("--null-value", help="CSV value loaded as NULL")
+    ] = "",
+):
+    """
+    Load a CSV, JSON lines or Parquet file into a table.
+
+    File columns are matched to table columns by name, the keys of the first
+    object for JSON lines. Values are converted
+    to the column types in parallel and written with the bulk path of the
+    database: COPY on Postgres, fast_executemany on MSSQL and batched
+    executemany otherwise.
+    """
+    from rich.console import Console
+    from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import DBAPIError
+
+    from db_utils.transfer.loaders import load_file
+
+    db_url = os.environ[db_url_default_key_name]
+    engine = create_engine(db_url)
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[bold blue]{task.description}"),
+        TextColumn("{task.completed:,.0f} rows"),
+        TimeElapsedColumn(),
+        console=Console(stderr=True),
+        transient=True,
+    ) as progress:
+        task = progress.add_task(f"Loading {file.name}", total=None)
+        try:
+            result = load_file(
+                engine,
+                file,
+                table_name,
+                file_format=file_format,
+                batch_size=batch_size,
+                commit_rows=commit_rows,
+                jobs=jobs,
+                delimiter=delimiter,
+                null_value=null_value,
+                on_progress=lambda rows: progress.update(task, completed=rows),
+            )
+        except ValueError as e:
+            typer_error_msg_to_stdout(e)
+        except DBAPIError as e:
+            typer_error_msg_to_stdout(e.orig)
+    typer.secho(
+        f"{result.rows:,} rows loaded in {result.seconds:.2f}s "
+        f"({result.rows_per_second:,.0f} rows/s)",
+        err=True,
+    )
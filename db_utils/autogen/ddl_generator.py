@@ -1,8 +1,31 @@
+from typing import Iterable, Iterator
+
 from sqlalchemy import Table
 from sqlalchemy.engine import Engine
-from sqlalchemy.schema import CreateTable
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable
+from sqlalchemy.sql.ddl import sort_tables_and_constraints
 
 
 def generate_table_ddl_string(table: Table, engine: Engine) -> str:
     """Generate DDL for a table."""
     return CreateTable(table).compile(engine).string
+
+
+def generate_tables_ddl(tables: Iterable[Table], engine: Engine) -> Iterator[str]:
+    """Generate the DDL of tables in foreign key dependency order.
+
+    Every table is followed by its indexes. Foreign keys that are part of a
+    cycle are left out of the tables and added at the end with `ALTER TABLE`.
+    """
+    for table, fk_constraints in sort_tables_and_constraints(
+        sorted(tables, key=lambda t: t.key)
+    ):
+        if table is None:
+            for fk_constraint in fk_constraints:
+                yield AddConstraint(fk_constraint).compile(engine).string
+            continue
+        yield CreateTable(
+            table, include_foreign_key_constraints=fk_constraints
+        ).compile(engine).string
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            yield CreateIndex(index).compile(engine).string
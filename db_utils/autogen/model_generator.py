@@ -0,0 +1,161 @@
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import entry_points
+from typing import Optional, Sequence
+
+from sqlalchemy import MetaData, Table, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import NoReferencedTableError
+
+# `--output` values of the models command to sqlacodegen generator names
+GENERATOR_NAMES = {"model": "declarative", "table": "tables"}
+
+
+def get_generator_class(name: str) -> type:
+    """Load a sqlacodegen generator class from its entry point name."""
+    generators = {ep.name: ep for ep in entry_points(group="sqlacodegen.generators")}
+    if name not in generators:
+        raise ValueError(
+            f"Unknown generator '{name}', choose from {', '.join(sorted(generators))}"
+        )
+    return generators[name].load()
+
+
+def _split_table_name(table_name: str) -> tuple[str | None, str]:
+    schema, _, name = table_name.rpartition(".")
+    return schema or None, name
+
+
+def get_output_filename(schema: str | None, output_filename: str) -> str:
+    if not schema:
+        return output_filename
+    path = pathlib.Path(output_filename)
+    return str(path.with_name(f"{schema}_{path.name}"))
+
+
+def get_schema_metadata(metadata: MetaData, schema: str | None) -> MetaData:
+    """Copy the tables of a schema, and the tables they reference, to a new
+    `MetaData` object.
+
+    Generators change the metadata they are given, so every schema gets its
+    own copy of the shared reflection.
+    """
+    tables: dict[str, Table] = {}
+    pending = [table for table in metadata.tables.values() if table.schema == schema]
+    while pending:
+        table = pending.pop()
+        if table.key in tables:
+            continue
+        tables[table.key] = table
+        for foreign_key in table.foreign_keys:
+            try:
+                pending.append(foreign_key.column.table)
+            except NoReferencedTableError:
+                continue
+    schema_metadata = MetaData()
+    for key in sorted(tables):
+        tables[key].to_metadata(schema_metadata)
+    return schema_metadata
+
+
+# metadata shared by the schemas, set in every worker process
+_shared_metadata: MetaData | None = None
+
+
+def _init_worker(metadata: MetaData | None) -> None:
+    global _shared_metadata
+    _shared_metadata = metadata
+
+
+def generate_schema_models(
+    db_url: str,
+    schema: str | None,
+    generator_name: str,
+    options: Sequence[str],
+    outfile: str,
+) -> str:
+    """Generate the model code of a schema of the shared metadata to a file.
+
+    The URL is only used for the dialect: the database is not queried, so it
+    runs in worker processes.
+    """
+    assert _shared_metadata is not None
+    generator_class = get_generator_class(generator_name)
+    generator = generator_class(
+        get_schema_metadata(_shared_metadata, schema),
+        create_engine(db_url),
+        set(options),
+    )
+    with open(outfile, "w", encoding="utf-8") as f:
+        f.write(generator.generate())
+    return outfile
+
+
+def generate_models(
+    engine: Engine,
+    schemas: Sequence[Optional[str]],
+    output_filename: str,
+    generator_name: str = "declarative",
+    tables: Optional[list[str]] = None,
+    options: Sequence[str] = (),
+    views: bool = True,
+    jobs: int = 1,
+) -> dict[Optional[str], str]:
+    """Generate model code for schemas, a file per schema.
+
+    All the schemas are reflected once into a shared `MetaData`, then the
+    code of every schema is generated from a copy of it, in parallel worker
+    processes with `jobs` greater than one. `tables` names are looked up in
+    every schema, or in a single one as `schema.table`.
+
+    Raises:
+        ValueError: for an unknown generator or tables found in no schema.
+    """
+    # fail before reflecting, the workers load the class again
+    get_generator_class(generator_name)
+    requested = [_split_table_name(table_name) for table_name in tables or []]
+    metadata = MetaData()
+    for schema in schemas:
+        names = {
+            name for table_schema, name in requested if table_schema in (None, schema)
+        }
+        # a callable, a list fails on the names missing from the schema
+        only = (lambda name, _, names=names: name in names) if tables else None
+        # plain reflection: copied tables can not be sent to worker processes
+        metadata.reflect(engine, schema=schema, views=views, only=only)
+    missing = [
+        f"{table_schema}.{name}" if table_schema else name
+        for table_schema, name in requested
+        if not any(
+            table.name == name and table_schema in (None, table.schema)
+            for table in metadata.tables.values()
+        )
+    ]
+    if missing:
+        raise ValueError(f"Tables not found: {', '.join(missing)}")
+
+    db_url = engine.url.render_as_string(hide_password=False)
+    arguments = [
+        (
+            db_url,
+            schema,
+            generator_name,
+            options,
+            get_output_filename(schema, output_filename),
+        )
+        for schema in schemas
+    ]
+    if jobs <= 1 or len(schemas) == 1:
+        _init_worker(metadata)
+        try:
+            outfiles = [generate_schema_models(*args) for args in arguments]
+        finally:
+            _init_worker(None)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(schemas)),
+            initializer=_init_worker,
+            initargs=(metadata,),
+        ) as executor:
+            outfiles = list(executor.map(generate_schema_models, *zip(*arguments)))
+    return dict(zip(schemas, outfiles))
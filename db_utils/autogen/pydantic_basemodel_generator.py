@@ -1,114 +1,329 @@
-from typing import Container, List, Optional, Type
+import hashlib
+import json
+import pathlib
+import re
+from dataclasses import dataclass, field
+from typing import Container, Iterable, List, Optional, TypedDict
 
 import stringcase
-from pydantic import BaseConfig
-from sqlalchemy import Column, MetaData
+from sqlalchemy import Column, Table, inspect
 from sqlalchemy.engine import Engine
-from sqlalchemy.ext.automap import automap_base
-from sqlalchemy.inspection import inspect
-from sqlalchemy.orm.properties import ColumnProperty
 
+from db_utils.catalog.main import reflect_metadata
+from db_utils.exceptions import UnsupportedDialectError
 from db_utils.utils import get_stem_word
 
+BASE_MODEL_TEMPLATE = """from pydantic import BaseModel
 
-class OrmConfig(BaseConfig):
-    orm_mode = True
 
+class BaseModelCustom(BaseModel):
+    class Config:
+        orm_mode = True
+        allow_population_by_field_name = True
+        use_enum_values = True
+"""
+MANIFEST_VERSION = 2
+# `id`, `id_*` and `*_id` columns, left out of the `In` models when leading
+ID_COLUMN_REGEX = re.compile(r"id|id_\w*|\w*_id", re.IGNORECASE)
 
-def camelCase(st):
-    output = "".join(x for x in st.title() if x.isalnum())
-    return output[0].lower() + output[1:]
 
+@dataclass
+class PydanticModel:
+    table_name: str
+    class_name: str
+    source: str
+    # `from module import name` pairs used by the fields
+    imports: list[tuple[str, str]] = field(default_factory=list)
 
-def sqlalchemy_model_to_pydantic_model(
-    db_model: Type, *, config: Type = OrmConfig, exclude: Container[str] = []
-):  # -> Type[BaseModel]
-    table_name: str = db_model.__table__.name
-    table_name_singular = get_stem_word(table_name)
 
-    string_model_repr = (
-        f"class {stringcase.capitalcase(table_name_singular)}In(BaseModelCustom):\n"
-    )
-    string_model_repr_in = f"""class {stringcase.capitalcase(table_name_singular)}({stringcase.capitalcase(table_name_singular)}In):"""
-
-    mapper = inspect(db_model)
-    fields = {}
-    n = 0
-    for attr in mapper.attrs:
-        if isinstance(attr, ColumnProperty):
-            if attr.columns:
-                try:
-                    column_name = attr.key
-                    if (n == 0) and (column_name.lower().startswith("id")):
-                        column_name = attr.key[:2]
-                        continue
-                    if column_name in exclude:
-                        continue
-                    column: Column = attr.columns[0]
-                    python_type: Optional[type] = None
-                    if hasattr(column.type, "impl"):
-                        if hasattr(column.type.impl, "python_type"):
-                            python_type = column.type.impl.python_type
-                    elif hasattr(column.type, "python_type"):
-                        python_type = column.type.python_type
-                    assert python_type, f"Could not infer python_type for {column}"
-                    default = None
-                    if column.default is None and not column.nullable:
-                        default = ...
-                    fields[column_name] = (python_type, default)
-
-                    string_model_repr += (
-                        f"    {column_name}: Optional[{python_type.__name__}] = None\n"
-                    )
-                except NotImplementedError as e:
-                    string_model_repr += (
-                        f"    {column_name}: Optional[UNDEFINED] = None\n"
-                    )
-            n += 1
-    string_model_repr += f"""
-{string_model_repr_in}
-    Id: Union[int, str]\n
+class ModelManifestEntry(TypedDict):
+    stamp: str | None
+    class_name: str
+    module: str
+    sha256: str
+    source: str
+    imports: list[tuple[str, str]]
+
+
+class ModelManifest(TypedDict):
+    version: int
+    schema: str | None
+    per_table: bool
+    tables: dict[str, ModelManifestEntry]
+
+
+@dataclass
+class GenerationReport:
+    generated: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+
+def get_column_python_type(column: Column) -> type | None:
+    """Get the Python type of a column, None when the type does not define one."""
+    column_type = getattr(column.type, "impl", column.type)
+    try:
+        return column_type.python_type
+    except NotImplementedError:
+        return None
+
+
+def table_to_pydantic_model(
+    table: Table, *, exclude: Container[str] = ()
+) -> PydanticModel:
+    """Generate the source of the Pydantic models of a reflected table.
+
+    Two models are generated: `<Name>In` with the table columns but its
+    leading id columns, and `<Name>` adding the `Id` field.
+    """
+    class_name = stringcase.capitalcase(get_stem_word(table.name))
+    imports = {("typing", "Optional"), ("typing", "Union")}
+    lines = [f"class {class_name}In(BaseModelCustom):"]
+    leading = True
+    for column in table.columns:
+        column_name = column.key
+        if leading and ID_COLUMN_REGEX.fullmatch(column_name):
+            continue
+        leading = False
+        if column_name in exclude:
+            continue
+        python_type = get_column_python_type(column)
+        if python_type is None:
+            imports.add(("typing", "Any"))
+            type_name = "Any"
+        else:
+            type_name = python_type.__name__
+            if python_type.__module__ != "builtins":
+                imports.add((python_type.__module__, type_name))
+        lines.append(f"    {column_name}: Optional[{type_name}] = None")
+    if len(lines) == 1:
+        lines.append("    pass")
+    source = "\n".join(lines) + "\n"
+    source += f"""
+
+class {class_name}({class_name}In):
+    Id: Union[int, str]
 """
-    print(string_model_repr)
-    return string_model_repr
+    return PydanticModel(
+        table_name=table.name,
+        class_name=class_name,
+        source=source,
+        imports=sorted(imports),
+    )
 
-    # pydantic_model = create_model(
-    #     db_model.__name__, __config__=config, **fields  # type: ignore
-    # )
-    # return pydantic_model
 
+def render_imports(imports: Iterable[tuple[str, str]]) -> str:
+    names_by_module: dict[str, set[str]] = {}
+    for module, name in imports:
+        names_by_module.setdefault(module, set()).add(name)
+    return "".join(
+        f"from {module} import {', '.join(sorted(names))}\n"
+        for module, names in sorted(names_by_module.items())
+    )
 
-def main(
+
+def get_module_name(table_name: str) -> str:
+    module_name = re.sub(r"\W", "_", table_name).lower()
+    return f"_{module_name}" if module_name[:1].isdigit() else module_name
+
+
+def _get_manifest_path(output: pathlib.Path, per_table: bool) -> pathlib.Path:
+    if per_table:
+        return output / ".manifest.json"
+    return output.with_name(f".{output.stem}.manifest.json")
+
+
+def load_manifest(
+    output: pathlib.Path, schema_name: str | None, per_table: bool
+) -> dict[str, ModelManifestEntry]:
+    """Get the tables generated by the last run to the same output."""
+    manifest_path = _get_manifest_path(output, per_table)
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, "r") as f:
+        manifest: ModelManifest = json.load(f)
+    if (manifest.get("version"), manifest.get("schema"), manifest.get("per_table")) != (
+        MANIFEST_VERSION,
+        schema_name,
+        per_table,
+    ):
+        return {}
+    return manifest["tables"]
+
+
+def save_manifest(
+    output: pathlib.Path,
+    schema_name: str | None,
+    per_table: bool,
+    tables: dict[str, ModelManifestEntry],
+) -> None:
+    manifest = ModelManifest(
+        version=MANIFEST_VERSION,
+        schema=schema_name,
+        per_table=per_table,
+        tables={table_name: tables[table_name] for table_name in sorted(tables)},
+    )
+    with open(_get_manifest_path(output, per_table), "w") as f:
+        json.dump(manifest, f)
+
+
+def _get_table_stamps(engine: Engine, schema_name: str | None) -> dict[str, str] | None:
+    from db_utils.catalog.incremental import get_object_stamps
+
+    schema = schema_name or inspect(engine).default_schema_name
+    try:
+        return get_object_stamps(engine, [schema]).get(schema, {})
+    except UnsupportedDialectError:
+        return None
+
+
+def _write_if_changed(path: pathlib.Path, content: str) -> None:
+    if path.exists() and path.read_text() == content:
+        return
+    path.write_text(content)
+
+
+def write_module(output: pathlib.Path, entries: dict[str, ModelManifestEntry]) -> None:
+    """Write all the models to a single module."""
+    imports = [tuple(i) for entry in entries.values() for i in entry["imports"]]
+    sources = [entries[table_name]["source"] for table_name in sorted(entries)]
+    content = render_imports(imports) + "\n" + BASE_MODEL_TEMPLATE
+    content += "".join(f"\n\n{source}" for source in sources)
+    _write_if_changed(output, content)
+
+
+def write_package(
+    output: pathlib.Path,
+    entries: dict[str, ModelManifestEntry],
+    changed: Iterable[str],
+) -> None:
+    """Write a package with a module per table, rewriting only changed tables."""
+    output.mkdir(parents=True, exist_ok=True)
+    _write_if_changed(output / "_base.py", BASE_MODEL_TEMPLATE)
+    missing = [
+        t for t in entries if not (output / f"{entries[t]['module']}.py").exists()
+    ]
+    for table_name in sorted(set(changed) | set(missing)):
+        entry = entries[table_name]
+        content = (
+            render_imports(tuple(i) for i in entry["imports"])
+            + "\nfrom ._base import BaseModelCustom\n\n\n"
+            + entry["source"]
+        )
+        _write_if_changed(output / f"{entry['module']}.py", content)
+    init_lines = [
+        f"from .{entry['module']} import {entry['class_name']}, "
+        f"{entry['class_name']}In\n"
+        for _, entry in sorted(entries.items())
+    ]
+    _write_if_changed(
+        output / "__init__.py",
+        "from ._base import BaseModelCustom\n" + "".join(init_lines),
+    )
+
+
+def generate_pydantic_models(
     engine: Engine,
+    output: pathlib.Path,
     schema_name: Optional[str] = None,
     tables: Optional[List[str]] = None,
-):
-    """Create Pydantic models from SQLAlchemy models."""
+    jobs: int = 1,
+    per_table: bool = False,
+    full: bool = False,
+) -> GenerationReport:
+    """Generate Pydantic models for the tables of a schema.
 
-    metadata = MetaData()
-    if not tables:
-        metadata.reflect(engine, schema=schema_name)
-    else:
-        metadata.reflect(engine, schema=schema_name, only=tables)
-    # custom mappings
-    Base = automap_base(metadata=metadata)
-    Base.prepare()
+    Models are generated from reflected `Table` objects. A manifest written
+    next to the output records the catalog stamp of every generated table, so
+    the next run only reflects the tables whose definition changed. When the
+    dialect has no stamps all the tables are reflected, but only the models
+    whose source changed are rewritten. `full` reflects all the tables even
+    when stamps are available.
+    """
+    report = GenerationReport()
+    previous = load_manifest(output, schema_name, per_table)
+    stamps = _get_table_stamps(engine, schema_name)
 
-    file_template = f"""from datetime import datetime
-from typing import Optional, Union
+    if stamps is None or full:
+        to_reflect = tables or None
+    else:
+        table_names = [t for t in stamps if not tables or t in tables]
+        to_reflect = [
+            table_name
+            for table_name in table_names
+            if table_name not in previous
+            or previous[table_name]["stamp"] != stamps[table_name]
+        ]
+        report.unchanged += sorted(set(table_names) - set(to_reflect))
 
-from pydantic import BaseModel
+    entries = {
+        table_name: entry
+        for table_name, entry in previous.items()
+        if table_name in report.unchanged
+    }
+    changed: list[str] = []
+    if to_reflect is None or to_reflect:
+        metadata = reflect_metadata(engine, schema_name, to_reflect, jobs)
+        for table in metadata.tables.values():
+            if table.schema != schema_name or (
+                to_reflect is not None and table.name not in to_reflect
+            ):
+                # tables only reflected because a foreign key references them
+                continue
+            model = table_to_pydantic_model(table)
+            sha256 = hashlib.sha256(model.source.encode()).hexdigest()
+            entries[table.name] = ModelManifestEntry(
+                stamp=stamps.get(table.name) if stamps else None,
+                class_name=model.class_name,
+                module=get_module_name(table.name),
+                sha256=sha256,
+                source=model.source,
+                imports=model.imports,
+            )
+            previous_entry = previous.get(table.name)
+            if previous_entry and previous_entry["sha256"] == sha256:
+                report.unchanged.append(table.name)
+            else:
+                report.generated.append(table.name)
+                changed.append(table.name)
 
+    if not tables:
+        report.removed = sorted(set(previous) - set(entries))
+    else:
+        # tables outside of the selection are kept as they are
+        entries.update(
+            {t: previous[t] for t in previous if t not in entries and t not in tables}
+        )
 
-class BaseModelCustom(BaseModel):
-    class Config:
-        orm_mode = True
-        allow_population_by_field_name = True
-        use_enum_values = True
+    if per_table:
+        write_package(output, entries, changed)
+        for table_name in report.removed:
+            module_path = output / f"{previous[table_name]['module']}.py"
+            module_path.unlink(missing_ok=True)
+    else:
+        write_module(output, entries)
+    save_manifest(output, schema_name, per_table, entries)
+    report.generated.sort()
+    report.unchanged.sort()
+    return report
 
-"""
-    for model in Base.classes:
-        file_template += sqlalchemy_model_to_pydantic_model(model)
 
-    with open("schemas_autogen.py", "w") as f:
-        f.write(file_template)
+def main(
+    engine: Engine,
+    schema_name: Optional[str] = None,
+    tables: Optional[List[str]] = None,
+    jobs: int = 1,
+    output: str = "schemas_autogen.py",
+    per_table: bool = False,
+    full: bool = False,
+) -> GenerationReport:
+    """Create Pydantic models from reflected tables."""
+    return generate_pydantic_models(
+        engine,
+        pathlib.Path(output),
+        schema_name=schema_name,
+        tables=tables,
+        jobs=jobs,
+        per_table=per_table,
+        full=full,
+    )
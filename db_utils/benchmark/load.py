@@ -0,0 +1,322 @@
+import bisect
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from db_utils.benchmark.main import get_latency_stats
+
+# upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10]
+# seconds a worker waits before reconnecting after an error, doubled on every
+# consecutive error up to the maximum
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 2.0
+# SQLite virtual machine instructions between two timeout checks
+SQLITE_PROGRESS_STEPS = 1000
+
+
+@dataclass
+class QueryOutcome:
+    # seconds since the start of the run when the query finished
+    finished: float
+    latency: float
+    status: str  # "ok", "error" or "timeout"
+
+
+@dataclass
+class LoadInterval:
+    start: float
+    completed: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+
+@dataclass
+class LoadResult:
+    query: str
+    dialect: str
+    concurrency: int
+    duration: float
+    rate: float | None
+    timeout: float | None
+    elapsed: float = 0.0
+    outcomes: list[QueryOutcome] = field(default_factory=list)
+    error_messages: dict[str, int] = field(default_factory=dict)
+
+    def count(self, status: str) -> int:
+        return sum(1 for outcome in self.outcomes if outcome.status == status)
+
+    @property
+    def qps(self) -> float:
+        return self.count("ok") / self.elapsed if self.elapsed else 0.0
+
+    def latencies(self) -> list[float]:
+        return [o.latency for o in self.outcomes if o.status == "ok"]
+
+    def intervals(self, length: float = 1.0) -> list[LoadInterval]:
+        """Group the outcomes in consecutive intervals of `length` seconds."""
+        intervals = [
+            LoadInterval(start=i * length)
+            for i in range(max(math.ceil(self.elapsed / length), 1))
+        ]
+        for outcome in self.outcomes:
+            interval = intervals[
+                min(int(outcome.finished / length), len(intervals) - 1)
+            ]
+            if outcome.status == "ok":
+                interval.completed += 1
+                interval.latencies.append(outcome.latency)
+            elif outcome.status == "timeout":
+                interval.timeouts += 1
+            else:
+                interval.errors += 1
+        return intervals
+
+    def to_dict(self) -> dict[str, Any]:
+        latency_stats = get_latency_stats(self.latencies())
+        return {
+            "query": self.query,
+            "dialect": self.dialect,
+            "concurrency": self.concurrency,
+            "duration": self.duration,
+            "rate": self.rate,
+            "timeout": self.timeout,
+            "elapsed": self.elapsed,
+            "completed": self.count("ok"),
+            "errors": self.count("error"),
+            "timeouts": self.count("timeout"),
+            "qps": self.qps,
+            "latency": asdict(latency_stats),
+            "histogram": [
+                {"le": bound, "count": count}
+                for bound, count in latency_histogram(self.latencies())
+            ],
+            "intervals": [
+                {
+                    "start": interval.start,
+                    "completed": interval.completed,
+                    "errors": interval.errors,
+                    "timeouts": interval.timeouts,
+                }
+                for interval in self.intervals()
+            ],
+            "error_messages": self.error_messages,
+        }
+
+
+def latency_histogram(
+    latencies: list[float], buckets: list[float] = LATENCY_BUCKETS
+) -> list[tuple[float, int]]:
+    """Count latencies per bucket, the last bucket (inf) holds the slower ones."""
+    bounds = buckets + [float("inf")]
+    counts = [0] * len(bounds)
+    for latency in latencies:
+        counts[bisect.bisect_left(bounds, latency)] += 1
+    return list(zip(bounds, counts))
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration like `90`, `30s`, `5m` or `1h` to seconds."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*", value)
+    if not match:
+        raise ValueError(f"Invalid duration '{value}'")
+    number, unit = match.groups()
+    return float(number) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit or "s"]
+
+
+class _RateLimiter:
+    """Hand out evenly spaced start times for a total rate shared by workers."""
+
+    def __init__(self, rate: float, start: float):
+        self.interval = 1 / rate
+        self.next_start = start
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self.lock:
+            start = self.next_start
+            self.next_start += self.interval
+        delay = start - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def set_statement_timeout(
+    connection: Connection, timeout: float, get_deadline: Callable[[], float]
+) -> bool:
+    """Make the server cancel the queries of a connection after `timeout`.
+
+    Postgres gets a `statement_timeout`, pyodbc connections a query timeout,
+    rounded up to whole seconds, and SQLite connections a progress handler
+    interrupting queries running past `get_deadline()`. Returns False for
+    other dialects, whose queries are not cancelled.
+    """
+    dialect = connection.dialect
+    match dialect.name, dialect.driver:
+        case "postgresql", _:
+            connection.exec_driver_sql(
+                f"SET statement_timeout = {max(round(timeout * 1000), 1)}"
+            )
+            # the setting is transactional
+            connection.commit()
+        case "mssql", "pyodbc":
+            connection.connection.driver_connection.timeout = max(math.ceil(timeout), 1)
+        case "sqlite", _:
+            connection.connection.driver_connection.set_progress_handler(
+                lambda: time.perf_counter() > get_deadline(), SQLITE_PROGRESS_STEPS
+            )
+        case _:
+            return False
+    return True
+
+
+def reset_statement_timeout(connection: Connection) -> None:
+    """Undo `set_statement_timeout` before a connection returns to the pool."""
+    dialect = connection.dialect
+    match dialect.name, dialect.driver:
+        case "postgresql", _:
+            connection.exec_driver_sql("RESET statement_timeout")
+            connection.commit()
+        case "mssql", "pyodbc":
+            connection.connection.driver_connection.timeout = 0
+        case "sqlite", _:
+            connection.connection.driver_connection.set_progress_handler(None, 0)
+
+
+def is_timeout_error(dialect_name: str, error: Exception) -> bool:
+    """Whether an error is the cancellation of a query by its timeout."""
+    orig = getattr(error, "orig", None) or error
+    match dialect_name:
+        case "postgresql":
+            # query_canceled, psycopg2 and psycopg
+            sqlstate = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+            return sqlstate == "57014"
+        case "mssql":
+            return "HYT00" in str(orig)
+        case "sqlite":
+            return "interrupted" in str(orig)
+    return False
+
+
+def run_load(
+    engine: Engine,
+    query: str,
+    concurrency: int,
+    duration: float,
+    rate: float | None = None,
+    timeout: float | None = None,
+    on_progress: Callable[[float, int], None] | None = None,
+) -> LoadResult:
+    """Run a query from `concurrency` workers for `duration` seconds.
+
+    Each worker keeps its own connection from the engine pool and runs the
+    query in a loop, fetching all rows and rolling back. With a `rate`, query
+    starts are spread to that total number per second. With a `timeout`, the
+    server cancels slower queries where `set_statement_timeout` supports the
+    dialect, and they are counted as timeouts instead of completed. Workers
+    wait before reconnecting after an error, longer on consecutive errors.
+    """
+    result = LoadResult(
+        query=query,
+        dialect=engine.dialect.name,
+        concurrency=concurrency,
+        duration=duration,
+        rate=rate,
+        timeout=timeout,
+    )
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+    limiter = _RateLimiter(rate, start) if rate else None
+    statement = text(query)
+
+    def record(latency: float, status: str, error: Exception | None = None):
+        with lock:
+            result.outcomes.append(
+                QueryOutcome(time.perf_counter() - start, latency, status)
+            )
+            if error is not None:
+                message = f"{type(error).__name__}: {str(error).splitlines()[0]}"
+                result.error_messages[message] = (
+                    result.error_messages.get(message, 0) + 1
+                )
+
+    def worker() -> None:
+        connection: Connection | None = None
+        query_deadline = math.inf
+        retry_delay = RETRY_DELAY
+        try:
+            while True:
+                if limiter:
+                    limiter.wait()
+                if time.perf_counter() >= deadline:
+                    return
+                query_start = time.perf_counter()
+                try:
+                    if connection is None:
+                        connection = engine.connect()
+                        if timeout:
+                            set_statement_timeout(
+                                connection, timeout, lambda: query_deadline
+                            )
+                        query_start = time.perf_counter()
+                    if timeout:
+                        query_deadline = query_start + timeout
+                    query_result = connection.execute(statement)
+                    if query_result.returns_rows:
+                        for _ in query_result.partitions():
+                            pass
+                    connection.rollback()
+                except Exception as e:
+                    latency = time.perf_counter() - query_start
+                    if timeout and is_timeout_error(engine.dialect.name, e):
+                        record(latency, "timeout")
+                        try:
+                            connection.rollback()
+                            continue
+                        except Exception:
+                            pass
+                    else:
+                        record(latency, "error", e)
+                    if connection is not None:
+                        connection.close()
+                        connection = None
+                    # do not spin on connection errors while the server is down
+                    time.sleep(max(min(retry_delay, deadline - time.perf_counter()), 0))
+                    retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                    continue
+                retry_delay = RETRY_DELAY
+                latency = time.perf_counter() - query_start
+                record(latency, "timeout" if timeout and latency > timeout else "ok")
+        finally:
+            if connection is not None:
+                if timeout:
+                    try:
+                        reset_statement_timeout(connection)
+                    except Exception:
+                        # an invalidated connection is discarded by the pool
+                        connection.invalidate()
+                connection.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(worker) for _ in range(concurrency)]
+        while True:
+            done, _ = wait(futures, timeout=0.5)
+            if on_progress:
+                with lock:
+                    completed = len(result.outcomes)
+                on_progress(time.perf_counter() - start, completed)
+            if len(done) == len(futures):
+                break
+    for future in futures:
+        future.result()
+    result.elapsed = time.perf_counter() - start
+    return result
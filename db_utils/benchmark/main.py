@@ -0,0 +1,150 @@
+import math
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# phases of a query sample, in execution order
+QUERY_PHASES = ["connect", "execute", "first_row", "fetch", "total"]
+
+
+@dataclass
+class QuerySample:
+    """Seconds spent in each phase of one query run."""
+
+    connect: float
+    execute: float
+    first_row: float
+    fetch: float
+    total: float
+    rows: int
+
+
+@dataclass
+class LatencyStats:
+    count: int
+    min: float
+    max: float
+    mean: float
+    stddev: float
+    p50: float
+    p90: float
+    p99: float
+
+
+@dataclass
+class BenchmarkResult:
+    query: str
+    dialect: str
+    warmup: int
+    iterations: int
+    started_at: str
+    samples: list[QuerySample] = field(default_factory=list)
+
+    def stats(self) -> dict[str, LatencyStats]:
+        return {
+            phase: get_latency_stats([getattr(s, phase) for s in self.samples])
+            for phase in QUERY_PHASES
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "query": self.query,
+            "dialect": self.dialect,
+            "warmup": self.warmup,
+            "iterations": self.iterations,
+            "started_at": self.started_at,
+            "stats": {phase: asdict(s) for phase, s in self.stats().items()},
+            "samples": [asdict(sample) for sample in self.samples],
+        }
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Get the q-th percentile (0-100) of sorted values, interpolating linearly."""
+    if not sorted_values:
+        return math.nan
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (
+        position - lower
+    )
+
+
+def get_latency_stats(values: Sequence[float]) -> LatencyStats:
+    sorted_values = sorted(values)
+    return LatencyStats(
+        count=len(values),
+        min=sorted_values[0] if values else math.nan,
+        max=sorted_values[-1] if values else math.nan,
+        mean=statistics.fmean(values) if values else math.nan,
+        stddev=statistics.stdev(values) if len(values) > 1 else 0.0,
+        p50=percentile(sorted_values, 50),
+        p90=percentile(sorted_values, 90),
+        p99=percentile(sorted_values, 99),
+    )
+
+
+def run_query_sample(engine: Engine, query: str) -> QuerySample:
+    """Run a query once, timing each phase separately.
+
+    The engine should not pool connections so the connection setup is part of
+    every sample. Rows are read from a server-side cursor, so the transfer of
+    the result is timed by `first_row` and `fetch` rather than by `execute`,
+    on drivers that buffer whole results otherwise. The transaction is rolled
+    back.
+    """
+    rows = 0
+    first_row = fetch = 0.0
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        connected = time.perf_counter()
+        result = connection.execution_options(stream_results=True).execute(text(query))
+        executed = time.perf_counter()
+        if result.returns_rows:
+            row = result.fetchone()
+            first_row = time.perf_counter() - executed
+            if row is not None:
+                rows = 1
+                fetch_start = time.perf_counter()
+                for partition in result.partitions():
+                    rows += len(partition)
+                fetch = time.perf_counter() - fetch_start
+        result.close()
+    return QuerySample(
+        connect=connected - start,
+        execute=executed - connected,
+        first_row=first_row,
+        fetch=fetch,
+        total=time.perf_counter() - start,
+        rows=rows,
+    )
+
+
+def run_benchmark(
+    engine: Engine,
+    query: str,
+    iterations: int = 1,
+    warmup: int = 0,
+    on_sample: Callable[[int, QuerySample], None] | None = None,
+) -> BenchmarkResult:
+    """Run a query `warmup` times untimed, then `iterations` times timed."""
+    result = BenchmarkResult(
+        query=query,
+        dialect=engine.dialect.name,
+        warmup=warmup,
+        iterations=iterations,
+        started_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    )
+    for _ in range(warmup):
+        run_query_sample(engine, query)
+    for iteration in range(iterations):
+        sample = run_query_sample(engine, query)
+        result.samples.append(sample)
+        if on_sample:
+            on_sample(iteration, sample)
+    return result
@@ -0,0 +1,95 @@
+import json
+import pathlib
+import sqlite3
+import time
+from dataclasses import asdict
+from typing import Optional
+
+from sqlalchemy.engine.url import URL
+
+from db_utils.catalog.main import CatalogMetadata
+from db_utils.config import catalog_cache_filename
+from db_utils.inspect.table.main import TableSchema, table_schema_from_dict
+from db_utils.utils import get_cache_dir, get_url_fingerprint
+
+
+class CatalogCache:
+    """Local SQLite store of table schemas per database URL.
+
+    Table schemas are stored with the `extra` PK/FK column flags, and entries
+    are keyed by the URL fingerprint, so the same cache file serves every
+    database.
+    """
+
+    def __init__(self, path: Optional[pathlib.Path] = None):
+        self.path = path or get_cache_dir() / catalog_cache_filename
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS table_schema (
+                url_fingerprint TEXT NOT NULL,
+                schema_name TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                definition TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (url_fingerprint, schema_name, table_name)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def __enter__(self) -> "CatalogCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def get_table_schema(
+        self, db_url: URL, schema: str, table_name: str, extra: bool = False
+    ) -> TableSchema | None:
+        row = self.connection.execute(
+            """
+            SELECT definition FROM table_schema
+             WHERE url_fingerprint = ? AND schema_name = ? AND table_name = ?
+            """,
+            (get_url_fingerprint(db_url), schema, table_name),
+        ).fetchone()
+        if row is None:
+            return None
+        return table_schema_from_dict(json.loads(row[0]), extra=extra)
+
+    def set_table_schema(
+        self, db_url: URL, schema: str, table_schema: TableSchema
+    ) -> None:
+        """Store a table schema; it should be reflected with `extra=True`."""
+        self.set_catalog(db_url, {schema: {table_schema.name: asdict(table_schema)}})
+
+    def set_catalog(self, db_url: URL, metadata: CatalogMetadata) -> None:
+        """Store every table schema of a reflected catalog in one transaction."""
+        fingerprint = get_url_fingerprint(db_url)
+        updated_at = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO table_schema VALUES (?, ?, ?, ?, ?)",
+                (
+                    (fingerprint, schema, table_name, json.dumps(table), updated_at)
+                    for schema, tables in metadata.items()
+                    for table_name, table in tables.items()
+                ),
+            )
+
+    def invalidate(
+        self, db_url: URL, schema: str | None = None, table_name: str | None = None
+    ) -> None:
+        query = "DELETE FROM table_schema WHERE url_fingerprint = ?"
+        params: list[str] = [get_url_fingerprint(db_url)]
+        if schema is not None:
+            query += " AND schema_name = ?"
+            params.append(schema)
+        if table_name is not None:
+            query += " AND table_name = ?"
+            params.append(table_name)
+        with self.connection:
+            self.connection.execute(query, params)
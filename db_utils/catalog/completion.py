@@ -0,0 +1,60 @@
+import mmap
+import os
+import pathlib
+from typing import Any, Iterable
+
+from db_utils.config import db_metadata_index_filename
+
+
+def write_completion_index(
+    metadata: dict[str, Iterable[Any]],
+    path: str | pathlib.Path = db_metadata_index_filename,
+) -> None:
+    """Write the sorted index of `schema.table` names used by shell completion.
+
+    Each line holds the case folded name, used as sort and search key, and the
+    name itself separated by a tab.
+    """
+    names = [
+        f"{schema}.{table}" for schema, tables in metadata.items() for table in tables
+    ]
+    lines = sorted(f"{name.casefold()}\t{name}\n" for name in names)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.replace(tmp_path, path)
+
+
+def lookup_completion_index(
+    prefix: str,
+    path: str | pathlib.Path = db_metadata_index_filename,
+    limit: int | None = None,
+) -> list[str]:
+    """Get the names in the completion index starting with a case insensitive prefix.
+
+    The index file is memory-mapped and binary searched, so only the pages
+    holding the matches are read.
+    """
+    key = prefix.casefold().encode()
+    matches: list[str] = []
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return matches
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as index:
+            # find the start of the first line whose key is not lower than the prefix
+            lo, hi = 0, len(index)
+            while lo < hi:
+                line_start = index.rfind(b"\n", 0, (lo + hi) // 2) + 1
+                line_end = index.find(b"\n", line_start)
+                if index[line_start:line_end].split(b"\t", 1)[0] < key:
+                    lo = line_end + 1
+                else:
+                    hi = line_start
+            while lo < len(index) and (limit is None or len(matches) < limit):
+                line_end = index.find(b"\n", lo)
+                line_key, name = index[lo:line_end].split(b"\t", 1)
+                if not line_key.startswith(key):
+                    break
+                matches.append(name.decode("utf-8"))
+                lo = line_end + 1
+    return matches
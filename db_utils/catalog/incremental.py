@@ -0,0 +1,249 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.engine import Engine
+
+from db_utils.catalog.main import (
+    CatalogMetadata,
+    TableRecords,
+    build_catalog_tables,
+    get_mssql_catalog_records,
+    get_multi_table_records,
+    is_table_excluded,
+    select_schemas,
+)
+from db_utils.exceptions import UnsupportedDialectError
+
+# {schema: {table: stamp}}
+ObjectStamps = dict[str, dict[str, str]]
+
+
+@dataclass
+class CatalogChanges:
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    dropped: list[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def reflected(self) -> list[str]:
+        return self.added + self.changed
+
+
+def _get_mssql_stamps(
+    engine: Engine, schemas: list[str], reflect_views: bool
+) -> ObjectStamps:
+    query = text(
+        """
+        SELECT SCHEMA_NAME(o.schema_id), o.name,
+               CONVERT(varchar(33), o.modify_date, 126)
+          FROM sys.objects o
+         WHERE o.type IN :object_types
+           AND SCHEMA_NAME(o.schema_id) IN :schemas
+        """
+    ).bindparams(
+        bindparam("object_types", expanding=True), bindparam("schemas", expanding=True)
+    )
+    object_types = ["U", "V"] if reflect_views else ["U"]
+    stamps: ObjectStamps = {schema: {} for schema in schemas}
+    with engine.connect() as connection:
+        for schema, table_name, modify_date in connection.execute(
+            query, {"object_types": object_types, "schemas": schemas}
+        ):
+            stamps[schema][table_name] = modify_date
+    return stamps
+
+
+def _get_postgresql_stamps(
+    engine: Engine, schemas: list[str], reflect_views: bool
+) -> ObjectStamps:
+    # the xmin of the pg_class and pg_attribute rows moves on every DDL that
+    # touches the table or its columns, relfilenode on rewrites. Constraints
+    # and indexes have rows of their own, their newest xmin and count move
+    # when one is added, altered or dropped. xid has no max(), hence the casts
+    query = text(
+        """
+        SELECT n.nspname, c.relname,
+               c.xmin::text || ':' || c.relfilenode::text || ':' || coalesce((
+                   SELECT md5(string_agg(a.xmin::text, ',' ORDER BY a.attnum))
+                     FROM pg_attribute a
+                    WHERE a.attrelid = c.oid AND a.attnum > 0
+               ), '') || ':' || (
+                   SELECT coalesce(max(co.xmin::text::bigint), 0) || '/' || count(*)
+                     FROM pg_constraint co
+                    WHERE co.conrelid = c.oid
+               ) || ':' || (
+                   SELECT coalesce(max(i.xmin::text::bigint), 0) || '/' || count(*)
+                     FROM pg_index i
+                    WHERE i.indrelid = c.oid
+               )
+          FROM pg_class c
+          JOIN pg_namespace n ON n.oid = c.relnamespace
+         WHERE c.relkind IN :relkinds
+           AND n.nspname IN :schemas
+        """
+    ).bindparams(
+        bindparam("relkinds", expanding=True), bindparam("schemas", expanding=True)
+    )
+    relkinds = ["r", "p", "f", "v", "m"] if reflect_views else ["r", "p", "f"]
+    stamps: ObjectStamps = {schema: {} for schema in schemas}
+    with engine.connect() as connection:
+        for schema, table_name, stamp in connection.execute(
+            query, {"relkinds": relkinds, "schemas": schemas}
+        ):
+            stamps[schema][table_name] = stamp
+    return stamps
+
+
+def _get_sqlite_stamps(
+    engine: Engine, schemas: list[str], reflect_views: bool
+) -> ObjectStamps:
+    # SQLite keeps the current DDL of every object, a hash of it is the stamp
+    object_types = "('table', 'view')" if reflect_views else "('table')"
+    stamps: ObjectStamps = {}
+    with engine.connect() as connection:
+        for schema in schemas:
+            quoted_schema = engine.dialect.identifier_preparer.quote_schema(schema)
+            rows = connection.execute(
+                text(
+                    f"SELECT name, sql FROM {quoted_schema}.sqlite_master "
+                    f"WHERE type IN {object_types} AND name NOT LIKE 'sqlite~_%' "
+                    "ESCAPE '~'"
+                )
+            )
+            stamps[schema] = {
+                table_name: hashlib.sha1(sql.encode()).hexdigest()
+                for table_name, sql in rows
+            }
+    return stamps
+
+
+def get_object_stamps(
+    engine: Engine, schemas: list[str], reflect_views: bool = False
+) -> ObjectStamps:
+    """Get a change marker for every table of the given schemas.
+
+    A stamp is an opaque string that changes when the definition of the table
+    changes. It is read from the system catalog in one query per database.
+
+    Raises:
+        UnsupportedDialectError: if the dialect has no stamps implementation.
+    """
+    match engine.dialect.name:
+        case "mssql":
+            return _get_mssql_stamps(engine, schemas, reflect_views)
+        case "postgresql":
+            return _get_postgresql_stamps(engine, schemas, reflect_views)
+        case "sqlite":
+            return _get_sqlite_stamps(engine, schemas, reflect_views)
+        case _:
+            raise UnsupportedDialectError(
+                f"Object stamps are not supported for dialect '{engine.dialect.name}'"
+            )
+
+
+def set_catalog_stamps(metadata: CatalogMetadata, stamps: ObjectStamps) -> None:
+    """Record the stamp of every table in its catalog entry."""
+    for schema, tables in metadata.items():
+        for table_name, table in tables.items():
+            stamp = stamps.get(schema, {}).get(table_name)
+            if stamp is not None:
+                table["stamp"] = stamp
+
+
+def _reflect_changed_tables(
+    engine: Engine, schema: str, to_reflect: list[str], reflect_views: bool
+) -> dict[str, TableRecords]:
+    inspector = inspect(engine)
+    if engine.dialect.name == "mssql":
+        return get_mssql_catalog_records(
+            inspector, [schema], reflect_views, filter_names=to_reflect
+        ).get(schema, {})
+    return get_multi_table_records(
+        inspector, schema, reflect_views, filter_names=to_reflect
+    )
+
+
+def refresh_catalog(
+    engine: Engine,
+    previous: CatalogMetadata,
+    schemas: list[str] | None = None,
+    exclude: list[str] | None = None,
+    reflect_views: bool = False,
+    jobs: int = 1,
+) -> tuple[CatalogMetadata, CatalogChanges]:
+    """Refresh a catalog reflecting only the tables whose stamp moved.
+
+    Stamps are read before reflecting, so changes made while reflecting are
+    picked by the next refresh. With `jobs` greater than one, the changed
+    tables of different schemas are reflected concurrently. Schemas of
+    `previous` that are not selected by `schemas` are kept as they are.
+    """
+    inspector = inspect(engine)
+    selected_schemas = select_schemas(inspector.get_schema_names(), schemas, exclude)
+    stamps = get_object_stamps(engine, selected_schemas, reflect_views)
+    changes = CatalogChanges()
+    tables_by_schema: dict[str, dict[str, dict[str, Any]]] = {}
+    to_reflect_by_schema: dict[str, list[str]] = {}
+    for schema in selected_schemas:
+        previous_tables: dict[str, Any] = previous.get(schema) or {}
+        if not isinstance(previous_tables, dict):
+            # metadata files with only table names have nothing to reuse
+            previous_tables = {}
+        to_reflect: list[str] = []
+        tables: dict[str, dict[str, Any]] = {}
+        for table_name, stamp in sorted(stamps[schema].items()):
+            if is_table_excluded(schema, table_name, exclude):
+                continue
+            previous_table = previous_tables.get(table_name)
+            if previous_table is None:
+                changes.added.append(f"{schema}.{table_name}")
+                to_reflect.append(table_name)
+            elif previous_table.get("stamp") != stamp:
+                changes.changed.append(f"{schema}.{table_name}")
+                to_reflect.append(table_name)
+            else:
+                tables[table_name] = previous_table
+                changes.unchanged += 1
+        changes.dropped += [
+            f"{schema}.{table_name}"
+            for table_name in previous_tables
+            if table_name not in stamps[schema]
+        ]
+        tables_by_schema[schema] = tables
+        if to_reflect:
+            to_reflect_by_schema[schema] = to_reflect
+
+    def reflect(schema: str) -> dict[str, TableRecords]:
+        return _reflect_changed_tables(
+            engine, schema, to_reflect_by_schema[schema], reflect_views
+        )
+
+    if jobs > 1 and len(to_reflect_by_schema) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            reflected = dict(
+                zip(to_reflect_by_schema, executor.map(reflect, to_reflect_by_schema))
+            )
+    else:
+        reflected = {schema: reflect(schema) for schema in to_reflect_by_schema}
+    for schema, table_records in reflected.items():
+        tables_by_schema[schema].update(
+            build_catalog_tables(schema, table_records, exclude)
+        )
+
+    metadata: CatalogMetadata = {}
+    if schemas:
+        metadata.update(
+            (schema, tables)
+            for schema, tables in previous.items()
+            if schema not in tables_by_schema
+        )
+    for schema, tables in tables_by_schema.items():
+        metadata[schema] = {
+            table_name: tables[table_name] for table_name in sorted(tables)
+        }
+    set_catalog_stamps(metadata, stamps)
+    return metadata, changes
@@ -0,0 +1,362 @@
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from fnmatch import fnmatch
+from typing import Any, Iterable
+
+from sqlalchemy import Inspector, MetaData, bindparam, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.reflection import ObjectKind
+
+from db_utils.config import excluded_schemas
+from db_utils.inspect.table.main import build_table_schema
+
+# raw reflection records per table, in the format of the SQLAlchemy inspector
+TableRecords = dict[str, Any]
+# {schema: {table: asdict(TableSchema)}}
+CatalogMetadata = dict[str, dict[str, dict[str, Any]]]
+
+
+@dataclass
+class SchemaGroupReflection:
+    schemas: list[str]
+    tables: dict[str, dict[str, TableRecords]]
+    elapsed: float
+
+    @property
+    def table_count(self) -> int:
+        return sum(len(tables) for tables in self.tables.values())
+
+
+def select_schemas(
+    schema_names: Iterable[str],
+    schemas: list[str] | None = None,
+    exclude: list[str] | None = None,
+) -> list[str]:
+    """Filter schema names given an include list and exclude glob patterns.
+
+    System schemas are always excluded unless explicitly requested.
+    """
+    selected = []
+    for schema in schema_names:
+        if schemas:
+            if schema not in schemas:
+                continue
+        elif schema.lower() in excluded_schemas or schema.startswith("db_"):
+            continue
+        if any(fnmatch(schema, pattern) for pattern in exclude or []):
+            continue
+        selected.append(schema)
+    return selected
+
+
+def is_table_excluded(schema: str, table_name: str, exclude: list[str] | None) -> bool:
+    """Check if `schema.table` matches any of the exclude glob patterns."""
+    return any(fnmatch(f"{schema}.{table_name}", pattern) for pattern in exclude or [])
+
+
+def get_multi_table_records(
+    inspector: Inspector,
+    schema: str,
+    reflect_views: bool = False,
+    filter_names: list[str] | None = None,
+) -> dict[str, TableRecords]:
+    """Reflect columns, PK and FKs of every table in a schema.
+
+    Uses the `Inspector.get_multi_*` methods, which dialects that implement
+    bulk reflection (e.g. PostgreSQL) resolve in a single query per call
+    instead of one query per table.
+    """
+    kind = ObjectKind.TABLE | ObjectKind.VIEW if reflect_views else ObjectKind.TABLE
+    columns = inspector.get_multi_columns(
+        schema=schema, kind=kind, filter_names=filter_names
+    )
+    pks = inspector.get_multi_pk_constraint(
+        schema=schema, kind=kind, filter_names=filter_names
+    )
+    fks = inspector.get_multi_foreign_keys(
+        schema=schema, kind=kind, filter_names=filter_names
+    )
+    records: dict[str, TableRecords] = {}
+    for (_, table_name), table_columns in columns.items():
+        records[table_name] = {
+            "columns": table_columns,
+            "pk": pks.get((schema, table_name)),
+            "fks": fks.get((schema, table_name), []),
+        }
+    return records
+
+
+def _mssql_type_string(
+    data_type: str,
+    max_length: int | None,
+    precision: int | None,
+    scale: int | None,
+) -> str:
+    """Render an INFORMATION_SCHEMA type like SQLAlchemy does with `str(type)`."""
+    type_str = data_type.upper()
+    if max_length is not None and type_str not in ("TEXT", "NTEXT", "XML", "IMAGE"):
+        return f"{type_str}({'max' if max_length == -1 else max_length})"
+    if type_str in ("DECIMAL", "NUMERIC") and precision is not None:
+        return f"{type_str}({precision}, {scale})"
+    return type_str
+
+
+def get_mssql_catalog_records(
+    inspector: Inspector,
+    schemas: list[str],
+    reflect_views: bool = False,
+    filter_names: list[str] | None = None,
+) -> dict[str, dict[str, TableRecords]]:
+    """Reflect columns, PK and FKs of every table of the given schemas.
+
+    The SQL Server dialect does not implement bulk reflection, so the catalog
+    views are queried directly: three queries for the whole database.
+    """
+    table_types = ["BASE TABLE", "VIEW"] if reflect_views else ["BASE TABLE"]
+    params: dict[str, list[str]] = {"schemas": schemas, "table_types": table_types}
+    columns_filter = pks_filter = fks_filter = ""
+    if filter_names is not None:
+        params["filter_names"] = filter_names
+        columns_filter = "AND c.TABLE_NAME IN :filter_names"
+        pks_filter = "AND tc.TABLE_NAME IN :filter_names"
+        fks_filter = "AND pt.name IN :filter_names"
+    key_params = {k: v for k, v in params.items() if k != "table_types"}
+    columns_query = text(
+        f"""
+        SELECT c.TABLE_SCHEMA, c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE,
+               c.CHARACTER_MAXIMUM_LENGTH, c.NUMERIC_PRECISION, c.NUMERIC_SCALE,
+               c.IS_NULLABLE
+          FROM INFORMATION_SCHEMA.COLUMNS c
+          JOIN INFORMATION_SCHEMA.TABLES t
+            ON t.TABLE_SCHEMA = c.TABLE_SCHEMA
+           AND t.TABLE_NAME = c.TABLE_NAME
+         WHERE c.TABLE_SCHEMA IN :schemas
+           AND t.TABLE_TYPE IN :table_types
+               {columns_filter}
+         ORDER BY c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION
+        """
+    ).bindparams(*[bindparam(name, expanding=True) for name in params])
+    pks_query = text(
+        f"""
+        SELECT tc.TABLE_SCHEMA, tc.TABLE_NAME, tc.CONSTRAINT_NAME, kcu.COLUMN_NAME
+          FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+          JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
+            ON kcu.CONSTRAINT_SCHEMA = tc.CONSTRAINT_SCHEMA
+           AND kcu.CONSTRAINT_NAME = tc.CONSTRAINT_NAME
+         WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+           AND tc.TABLE_SCHEMA IN :schemas
+               {pks_filter}
+         ORDER BY tc.TABLE_SCHEMA, tc.TABLE_NAME, kcu.ORDINAL_POSITION
+        """
+    ).bindparams(*[bindparam(name, expanding=True) for name in key_params])
+    fks_query = text(
+        f"""
+        SELECT SCHEMA_NAME(pt.schema_id), pt.name, fk.name, pc.name,
+               rt.name, rc.name
+          FROM sys.foreign_key_columns fkc
+          JOIN sys.foreign_keys fk ON fk.object_id = fkc.constraint_object_id
+          JOIN sys.tables pt ON pt.object_id = fkc.parent_object_id
+          JOIN sys.columns pc
+            ON pc.object_id = fkc.parent_object_id
+           AND pc.column_id = fkc.parent_column_id
+          JOIN sys.tables rt ON rt.object_id = fkc.referenced_object_id
+          JOIN sys.columns rc
+            ON rc.object_id = fkc.referenced_object_id
+           AND rc.column_id = fkc.referenced_column_id
+         WHERE SCHEMA_NAME(pt.schema_id) IN :schemas
+               {fks_filter}
+         ORDER BY fk.name, fkc.constraint_column_id
+        """
+    ).bindparams(*[bindparam(name, expanding=True) for name in key_params])
+
+    records: dict[str, dict[str, TableRecords]] = defaultdict(dict)
+    with inspector.bind.connect() as connection:
+        columns_rows = connection.execute(columns_query, params)
+        for schema, table_name, name, data_type, *type_args, nullable in columns_rows:
+            table_records = records[schema].setdefault(
+                table_name, {"columns": [], "pk": None, "fks": []}
+            )
+            table_records["columns"].append(
+                {
+                    "name": name,
+                    "type": _mssql_type_string(data_type, *type_args),
+                    "nullable": nullable == "YES",
+                }
+            )
+        for schema, table_name, pk_name, column_name in connection.execute(
+            pks_query, key_params
+        ):
+            if table_name not in records[schema]:
+                continue
+            pk = records[schema][table_name]["pk"]
+            if pk is None:
+                pk = {"name": pk_name, "constrained_columns": []}
+                records[schema][table_name]["pk"] = pk
+            pk["constrained_columns"].append(column_name)
+        fks_by_name: dict[tuple[str, str], dict[str, Any]] = {}
+        for row in connection.execute(fks_query, key_params):
+            schema, table_name, fk_name, column, referred_table, referred_column = row
+            if table_name not in records[schema]:
+                continue
+            fk = fks_by_name.get((schema, fk_name))
+            if fk is None:
+                fk = {
+                    "name": fk_name,
+                    "constrained_columns": [],
+                    "referred_table": referred_table,
+                    "referred_columns": [],
+                }
+                fks_by_name[(schema, fk_name)] = fk
+                records[schema][table_name]["fks"].append(fk)
+            fk["constrained_columns"].append(column)
+            fk["referred_columns"].append(referred_column)
+    return records
+
+
+def build_catalog_tables(
+    schema: str,
+    table_records: dict[str, TableRecords],
+    exclude: list[str] | None = None,
+) -> dict[str, dict[str, Any]]:
+    """Build the catalog entries of a schema from its reflection records."""
+    tables: dict[str, dict[str, Any]] = {}
+    for table_name in sorted(table_records):
+        if is_table_excluded(schema, table_name, exclude):
+            continue
+        records = table_records[table_name]
+        table_schema = build_table_schema(
+            table_name,
+            columns=records["columns"],
+            pk=records["pk"],
+            fks=records["fks"],
+            extra=True,
+        )
+        tables[table_name] = asdict(table_schema)
+    return tables
+
+
+def get_schema_groups(
+    dialect_name: str, schemas: list[str], jobs: int = 1
+) -> list[list[str]]:
+    """Split schemas in the units of work reflected by each job.
+
+    SQL Server reflects many schemas in the same catalog queries, so schemas
+    are spread across at most `jobs` groups. Other dialects reflect a schema
+    at a time.
+    """
+    if dialect_name == "mssql":
+        groups = [schemas[i :: max(jobs, 1)] for i in range(max(jobs, 1))]
+        return [group for group in groups if group]
+    return [[schema] for schema in schemas]
+
+
+def reflect_schema_group(
+    engine: Engine, schemas: list[str], reflect_views: bool = False
+) -> SchemaGroupReflection:
+    """Reflect the tables of a group of schemas using its own inspector."""
+    start_time = time.perf_counter()
+    inspector = inspect(engine)
+    if inspector.dialect.name == "mssql":
+        tables = get_mssql_catalog_records(inspector, schemas, reflect_views)
+    else:
+        tables = {
+            schema: get_multi_table_records(inspector, schema, reflect_views)
+            for schema in schemas
+        }
+    return SchemaGroupReflection(
+        schemas=schemas, tables=tables, elapsed=time.perf_counter() - start_time
+    )
+
+
+def reflect_catalog(
+    engine: Engine,
+    schemas: list[str] | None = None,
+    exclude: list[str] | None = None,
+    reflect_views: bool = False,
+    jobs: int = 1,
+    schema_names: list[str] | None = None,
+) -> tuple[CatalogMetadata, list[SchemaGroupReflection]]:
+    """Reflect tables with their columns, PK and FKs for the selected schemas.
+
+    With `jobs` greater than one, schema groups are reflected concurrently in
+    a thread pool; the engine pool should allow that many connections.
+    `schema_names` are the schemas of the database when already known, to
+    skip listing them again.
+
+    Return:
+        A dictionary `{schema: {table: table_schema}}` where `table_schema` is
+        the `TableSchema` of the table as a dictionary, and the reflection of
+        each schema group, which includes its timing.
+    """
+    if schema_names is None:
+        schema_names = inspect(engine).get_schema_names()
+    selected_schemas = select_schemas(schema_names, schemas, exclude)
+    schema_groups = get_schema_groups(engine.dialect.name, selected_schemas, jobs)
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            reflections = list(
+                executor.map(
+                    lambda group: reflect_schema_group(engine, group, reflect_views),
+                    schema_groups,
+                )
+            )
+    else:
+        reflections = [
+            reflect_schema_group(engine, group, reflect_views)
+            for group in schema_groups
+        ]
+    records_by_schema: dict[str, dict[str, TableRecords]] = {}
+    for reflection in reflections:
+        records_by_schema.update(reflection.tables)
+
+    metadata: CatalogMetadata = {
+        schema: build_catalog_tables(schema, records_by_schema.get(schema, {}), exclude)
+        for schema in selected_schemas
+    }
+    return metadata, reflections
+
+
+def reflect_metadata(
+    engine: Engine,
+    schema: str | None = None,
+    tables: list[str] | None = None,
+    jobs: int = 1,
+    views: bool = False,
+    metadata: MetaData | None = None,
+) -> MetaData:
+    """Reflect tables of a schema into a `MetaData` object.
+
+    With `jobs` greater than one, tables are split in groups reflected
+    concurrently into separate `MetaData` objects, which are merged in table
+    name order. Tables are added to `metadata` when given, so several schemas
+    can be reflected into the same object.
+    """
+    if metadata is None:
+        metadata = MetaData()
+    if jobs <= 1:
+        metadata.reflect(engine, schema=schema, views=views, only=tables or None)
+        return metadata
+
+    if not tables:
+        inspector = inspect(engine)
+        tables = inspector.get_table_names(schema=schema)
+        if views:
+            tables += inspector.get_view_names(schema=schema)
+    table_names = sorted(tables)
+    table_groups = [table_names[i::jobs] for i in range(jobs) if table_names[i::jobs]]
+
+    def reflect_group(table_group: list[str]) -> MetaData:
+        group_metadata = MetaData()
+        group_metadata.reflect(engine, schema=schema, views=views, only=table_group)
+        return group_metadata
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        group_metadatas = list(executor.map(reflect_group, table_groups))
+    # tables referenced by FKs are reflected by more than one group
+    for group_metadata in group_metadatas:
+        for key in sorted(group_metadata.tables):
+            if key not in metadata.tables:
+                group_metadata.tables[key].to_metadata(metadata)
+    return metadata
@@ -2,46 +2,41 @@ import json
 import os
 import subprocess
 import sys
-import time
 from dataclasses import dataclass
-from typing import Annotated, Dict, Optional, TypedDict
+from typing import TYPE_CHECKING, Annotated, Optional, TypedDict
 
-import pyperclip
 import typer
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
-from sqlalchemy import create_engine, inspect, text
-from sqlalchemy.engine import make_url
-from sqlalchemy.engine.url import URL
-from sqlparse import format as format_sql
 
-from db_utils.enums import FormatKeyWordOption
-from db_utils.url import cli as cli_url
+from db_utils.enums import FormatKeyWordOption, IfTableExists
 
-from .autogen import cli as cli_autogen
-from .cli_utils import typer_error_msg_to_stdout
+from .cli_utils import LazySubcommand, LazyTyperGroup, typer_error_msg_to_stdout
 from .config import db_metadata_filename, db_url_default_key_name
-from .exceptions import NoDBUrlFoundException
-from .inspect import cli as cli_inspect
-from .run import cli as cli_run
+from .exceptions import NoDBUrlFoundException, UnsupportedDialectError
 from .utils import (
     get_db_conn_template_from_url,
     get_db_url_from_env_file,
     get_db_url_key_list_from_env_file,
     get_standard_db_url_from_sqla,
 )
-from .viewgen.trigger_generator import inspect_related_tables
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine.url import URL
+
+    from .benchmark.load import LoadResult
+    from .catalog.incremental import CatalogChanges
+    from .catalog.main import SchemaGroupReflection
 
 
 class CLIState(TypedDict, total=False):
-    db_url: URL
+    db_url: "URL"
     db_url_string: str
 
 
 @dataclass
 class State:
-    db_url: URL
+    db_url: "URL"
 
     @property
     def db_url_string(self) -> str:
@@ -50,14 +45,33 @@ class State:
 
 state: CLIState = {}
 
+
 # SECTION: App definition
-app = typer.Typer()
+class DbuGroup(LazyTyperGroup):
+    # sub-apps are imported only when one of their commands runs
+    lazy_subcommands = {
+        "table": LazySubcommand(
+            "db_utils.autogen.cli:app", "Autogenerate models/tables from database."
+        ),
+        "inspect": LazySubcommand(
+            "db_utils.inspect.cli:app", "Inspect database and tables."
+        ),
+        "url": LazySubcommand("db_utils.url.cli:app", "Database URL utils"),
+        "run": LazySubcommand("db_utils.run.cli:app"),
+        "explain": LazySubcommand(
+            "db_utils.explain.cli:app", "Capture and compare query execution plans."
+        ),
+        "daemon": LazySubcommand(
+            "db_utils.daemon.cli:app",
+            "Run a local broker keeping database connections warm.",
+        ),
+        "diff": LazySubcommand(
+            "db_utils.diff.cli:app", "Compare data between databases."
+        ),
+    }
+
 
-# app.add_typer(cli_autogen.app, name="autogen")
-app.add_typer(cli_autogen.app, name="table")
-app.add_typer(cli_inspect.app, name="inspect")
-app.add_typer(cli_url.app, name="url")
-app.add_typer(cli_run.app, name="run")
+app = typer.Typer(cls=DbuGroup)
 
 # for table pretty output
 console = Console()
@@ -105,6 +119,8 @@ def callback(
                     fg=typer.colors.YELLOW,
                 )
     else:
+        from sqlalchemy.engine import make_url
+
         db_url_obj = make_url(db_url)
     if db_url_obj:
         state["db_url"] = db_url_obj
@@ -126,6 +142,9 @@ def format(
     """
     Format SQL query and copy it to clipboard. If not argument is given use clipboard.
     """
+    import pyperclip
+    from sqlparse import format as format_sql
+
     if not sys.stdin.isatty():
         sql_query = sys.stdin.read()
     elif sql_query is None:
@@ -160,6 +179,8 @@ def url(
     """
     Show the database URL and copy it to clipboard.
     """
+    import pyperclip
+
     try:
         db_url = state["db_url"]
     except KeyError:
@@ -186,6 +207,8 @@ def connect(db_url_string: str = typer.Argument("")):
     """
     Connect to interactive shell using usql.
     """
+    from sqlalchemy.engine import make_url
+
     if not db_url_string:
         try:
             db_url = state["db_url"]
@@ -203,10 +226,57 @@ def connect(db_url_string: str = typer.Argument("")):
 
 
 @app.command()
-def time_query(query: str = typer.Argument(...)):
+def time_query(
+    query: str = typer.Argument(...),
+    iterations: Annotated[
+        int, typer.Option("--iterations", "-n", min=1, help="Timed runs")
+    ] = 1,
+    warmup: Annotated[
+        int, typer.Option("--warmup", "-w", min=0, help="Untimed runs made first")
+    ] = 0,
+    json_file: Annotated[
+        Optional[str],
+        typer.Option("--json", help="Write the samples and statistics to a JSON file"),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(
+            "--concurrency", "-c", min=1, help="Workers running the query (load mode)"
+        ),
+    ] = 1,
+    duration: Annotated[
+        Optional[str],
+        typer.Option("--duration", "-d", help="Load mode duration, e.g. 30s, 5m"),
+    ] = None,
+    rate: Annotated[
+        Optional[float],
+        typer.Option("--rate", "-r", min=0.001, help="Load mode queries per second"),
+    ] = None,
+    timeout: Annotated[
+        Optional[float],
+        typer.Option(
+            "--timeout",
+            help="Load mode seconds after which the server cancels a query "
+            "(Postgres, SQL Server and SQLite)",
+        ),
+    ] = None,
+):
     """
     Time a query in seconds.
+
+    Connect, execute, first row and full fetch are timed separately, on a new
+    connection for every run. The query transaction is rolled back.
+
+    With --concurrency, --duration or --rate, the query is run in a loop from
+    concurrent workers instead, reporting throughput, latencies and errors.
     """
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+
+    from .benchmark.load import parse_duration, run_load
+    from .benchmark.main import run_benchmark
+
     try:
         db_url = state["db_url"]
     except KeyError:
@@ -214,56 +284,390 @@ def time_query(query: str = typer.Argument(...)):
             f"No '{db_url_default_key_name}' environmental variable in file or invalid URL"
         )
 
-    start_time = time.perf_counter()
-    engine = create_engine(db_url)
-    with engine.connect() as connection:
-        print(f"Timing '{query}'...")
-        connection.execute(text(query))
-    end_time = time.perf_counter()
+    if concurrency > 1 or duration or rate:
+        try:
+            duration_seconds = parse_duration(duration or "10s")
+        except ValueError as e:
+            typer_error_msg_to_stdout(e)
+        engine = create_engine(db_url, pool_size=concurrency, max_overflow=0)
+        print(
+            f"Loading '{query}' with {concurrency} workers for {duration_seconds:g}s..."
+        )
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[bold blue]{task.description}"),
+            transient=True,
+        ) as progress:
+            task = progress.add_task("Starting...")
+            load_result = run_load(
+                engine,
+                query,
+                concurrency,
+                duration_seconds,
+                rate,
+                timeout,
+                on_progress=lambda elapsed, completed: progress.update(
+                    task, description=f"{elapsed:0.0f}s, {completed} queries"
+                ),
+            )
+        print_load_result(load_result)
+        if json_file:
+            with open(json_file, "w") as f:
+                json.dump(load_result.to_dict(), f, indent=2)
+            typer.secho(f"Results written to '{json_file}'", fg=typer.colors.GREEN)
+        return
+
+    engine = create_engine(db_url, poolclass=NullPool)
+    print(f"Timing '{query}'...")
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[bold blue]{task.description}"),
+        transient=True,
+    ) as progress:
+        task = progress.add_task("Warming up...", total=iterations)
+        result = run_benchmark(
+            engine,
+            query,
+            iterations,
+            warmup,
+            on_sample=lambda i, _: progress.update(
+                task, description=f"Run {i + 1}/{iterations}", completed=i + 1
+            ),
+        )
+
+    stats_table = Table(show_header=True, header_style="bold magenta")
+    stat_names = ["min", "p50", "p90", "p99", "max", "stddev"]
+    stats_table.add_column("Phase (ms)")
+    for stat_name in stat_names:
+        stats_table.add_column(stat_name, justify="right")
+    for phase, stats in result.stats().items():
+        stats_table.add_row(
+            phase,
+            *[f"{getattr(stats, stat_name) * 1000:0.3f}" for stat_name in stat_names],
+        )
+    console.print(stats_table)
+    typer.secho(
+        f"Query took {result.stats()['total'].p50:0.4f} seconds (p50 of "
+        f"{iterations} runs, {result.samples[-1].rows} rows)",
+        fg=typer.colors.GREEN,
+    )
+    if json_file:
+        with open(json_file, "w") as f:
+            json.dump(result.to_dict(), f, indent=2)
+        typer.secho(f"Results written to '{json_file}'", fg=typer.colors.GREEN)
+
+
+def print_load_result(result: "LoadResult") -> None:
+    from .benchmark.load import latency_histogram
+    from .benchmark.main import get_latency_stats
+
+    intervals_table = Table(show_header=True, header_style="bold magenta")
+    for column_name in ["Second", "QPS", "Errors", "Timeouts", "p50 ms", "p99 ms"]:
+        intervals_table.add_column(column_name, justify="right")
+    for interval in result.intervals():
+        stats = get_latency_stats(interval.latencies)
+        intervals_table.add_row(
+            f"{interval.start:g}",
+            str(interval.completed),
+            str(interval.errors),
+            str(interval.timeouts),
+            f"{stats.p50 * 1000:0.2f}",
+            f"{stats.p99 * 1000:0.2f}",
+        )
+    console.print(intervals_table)
+
+    histogram_table = Table(show_header=True, header_style="bold magenta")
+    histogram_table.add_column("Latency ≤ ms", justify="right")
+    histogram_table.add_column("Queries", justify="right")
+    histogram_table.add_column("")
+    histogram = latency_histogram(result.latencies())
+    while len(histogram) > 1 and histogram[-1][1] == 0:
+        histogram.pop()
+    max_count = max(count for _, count in histogram) or 1
+    for bound, count in histogram:
+        histogram_table.add_row(
+            f"{bound * 1000:g}", str(count), "█" * round(40 * count / max_count)
+        )
+    console.print(histogram_table)
+
+    for message, count in result.error_messages.items():
+        typer.secho(f"{count} x {message}", fg=typer.colors.RED)
+    stats = get_latency_stats(result.latencies())
     typer.secho(
-        f"Query took {end_time - start_time:0.4f} seconds", fg=typer.colors.GREEN
+        f"{result.count('ok')} queries in {result.elapsed:0.1f}s: "
+        f"{result.qps:0.1f} qps, p50 {stats.p50 * 1000:0.2f} ms, "
+        f"p99 {stats.p99 * 1000:0.2f} ms, {result.count('error')} errors, "
+        f"{result.count('timeout')} timeouts",
+        fg=typer.colors.GREEN,
     )
 
 
-def create_db_metadata_files(
-    db_url: str, reflect_views: bool = False, schema: str | None = None
+@app.command()
+def copy(
+    table_name: Annotated[str, typer.Argument(help="Table to copy")],
+    source_key: Annotated[
+        Optional[str],
+        typer.Option(
+            "--source-key",
+            help="Env-file key of the source database URL, the default database "
+            "when not given.",
+            autocompletion=get_db_url_key_list_from_env_file,
+        ),
+    ] = None,
+    target_key: Annotated[
+        Optional[str],
+        typer.Option(
+            "--target-key",
+            help="Env-file key of the target database URL.",
+            autocompletion=get_db_url_key_list_from_env_file,
+        ),
+    ] = None,
+    source_url: Annotated[
+        Optional[str], typer.Option("--source-url", help="Source database URL")
+    ] = None,
+    target_url: Annotated[
+        Optional[str], typer.Option("--target-url", help="Target database URL")
+    ] = None,
+    schema: Annotated[Optional[str], typer.Option("--schema", "-s")] = None,
+    target_table: Annotated[
+        Optional[str],
+        typer.Option("--target-table", "-t", help="Target table name"),
+    ] = None,
+    target_schema: Annotated[
+        Optional[str], typer.Option("--target-schema", help="Target schema")
+    ] = None,
+    if_exists: Annotated[
+        IfTableExists,
+        typer.Option("--if-exists", help="What to do when the target table exists"),
+    ] = IfTableExists.fail,
+    batch_size: Annotated[
+        int, typer.Option("--batch-size", "-b", min=1, help="Rows per batch")
+    ] = 10000,
+    queue_size: Annotated[
+        int,
+        typer.Option("--queue-size", min=1, help="Batches read ahead of the writer"),
+    ] = 4,
+    commit_rows: Annotated[
+        int,
+        typer.Option("--commit-rows", min=1, help="Rows written per transaction"),
+    ] = 100000,
+    env_file: Annotated[
+        str, typer.Option("--env-file", help="Path to env-file.")
+    ] = ".env",
 ):
+    """
+    Copy a table between databases.
+
+    The target table is created from the source DDL. Rows are streamed from
+    the source and written with the bulk path of the target: COPY on
+    Postgres, fast_executemany on MSSQL and batched executemany otherwise.
+    """
+    from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import DBAPIError
+
+    from .cli_utils import resolve_db_url
+    from .transfer.main import copy_table
+
+    source_engine = create_engine(
+        resolve_db_url(env_file, source_key, source_url, "source")
+    )
+    target_engine = create_engine(
+        resolve_db_url(env_file, target_key, target_url, "target")
+    )
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[bold blue]{task.description}"),
+        TextColumn("{task.completed:,.0f} rows"),
+        TimeElapsedColumn(),
+        console=Console(stderr=True),
+        transient=True,
+    ) as progress:
+        task = progress.add_task(f"Copying {table_name}", total=None)
+        try:
+            result = copy_table(
+                source_engine,
+                target_engine,
+                table_name,
+                schema=schema,
+                target_table_name=target_table,
+                target_schema=target_schema,
+                if_exists=if_exists,
+                batch_size=batch_size,
+                queue_size=queue_size,
+                commit_rows=commit_rows,
+                on_progress=lambda rows: progress.update(task, completed=rows),
+            )
+        except ValueError as e:
+            typer_error_msg_to_stdout(e)
+        except DBAPIError as e:
+            typer_error_msg_to_stdout(e.orig)
+    typer.secho(
+        f"{result.rows:,} rows copied in {result.seconds:.2f}s "
+        f"({result.rows_per_second:,.0f} rows/s)",
+        err=True,
+    )
+
+
+def create_db_metadata_files(
+    db_url: str,
+    reflect_views: bool = False,
+    schemas: list[str] | None = None,
+    exclude: list[str] | None = None,
+    jobs: int = 1,
+) -> list["SchemaGroupReflection"]:
     """
     Create a file with the metadata of the database.
     """
-    engine = create_engine(db_url)
-    inspector = inspect(engine)
-    metadata: Dict[str, list] = {}
-    for db_schema in inspector.get_schema_names():
-        if db_schema:
-            if db_schema != schema:
-                continue
-        metadata[db_schema] = []
-        tables = inspector.get_table_names(schema=db_schema)
-        if reflect_views:
-            tables.extend(inspector.get_view_names(schema=db_schema))
-        for table_name in tables:
-            metadata[db_schema].append(table_name)
-    with open(".db_metadata.json", "w") as f:
+    from sqlalchemy import create_engine, inspect
+
+    from .catalog.cache import CatalogCache
+    from .catalog.completion import write_completion_index
+    from .catalog.incremental import get_object_stamps, set_catalog_stamps
+    from .catalog.main import reflect_catalog, select_schemas
+
+    engine = create_engine(db_url, pool_size=max(jobs, 1), max_overflow=0)
+    schema_names = inspect(engine).get_schema_names()
+    try:
+        stamps = get_object_stamps(
+            engine, select_schemas(schema_names, schemas, exclude), reflect_views
+        )
+    except UnsupportedDialectError:
+        stamps = {}
+    metadata, reflections = reflect_catalog(
+        engine, schemas, exclude, reflect_views, jobs, schema_names
+    )
+    set_catalog_stamps(metadata, stamps)
+    with open(db_metadata_filename, "w") as f:
         json.dump(metadata, f, indent=2)
+    write_completion_index(metadata)
+    with CatalogCache() as catalog_cache:
+        catalog_cache.set_catalog(engine.url, metadata)
+    return reflections
+
+
+def refresh_db_metadata_files(
+    db_url: str,
+    reflect_views: bool = False,
+    schemas: list[str] | None = None,
+    exclude: list[str] | None = None,
+    jobs: int = 1,
+) -> "CatalogChanges":
+    """
+    Update the metadata file of the database reflecting only changed tables.
+    """
+    from sqlalchemy import create_engine
+
+    from .catalog.cache import CatalogCache
+    from .catalog.completion import write_completion_index
+    from .catalog.incremental import refresh_catalog
+
+    engine = create_engine(db_url, pool_size=max(jobs, 1), max_overflow=0)
+    previous = {}
+    if os.path.exists(db_metadata_filename):
+        with open(db_metadata_filename, "r") as f:
+            previous = json.load(f)
+    metadata, changes = refresh_catalog(
+        engine, previous, schemas, exclude, reflect_views, jobs
+    )
+    with open(db_metadata_filename, "w") as f:
+        json.dump(metadata, f, indent=2)
+    write_completion_index(metadata)
+    with CatalogCache() as catalog_cache:
+        for table in changes.dropped:
+            catalog_cache.invalidate(engine.url, *table.split(".", 1))
+        catalog_cache.set_catalog(
+            engine.url,
+            {
+                schema: {
+                    table_name: table
+                    for table_name, table in tables.items()
+                    if f"{schema}.{table_name}" in changes.reflected
+                }
+                for schema, tables in metadata.items()
+            },
+        )
+    return changes
 
 
 @app.command()
 def create_metatada(
     ctx: typer.Context,
     reflect_views: bool = typer.Option(False),
-    schema: str = typer.Option(None),
+    schemas: Annotated[
+        Optional[list[str]],
+        typer.Option(
+            ..., "--schemas", "--schema", "-s", help="Schemas to include (repeatable)."
+        ),
+    ] = None,
+    exclude: Annotated[
+        Optional[list[str]],
+        typer.Option(
+            ...,
+            "--exclude",
+            "-x",
+            help="Glob patterns of 'schema' or 'schema.table' to exclude (repeatable).",
+        ),
+    ] = None,
+    jobs: Annotated[
+        int, typer.Option(..., "--jobs", "-j", help="Schemas reflected in parallel.")
+    ] = 1,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            ...,
+            "--incremental",
+            "-i",
+            help="Only reflect tables changed since the last metadata file.",
+        ),
+    ] = False,
 ):
     """
     Create a file with the metadata of the database.
     """
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    if incremental:
+        try:
+            changes = refresh_db_metadata_files(
+                ctx.obj.db_url_string, reflect_views, schemas, exclude, jobs
+            )
+        except UnsupportedDialectError as e:
+            typer.secho(f"{e}, creating the whole file", fg=typer.colors.YELLOW)
+        else:
+            for label, tables in [
+                ("Added", changes.added),
+                ("Changed", changes.changed),
+                ("Dropped", changes.dropped),
+            ]:
+                for table_name in tables:
+                    typer.secho(f"{label}: {table_name}")
+            typer.secho(
+                f"{len(changes.reflected)} tables reflected, "
+                f"{len(changes.dropped)} dropped, {changes.unchanged} unchanged",
+                fg=typer.colors.GREEN,
+            )
+            return
     with Progress(
         SpinnerColumn(),
         TextColumn("[bold blue]{task.description}"),
         transient=False,
     ) as progress:
         progress.add_task("Creating metadata file...", total=100)
-        create_db_metadata_files(ctx.obj.db_url_string, reflect_views, schema)
+        reflections = create_db_metadata_files(
+            ctx.obj.db_url_string, reflect_views, schemas, exclude, jobs
+        )
+    timings_table = Table(show_header=True, header_style="bold magenta")
+    timings_table.add_column("Schemas")
+    timings_table.add_column("Tables", justify="right")
+    timings_table.add_column("Seconds", justify="right")
+    for reflection in reflections:
+        timings_table.add_row(
+            ", ".join(reflection.schemas),
+            str(reflection.table_count),
+            f"{reflection.elapsed:0.3f}",
+        )
+    console.print(timings_table)
     typer.secho(
         f"Metadata file created at '{os.path.join(os.getcwd(), db_metadata_filename)}'",
         fg=typer.colors.GREEN,
@@ -278,4 +682,6 @@ def viewgen(
     """
     Generate a view from a table that considers related tables given their foreign keys.
     """
+    from .viewgen.trigger_generator import inspect_related_tables
+
     inspect_related_tables(state["db_url_string"], table, schema)
@@ -1,6 +1,11 @@
-from typing import NoReturn
+import importlib
+import os
+from dataclasses import dataclass
+from typing import Any, NoReturn
 
+import click
 import typer
+from typer.core import TyperGroup
 
 
 def typer_error_msg_to_stdout(exc: Exception | str) -> NoReturn:
@@ -8,3 +13,82 @@ def typer_error_msg_to_stdout(exc: Exception | str) -> NoReturn:
         exc = str(exc)
     typer.secho(exc, fg=typer.colors.RED, err=True)
     raise typer.Exit(1)
+
+
+def resolve_db_url(env_file: str, key: str | None, url: str | None, side: str) -> str:
+    """Get the database URL of a `--<side>-url` or `--<side>-key` option.
+
+    The source falls back to the database URL of the main `--db-url` and
+    `--env-key-db-url` options.
+    """
+    from db_utils.config import db_url_default_key_name
+    from db_utils.exceptions import NoDBUrlFoundException
+    from db_utils.utils import get_db_url_from_env_file
+
+    if url:
+        return url
+    if key:
+        try:
+            db_url = get_db_url_from_env_file(env_file, key)
+        except (FileNotFoundError, NoDBUrlFoundException) as e:
+            typer_error_msg_to_stdout(e)
+        return db_url.render_as_string(hide_password=False)
+    if side == "source" and db_url_default_key_name in os.environ:
+        return os.environ[db_url_default_key_name]
+    typer_error_msg_to_stdout(f"Give the {side} database with --{side}-key")
+
+
+@dataclass
+class LazySubcommand:
+    # "module:attribute" of the Typer app
+    import_path: str
+    help: str = ""
+
+
+class LazyTyperGroup(TyperGroup):
+    """Typer group importing its `lazy_subcommands` apps on first use.
+
+    Help and completion of the group itself list the sub-apps from their
+    registry help, without importing them.
+    """
+
+    lazy_subcommands: dict[str, LazySubcommand] = {}
+    _use_placeholders = False
+
+    def __init__(self, **attrs: Any) -> None:
+        super().__init__(**attrs)
+        # sub-apps take over commands of the same name, as with `add_typer`
+        for name in self.lazy_subcommands:
+            self.commands.pop(name, None)
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_subcommands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        command = super().get_command(ctx, cmd_name)
+        if command is not None or cmd_name not in self.lazy_subcommands:
+            return command
+        lazy_subcommand = self.lazy_subcommands[cmd_name]
+        if self._use_placeholders:
+            return click.Command(
+                cmd_name, help=lazy_subcommand.help, short_help=lazy_subcommand.help
+            )
+        module_name, attribute = lazy_subcommand.import_path.split(":")
+        sub_app = getattr(importlib.import_module(module_name), attribute)
+        command = typer.main.get_group(sub_app)
+        command.name = cmd_name
+        self.add_command(command, cmd_name)
+        return command
+
+    def _with_placeholders(self, method, *args: Any) -> Any:
+        self._use_placeholders = True
+        try:
+            return method(*args)
+        finally:
+            self._use_placeholders = False
+
+    def format_help(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        self._with_placeholders(super().format_help, ctx, formatter)
+
+    def shell_complete(self, ctx: click.Context, incomplete: str) -> list[Any]:
+        return self._with_placeholders(super().shell_complete, ctx, incomplete)
@@ -1,3 +1,7 @@
 db_url_default_key_name = "DB_CONNECTION_URL"
 db_metadata_filename = ".db_metadata.json"
-output_options = ["tsv", "table", "json"]
+output_options = ["tsv", "table", "json", "csv", "jsonl", "parquet", "arrow"]
+excluded_schemas = ["information_schema", "pg_catalog", "sys", "guest"]
+catalog_cache_filename = "catalog.db"
+db_metadata_index_filename = ".db_metadata.idx"
+plan_snapshots_dirname = ".db_plans"
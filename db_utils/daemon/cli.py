@@ -0,0 +1,147 @@
+import os
+import subprocess
+import sys
+import time
+from typing import Annotated
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from db_utils.cli_utils import typer_error_msg_to_stdout
+from db_utils.daemon.client import DaemonClient, get_daemon_client
+from db_utils.daemon.protocol import DaemonError, get_log_path, get_socket_path
+from db_utils.exceptions import NoDBUrlFoundException
+from db_utils.utils import get_db_url_from_env_file, get_db_url_keys
+
+app = typer.Typer()
+
+console = Console()
+
+
+@app.callback()
+def callback():
+    """
+    Run a local broker keeping database connections warm.
+    """
+
+
+def _warm_connections(client: DaemonClient, env_file: str = ".env") -> None:
+    """Open a pooled connection for every database URL of the env-file."""
+    try:
+        keys = get_db_url_keys(env_file)
+    except (FileNotFoundError, NoDBUrlFoundException):
+        return
+    for key in keys:
+        db_url = get_db_url_from_env_file(env_file, key)
+        try:
+            client.connect(db_url)
+        except DaemonError as e:
+            typer.secho(f"{key}: {e}", fg=typer.colors.YELLOW, err=True)
+        else:
+            typer.secho(f"{key}: connected", err=True)
+
+
+@app.command()
+def start(
+    idle_timeout: Annotated[
+        float,
+        typer.Option(
+            "--idle-timeout", help="Seconds without requests before the daemon stops"
+        ),
+    ] = 3600,
+    engine_idle_timeout: Annotated[
+        float,
+        typer.Option(
+            "--engine-idle-timeout",
+            help="Seconds without requests before the connections of a URL close",
+        ),
+    ] = 900,
+    pool_size: Annotated[
+        int, typer.Option("--pool-size", min=1, help="Connections kept per URL")
+    ] = 5,
+    warm: Annotated[
+        bool,
+        typer.Option("--warm/--no-warm", help="Connect to the URLs of the env-file"),
+    ] = True,
+    env_file: Annotated[
+        str, typer.Option("--env-file", help="Env-file with the URLs to warm")
+    ] = ".env",
+    foreground: Annotated[
+        bool, typer.Option("--foreground", help="Run in the foreground")
+    ] = False,
+):
+    """
+    Start the connection broker daemon.
+    """
+    if get_daemon_client():
+        typer_error_msg_to_stdout("The daemon is already running")
+    args = [
+        sys.executable,
+        "-m",
+        "db_utils.daemon.server",
+        "--idle-timeout",
+        str(idle_timeout),
+        "--engine-idle-timeout",
+        str(engine_idle_timeout),
+        "--pool-size",
+        str(pool_size),
+    ]
+    if foreground:
+        os.execv(sys.executable, args)
+    subprocess.Popen(
+        args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 10
+    while not (client := get_daemon_client()):
+        if time.monotonic() > deadline:
+            typer_error_msg_to_stdout(
+                f"The daemon did not start, see the log at '{get_log_path()}'"
+            )
+        time.sleep(0.05)
+    typer.secho(
+        f"Daemon started, listening on '{get_socket_path()}'", fg=typer.colors.GREEN
+    )
+    if warm:
+        _warm_connections(client, env_file)
+
+
+@app.command()
+def stop():
+    """
+    Stop the connection broker daemon.
+    """
+    client = get_daemon_client()
+    if not client:
+        typer_error_msg_to_stdout("The daemon is not running")
+    client.call("shutdown")
+    typer.secho("Daemon stopped", fg=typer.colors.GREEN)
+
+
+@app.command()
+def status():
+    """
+    Check the daemon health and show its connection pools.
+    """
+    client = get_daemon_client()
+    if not client:
+        typer_error_msg_to_stdout("The daemon is not running")
+    daemon_status = client.call("status")
+    typer.secho(
+        f"Daemon running, pid {daemon_status['pid']}, "
+        f"up {daemon_status['uptime']:g}s",
+        fg=typer.colors.GREEN,
+    )
+    pools_table = Table(show_header=True, header_style="bold magenta")
+    pools_table.add_column("URL")
+    pools_table.add_column("Pool")
+    pools_table.add_column("Idle seconds", justify="right")
+    for engine in daemon_status["engines"]:
+        pools_table.add_row(
+            engine["url"], engine["pool"], f"{engine['idle_seconds']:g}"
+        )
+    console.print(pools_table)
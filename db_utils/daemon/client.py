@@ -0,0 +1,196 @@
+import os
+import socket
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterator, Sequence
+
+from db_utils.daemon.protocol import (
+    DaemonError,
+    decode_message,
+    decode_value,
+    encode_message,
+    encode_value,
+    get_socket_path,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine.url import URL
+
+
+def _url_string(db_url: "URL") -> str:
+    # the daemon may run from another directory than the client
+    database = db_url.database
+    if (
+        db_url.get_backend_name() == "sqlite"
+        and database
+        and database != ":memory:"
+        and not database.startswith("file:")
+    ):
+        db_url = db_url.set(database=os.path.abspath(database))
+    return db_url.render_as_string(hide_password=False)
+
+
+class DaemonQueryStream:
+    """Query results streamed by the daemon, with the interface of `QueryStream`."""
+
+    def __init__(self, header: dict[str, Any], messages: Iterator[dict[str, Any]]):
+        self.columns: list[str] = header["columns"]
+        self.returns_rows: bool = header["returns_rows"]
+        self.rowcount: int = header["rowcount"]
+        self._messages = messages
+        self._buffer: deque[tuple] = deque()
+
+    def batches(self) -> Iterator[Sequence[tuple]]:
+        if self._buffer:
+            yield list(self._buffer)
+            self._buffer.clear()
+        for message in self._messages:
+            if "rows" in message:
+                yield [tuple(decode_value(v) for v in row) for row in message["rows"]]
+
+    def fetch(self, size: int) -> Sequence[tuple]:
+        while len(self._buffer) < size:
+            message = next(self._messages, None)
+            if message is None or "rows" not in message:
+                break
+            self._buffer.extend(
+                tuple(decode_value(v) for v in row) for row in message["rows"]
+            )
+        return [self._buffer.popleft() for _ in range(min(size, len(self._buffer)))]
+
+
+class DaemonClient:
+    def __init__(self, socket_path: str | None = None, timeout: float | None = None):
+        self.socket_path = socket_path or str(get_socket_path())
+        self.timeout = timeout
+
+    def request(self, op: str, **kwargs: Any) -> Iterator[dict[str, Any]]:
+        """Send a request and yield its response messages up to the last one.
+
+        Raises:
+            DaemonError: if the daemon answers with an error.
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(encode_message({"op": op, **kwargs}))
+            with sock.makefile("rb") as reader:
+                for line in reader:
+                    message = decode_message(line)
+                    if "error" in message:
+                        raise DaemonError(message["error"])
+                    yield message
+                    if message.get("done"):
+                        return
+        raise DaemonError("Connection to the daemon closed")
+
+    def call(self, op: str, **kwargs: Any) -> dict[str, Any]:
+        """Send a request with a single response message."""
+        return next(self.request(op, **kwargs))
+
+    def ping(self) -> bool:
+        try:
+            self.call("ping")
+        except (OSError, DaemonError):
+            return False
+        return True
+
+    def connect(self, db_url: "URL") -> None:
+        """Open a pooled connection to a database in the daemon."""
+        self.call("connect", url=_url_string(db_url))
+
+    @contextmanager
+    def query_stream(
+        self,
+        db_url: "URL",
+        query: str,
+        params: dict[str, Any] | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[DaemonQueryStream]:
+        messages = self.request(
+            "query",
+            url=_url_string(db_url),
+            query=query,
+            params={name: encode_value(v) for name, v in (params or {}).items()},
+            batch_size=batch_size,
+        )
+        try:
+            yield DaemonQueryStream(next(messages), messages)
+        finally:
+            messages.close()
+
+    @contextmanager
+    def sample_stream(
+        self,
+        db_url: "URL",
+        table_name: str,
+        schema: str | None,
+        strategy: str,
+        size: int | None = None,
+        percent: float | None = None,
+        by: str | None = None,
+        reflect: bool = False,
+        batch_size: int = 1000,
+    ) -> Iterator[DaemonQueryStream]:
+        """Stream sample rows of a table, see `build_sample_query`."""
+        messages = self.request(
+            "sample",
+            url=_url_string(db_url),
+            table=table_name,
+            schema=schema,
+            strategy=strategy,
+            size=size,
+            percent=percent,
+            by=by,
+            reflect=reflect,
+            batch_size=batch_size,
+        )
+        try:
+            yield DaemonQueryStream(next(messages), messages)
+        finally:
+            messages.close()
+
+    def profile_table(
+        self,
+        db_url: "URL",
+        table_name: str,
+        schema: str | None,
+        sample: float | None = None,
+        top: int = 5,
+    ) -> dict[str, Any]:
+        """Get the table profile dictionary (`asdict`), see `profile_table`."""
+        profile = self.call(
+            "profile",
+            url=_url_string(db_url),
+            table=table_name,
+            schema=schema,
+            sample=sample,
+            top=top,
+        )["profile"]
+        for column in profile["columns"]:
+            column["min"] = decode_value(column["min"])
+            column["max"] = decode_value(column["max"])
+        return profile
+
+    def get_table_schema(
+        self, db_url: "URL", schema: str, table_name: str
+    ) -> dict[str, Any]:
+        """Get the table schema dictionary (`asdict`), with extra information."""
+        return self.call(
+            "table_schema",
+            url=_url_string(db_url),
+            schema=schema,
+            table=table_name,
+        )["table_schema"]
+
+
+def get_daemon_client() -> DaemonClient | None:
+    """Get a client of the running daemon, None when it is not running."""
+    socket_path = get_socket_path()
+    if not socket_path.exists():
+        return None
+    client = DaemonClient(str(socket_path), timeout=1)
+    if not client.ping():
+        return None
+    client.timeout = None
+    return client
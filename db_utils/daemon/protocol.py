@@ -0,0 +1,73 @@
+import base64
+import datetime
+import decimal
+import json
+import pathlib
+import uuid
+from typing import Any
+
+from db_utils.utils import get_cache_dir
+
+# tags of the values JSON can not represent
+VALUE_DECODERS = {
+    "$decimal": decimal.Decimal,
+    "$datetime": datetime.datetime.fromisoformat,
+    "$date": datetime.date.fromisoformat,
+    "$time": datetime.time.fromisoformat,
+    "$timedelta": lambda seconds: datetime.timedelta(seconds=seconds),
+    "$bytes": base64.b64decode,
+    "$uuid": uuid.UUID,
+    "$json": lambda value: value,
+}
+
+
+class DaemonError(Exception):
+    pass
+
+
+def get_socket_path() -> pathlib.Path:
+    return get_cache_dir() / "daemon.sock"
+
+
+def get_log_path() -> pathlib.Path:
+    return get_cache_dir() / "daemon.log"
+
+
+def encode_value(value: Any) -> Any:
+    """Convert a column value to JSON, tagging the types JSON does not have."""
+    match value:
+        case None | bool() | int() | float() | str():
+            return value
+        case decimal.Decimal():
+            return {"$decimal": str(value)}
+        case datetime.datetime():
+            return {"$datetime": value.isoformat()}
+        case datetime.date():
+            return {"$date": value.isoformat()}
+        case datetime.time():
+            return {"$time": value.isoformat()}
+        case datetime.timedelta():
+            return {"$timedelta": value.total_seconds()}
+        case bytes() | bytearray() | memoryview():
+            return {"$bytes": base64.b64encode(bytes(value)).decode()}
+        case uuid.UUID():
+            return {"$uuid": str(value)}
+        case dict() | list():
+            return {"$json": value}
+    return str(value)
+
+
+def decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and len(value) == 1:
+        ((tag, tagged_value),) = value.items()
+        if tag in VALUE_DECODERS:
+            return VALUE_DECODERS[tag](tagged_value)
+    return value
+
+
+def encode_message(message: dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def decode_message(line: bytes) -> dict[str, Any]:
+    return json.loads(line)
@@ -0,0 +1,283 @@
+import argparse
+import hashlib
+import logging
+import os
+import socketserver
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Iterator
+
+from sqlalchemy import Executable, create_engine, inspect, make_url
+from sqlalchemy.engine import Engine
+
+from db_utils.daemon.protocol import (
+    decode_message,
+    decode_value,
+    encode_message,
+    encode_value,
+    get_log_path,
+    get_socket_path,
+)
+from db_utils.inspect.enums import SampleStrategy
+from db_utils.inspect.table.main import get_table_schema_object
+from db_utils.inspect.table.profile import DEFAULT_TOP_VALUES, profile_table
+from db_utils.inspect.table.sampling import build_sample_query, get_sample_table
+from db_utils.run.main import open_query_stream
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BrokerEngine:
+    engine: Engine
+    last_used: float
+
+
+class ConnectionBroker:
+    """Pooled engines per database URL, shared by the requests of the daemon.
+
+    Engines unused for `engine_idle_timeout` seconds are disposed, and the
+    daemon stops after `idle_timeout` seconds without requests.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = 3600,
+        engine_idle_timeout: float = 900,
+        pool_size: int = 5,
+    ):
+        self.idle_timeout = idle_timeout
+        self.engine_idle_timeout = engine_idle_timeout
+        self.pool_size = pool_size
+        self.engines: dict[str, BrokerEngine] = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_activity = time.monotonic()
+        self.active_requests = 0
+
+    def get_engine(self, url: str) -> Engine:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        with self.lock:
+            broker_engine = self.engines.get(key)
+            if broker_engine is None:
+                engine = create_engine(
+                    make_url(url),
+                    pool_pre_ping=True,
+                    pool_size=self.pool_size,
+                    max_overflow=self.pool_size,
+                )
+                broker_engine = self.engines[key] = BrokerEngine(engine, 0)
+            broker_engine.last_used = time.monotonic()
+            return broker_engine.engine
+
+    def dispose_idle_engines(self) -> None:
+        now = time.monotonic()
+        with self.lock:
+            for key, broker_engine in list(self.engines.items()):
+                if now - broker_engine.last_used > self.engine_idle_timeout:
+                    logger.info("Disposing idle engine %s", broker_engine.engine.url)
+                    broker_engine.engine.dispose()
+                    del self.engines[key]
+
+    def is_idle(self) -> bool:
+        return (
+            self.active_requests == 0
+            and time.monotonic() - self.last_activity > self.idle_timeout
+        )
+
+    def status(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self.lock:
+            engines = [
+                {
+                    "url": broker_engine.engine.url.render_as_string(
+                        hide_password=True
+                    ),
+                    "pool": broker_engine.engine.pool.status(),
+                    "idle_seconds": round(now - broker_engine.last_used, 1),
+                }
+                for broker_engine in self.engines.values()
+            ]
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 1),
+            "engines": engines,
+        }
+
+    def handle(self, request: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        """Yield the response messages of a request, the last one with `done`."""
+        match request.get("op"):
+            case "ping":
+                yield {"done": True, "pid": os.getpid()}
+            case "status":
+                yield {"done": True, **self.status()}
+            case "connect":
+                engine = self.get_engine(request["url"])
+                with engine.connect():
+                    pass
+                yield {"done": True}
+            case "query":
+                engine = self.get_engine(request["url"])
+                params = {
+                    name: decode_value(value)
+                    for name, value in request.get("params", {}).items()
+                }
+                yield from _stream_query(
+                    engine, request["query"], params, request.get("batch_size", 1000)
+                )
+            case "sample":
+                engine = self.get_engine(request["url"])
+                table = get_sample_table(
+                    request["table"],
+                    request["schema"],
+                    inspect(engine) if request.get("reflect") else None,
+                )
+                query = build_sample_query(
+                    engine.dialect.name,
+                    table,
+                    SampleStrategy(request["strategy"]),
+                    request.get("size"),
+                    request.get("percent"),
+                    request.get("by"),
+                )
+                yield from _stream_query(
+                    engine, query, {}, request.get("batch_size", 1000)
+                )
+            case "profile":
+                engine = self.get_engine(request["url"])
+                profile = asdict(
+                    profile_table(
+                        inspect(engine),
+                        request["table"],
+                        request["schema"],
+                        request.get("sample"),
+                        request.get("top", DEFAULT_TOP_VALUES),
+                    )
+                )
+                for column in profile["columns"]:
+                    column["min"] = encode_value(column["min"])
+                    column["max"] = encode_value(column["max"])
+                yield {"done": True, "profile": profile}
+            case "table_schema":
+                engine = self.get_engine(request["url"])
+                table_schema = get_table_schema_object(
+                    inspect(engine),
+                    table_name=request["table"],
+                    db_schema=request["schema"],
+                    extra=True,
+                )
+                yield {"done": True, "table_schema": asdict(table_schema)}
+            case op:
+                yield {"error": f"Unknown operation '{op}'"}
+
+
+def _stream_query(
+    engine: Engine, query: str | Executable, params: dict[str, Any], batch_size: int
+) -> Iterator[dict[str, Any]]:
+    """Yield the header and row batch messages of a query, then `done`."""
+    with open_query_stream(engine, query, params, batch_size) as stream:
+        header = {
+            "columns": stream.columns if stream.returns_rows else [],
+            "returns_rows": stream.returns_rows,
+            "rowcount": stream.rowcount,
+        }
+        if stream.returns_rows:
+            yield header
+            for batch in stream.batches():
+                yield {"rows": [[encode_value(v) for v in row] for row in batch]}
+    if not header["returns_rows"]:
+        # answer once the statement is committed
+        yield header
+    yield {"done": True}
+
+
+class BrokerRequestHandler(socketserver.StreamRequestHandler):
+    server: "BrokerServer"
+
+    def handle(self) -> None:
+        broker = self.server.broker
+        for line in self.rfile:
+            request = decode_message(line)
+            if request.get("op") == "shutdown":
+                self.wfile.write(encode_message({"done": True}))
+                threading.Thread(target=self.server.shutdown).start()
+                return
+            with broker.lock:
+                broker.active_requests += 1
+            try:
+                for message in broker.handle(request):
+                    self.wfile.write(encode_message(message))
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except Exception as e:
+                logger.exception("Request failed")
+                self.wfile.write(encode_message({"error": f"{type(e).__name__}: {e}"}))
+            finally:
+                with broker.lock:
+                    broker.active_requests -= 1
+                    broker.last_activity = time.monotonic()
+
+
+class BrokerServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, broker: ConnectionBroker):
+        self.broker = broker
+        # the socket carries database credentials, only the user can use it
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, BrokerRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+
+def _watch(server: BrokerServer, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        server.broker.dispose_idle_engines()
+        if server.broker.is_idle():
+            logger.info("Idle for %ss, stopping", server.broker.idle_timeout)
+            server.shutdown()
+            return
+
+
+def run_broker(
+    socket_path: str | None = None,
+    idle_timeout: float = 3600,
+    engine_idle_timeout: float = 900,
+    pool_size: int = 5,
+) -> None:
+    """Serve broker requests on a Unix socket until shutdown or idle timeout."""
+    socket_path = socket_path or str(get_socket_path())
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    broker = ConnectionBroker(idle_timeout, engine_idle_timeout, pool_size)
+    with BrokerServer(socket_path, broker) as server:
+        watch_interval = min(5.0, idle_timeout, engine_idle_timeout)
+        threading.Thread(
+            target=_watch, args=(server, watch_interval), daemon=True
+        ).start()
+        logger.info("Listening on %s (pid %s)", socket_path, os.getpid())
+        try:
+            server.serve_forever()
+        finally:
+            for broker_engine in broker.engines.values():
+                broker_engine.engine.dispose()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="dbu connection broker")
+    parser.add_argument("--socket", default=None)
+    parser.add_argument("--idle-timeout", type=float, default=3600)
+    parser.add_argument("--engine-idle-timeout", type=float, default=900)
+    parser.add_argument("--pool-size", type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(
+        filename=get_log_path(),
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    run_broker(args.socket, args.idle_timeout, args.engine_idle_timeout, args.pool_size)
@@ -0,0 +1,132 @@
+import itertools
+from typing import Annotated, Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from db_utils.cli_utils import resolve_db_url, typer_error_msg_to_stdout
+from db_utils.diff.main import DEFAULT_CHUNKS, DEFAULT_LEAF_ROWS, diff_table_data
+from db_utils.exceptions import UnsupportedDialectError
+from db_utils.utils import autocomplete_tables, get_db_url_key_list_from_env_file
+
+app = typer.Typer()
+
+console = Console(stderr=True)
+
+DIFF_STATUS_STYLES = {"changed": "yellow", "extra": "green", "missing": "red"}
+
+
+@app.callback()
+def callback():
+    """
+    Compare data between databases.
+    """
+
+
+def _format_key(key: tuple) -> str:
+    return ", ".join(str(value) for value in key)
+
+
+@app.command("data")
+def diff_data(
+    table_name: Annotated[
+        str, typer.Argument(help="Table name", autocompletion=autocomplete_tables)
+    ],
+    source_key: Annotated[
+        Optional[str],
+        typer.Option(
+            "--source-key",
+            help="Env-file key of the source database URL, the default database "
+            "when not given.",
+            autocompletion=get_db_url_key_list_from_env_file,
+        ),
+    ] = None,
+    target_key: Annotated[
+        Optional[str],
+        typer.Option(
+            "--target-key",
+            help="Env-file key of the target database URL.",
+            autocompletion=get_db_url_key_list_from_env_file,
+        ),
+    ] = None,
+    source_url: Annotated[
+        Optional[str], typer.Option("--source-url", help="Source database URL")
+    ] = None,
+    target_url: Annotated[
+        Optional[str], typer.Option("--target-url", help="Target database URL")
+    ] = None,
+    schema: Annotated[Optional[str], typer.Option("--schema", "-s")] = None,
+    env_file: Annotated[
+        str, typer.Option("--env-file", help="Path to env-file.")
+    ] = ".env",
+    chunks: Annotated[
+        int,
+        typer.Option("--chunks", "-c", help="Key ranges the table is split in first."),
+    ] = DEFAULT_CHUNKS,
+    leaf_rows: Annotated[
+        int,
+        typer.Option(
+            "--leaf-rows", help="Rows of a differing range compared one by one."
+        ),
+    ] = DEFAULT_LEAF_ROWS,
+    limit: Annotated[
+        int, typer.Option("--limit", "-l", help="Differences printed.")
+    ] = 100,
+):
+    """
+    Find the rows that differ between a table in two databases.
+
+    Ranges of primary keys are compared by checksums computed on each server,
+    and only the ranges that differ are narrowed down to their rows. The exit
+    code is 1 when the tables differ.
+    """
+    from sqlalchemy import create_engine
+
+    source_db_url = resolve_db_url(env_file, source_key, source_url, "source")
+    target_db_url = resolve_db_url(env_file, target_key, target_url, "target")
+    source_engine = create_engine(source_db_url)
+    target_engine = create_engine(target_db_url)
+    compared = itertools.count(1)
+    try:
+        with console.status("Comparing checksums") as status:
+            result = diff_table_data(
+                source_engine,
+                target_engine,
+                table_name,
+                schema,
+                chunks=chunks,
+                leaf_rows=leaf_rows,
+                on_chunk=lambda *_: status.update(
+                    f"Comparing checksums: {next(compared)} ranges"
+                ),
+            )
+    except (ValueError, UnsupportedDialectError) as e:
+        typer_error_msg_to_stdout(e)
+
+    if result.differences:
+        table = Table(show_header=True, header_style="bold magenta")
+        table.add_column("status")
+        table.add_column(", ".join(result.key_columns))
+        table.add_column("columns")
+        for difference in result.differences[:limit]:
+            style = DIFF_STATUS_STYLES[difference.status]
+            table.add_row(
+                f"[{style}]{difference.status}[/{style}]",
+                _format_key(difference.key),
+                ", ".join(difference.columns),
+            )
+        Console().print(table)
+        if len(result.differences) > limit:
+            console.print(f"... {len(result.differences) - limit} more differences")
+    summary = ", ".join(
+        f"{count} {status}" for status, count in sorted(result.summary.items())
+    )
+    console.print(
+        f"source rows: {result.source_rows}, target rows: {result.target_rows}, "
+        f"ranges compared: {result.chunks_compared}, "
+        f"rows fetched: {result.rows_fetched}, "
+        f"differences: {summary or 'none'}"
+    )
+    if result.differences:
+        raise typer.Exit(1)
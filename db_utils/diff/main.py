@@ -0,0 +1,379 @@
+import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Sequence
+
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    Select,
+    Table,
+    Unicode,
+    and_,
+    cast,
+    func,
+    inspect,
+    literal,
+    literal_column,
+    not_,
+    or_,
+    select,
+    true,
+)
+from sqlalchemy import types as sqltypes
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql.expression import ColumnElement
+
+from db_utils.exceptions import UnsupportedDialectError
+from db_utils.inspect.table.main import get_table_schema_object
+from db_utils.inspect.table.sampling import get_light_table
+
+# rows fetched and compared one by one once a differing chunk is this small
+DEFAULT_LEAF_ROWS = 256
+DEFAULT_CHUNKS = 64
+NULL_MARKER = "\\N"
+COLUMN_SEPARATOR = "\x1f"
+SQLITE_ROW_HASH_FUNCTION = "dbu_row_hash"
+
+
+def _key_greater(key_columns: Sequence[ColumnElement], values: tuple) -> ColumnElement:
+    """Condition on a key being greater than `values`, in the order of the
+    columns, without the row value comparisons MSSQL does not have."""
+    conditions = []
+    for index, (key_column, value) in enumerate(zip(key_columns, values)):
+        equal_prefix = [c == v for c, v in zip(key_columns[:index], values)]
+        conditions.append(and_(*equal_prefix, key_column > value))
+    return or_(*conditions)
+
+
+@dataclass(frozen=True)
+class KeyRange:
+    """Rows whose key, the tuple of the primary key column values, is in
+    `(lower, upper]`, None is unbounded."""
+
+    lower: tuple | None = None
+    upper: tuple | None = None
+
+    def condition(self, key_columns: Sequence[ColumnElement]) -> ColumnElement:
+        conditions = []
+        # the range of the leading column lets the server seek the index
+        if self.lower is not None:
+            conditions.append(key_columns[0] >= self.lower[0])
+            conditions.append(_key_greater(key_columns, self.lower))
+        if self.upper is not None:
+            conditions.append(key_columns[0] <= self.upper[0])
+            conditions.append(not_(_key_greater(key_columns, self.upper)))
+        return and_(true(), *conditions)
+
+
+@dataclass(frozen=True)
+class ChunkChecksum:
+    count: int
+    checksum: int
+
+
+@dataclass
+class RowDifference:
+    # missing: only in the source, extra: only in the target
+    status: str
+    key: tuple
+    columns: list[str] = field(default_factory=list)
+    source: tuple | None = None
+    target: tuple | None = None
+
+
+@dataclass
+class DataDiffResult:
+    columns: list[str]
+    key_columns: list[str]
+    source_rows: int = 0
+    target_rows: int = 0
+    chunks_compared: int = 0
+    rows_fetched: int = 0
+    differences: list[RowDifference] = field(default_factory=list)
+
+    @property
+    def summary(self) -> Counter:
+        return Counter(difference.status for difference in self.differences)
+
+
+def _sqlite_row_hash(value: str | None) -> int | None:
+    if value is None:
+        return None
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:4], "big", signed=True)
+
+
+def create_row_hash_function(connection: Connection) -> None:
+    """Define the row hash function on a SQLite connection."""
+    connection.connection.driver_connection.create_function(
+        SQLITE_ROW_HASH_FUNCTION, 1, _sqlite_row_hash, deterministic=True
+    )
+
+
+def _column_text(dialect_name: str, column: ColumnElement) -> ColumnElement:
+    """Text representation of a column value, the same on every server of a
+    dialect and without loss of precision."""
+    try:
+        generic_type = column.type.as_generic()
+    except NotImplementedError:
+        generic_type = None
+    if dialect_name == "postgresql":
+        if isinstance(generic_type, sqltypes.DateTime) and generic_type.timezone:
+            # the text of a timestamptz is in the TimeZone of the session
+            return func.to_char(
+                func.timezone(literal("UTC"), column),
+                literal("YYYY-MM-DD HH24:MI:SS.US"),
+            )
+        return cast(column, sqltypes.Text())
+    if dialect_name != "mssql":
+        return cast(column, sqltypes.Text())
+    match generic_type:
+        case sqltypes.DateTime() | sqltypes.Date() | sqltypes.Time():
+            # ISO 8601, the default conversion drops seconds
+            return func.convert(
+                literal_column("NVARCHAR(40)"), column, literal_column("126")
+            )
+        case sqltypes.Float():
+            # 17 significant digits, the default conversion keeps 6
+            return func.convert(
+                literal_column("NVARCHAR(64)"), column, literal_column("3")
+            )
+    return cast(column, Unicode())
+
+
+def row_hash_expression(
+    dialect_name: str, columns: Sequence[ColumnElement]
+) -> ColumnElement:
+    """32 bits of the MD5 hash of the values of a row, computed by the server.
+
+    Raises:
+        UnsupportedDialectError: for unsupported dialects.
+    """
+    row_text: ColumnElement | None = None
+    for column in columns:
+        column_text = func.coalesce(
+            _column_text(dialect_name, column), literal(NULL_MARKER)
+        )
+        if row_text is None:
+            row_text = column_text
+        else:
+            row_text = row_text + literal(COLUMN_SEPARATOR) + column_text
+    assert row_text is not None
+    match dialect_name:
+        case "postgresql":
+            hex_prefix = literal("x") + func.substr(func.md5(row_text), 1, 8)
+            return cast(cast(hex_prefix, postgresql.BIT(32)), Integer)
+        case "mssql":
+            digest = func.substring(func.hashbytes("MD5", row_text), 1, 4)
+            return cast(cast(digest, Integer), BigInteger)
+        case "sqlite":
+            return getattr(func, SQLITE_ROW_HASH_FUNCTION)(row_text)
+        case _:
+            raise UnsupportedDialectError(
+                f"Data diff is not supported for dialect '{dialect_name}'"
+            )
+
+
+class TableSide:
+    """One of the two compared tables, with the queries run on its server."""
+
+    def __init__(
+        self, engine: Engine, table: Table, columns: list[str], key_columns: list[str]
+    ):
+        self.engine = engine
+        self.table = table
+        self.columns = [table.c[name] for name in columns]
+        self.key_columns = [table.c[name] for name in key_columns]
+        self.row_hash = row_hash_expression(engine.dialect.name, self.columns)
+
+    def _execute(self, query: Select) -> list[Any]:
+        with self.engine.connect() as connection:
+            if self.engine.dialect.name == "sqlite":
+                create_row_hash_function(connection)
+            return connection.execute(query).all()
+
+    def checksum(self, key_range: KeyRange) -> ChunkChecksum:
+        query = select(func.count(), func.coalesce(func.sum(self.row_hash), 0)).where(
+            key_range.condition(self.key_columns)
+        )
+        count, checksum = self._execute(query)[0]
+        return ChunkChecksum(count=count, checksum=int(checksum))
+
+    def chunk_bounds(self, chunks: int) -> list[tuple]:
+        """Upper bounds of `chunks` ranges of about the same number of rows."""
+        bucket = func.ntile(chunks).over(order_by=self.key_columns)
+        buckets = select(*self.key_columns, bucket.label("bucket")).subquery()
+        bucket_keys = [buckets.c[key.name] for key in self.key_columns]
+        # the last key of every bucket
+        position = func.row_number().over(
+            partition_by=buckets.c.bucket,
+            order_by=[key.desc() for key in bucket_keys],
+        )
+        ranked = select(
+            *bucket_keys, buckets.c.bucket, position.label("position")
+        ).subquery()
+        query = (
+            select(*[ranked.c[key.name] for key in self.key_columns])
+            .where(ranked.c.position == 1)
+            .order_by(ranked.c.bucket)
+        )
+        bounds = [tuple(row) for row in self._execute(query)]
+        # the last bucket is open ended, to cover rows only in the other table
+        return bounds[:-1]
+
+    def median_key(self, key_range: KeyRange, count: int) -> tuple | None:
+        query = (
+            select(*self.key_columns)
+            .where(key_range.condition(self.key_columns))
+            .order_by(*self.key_columns)
+            .offset(max(count // 2 - 1, 0))
+            .limit(1)
+        )
+        rows = self._execute(query)
+        return tuple(rows[0]) if rows else None
+
+    def rows(self, key_range: KeyRange) -> dict[tuple, tuple]:
+        query = (
+            select(*self.columns)
+            .where(key_range.condition(self.key_columns))
+            .order_by(*self.key_columns)
+        )
+        key_indices = [self.columns.index(key) for key in self.key_columns]
+        return {
+            tuple(row[i] for i in key_indices): tuple(row)
+            for row in self._execute(query)
+        }
+
+
+def compare_rows(
+    columns: list[str],
+    source_rows: dict[tuple, tuple],
+    target_rows: dict[tuple, tuple],
+) -> Iterator[RowDifference]:
+    """Compare the rows of a key range, matched by primary key."""
+    for key in sorted(source_rows.keys() | target_rows.keys()):
+        source_row = source_rows.get(key)
+        target_row = target_rows.get(key)
+        if target_row is None:
+            yield RowDifference("missing", key, source=source_row)
+        elif source_row is None:
+            yield RowDifference("extra", key, target=target_row)
+        elif source_row != target_row:
+            changed_columns = [
+                name
+                for name, source_value, target_value in zip(
+                    columns, source_row, target_row
+                )
+                if source_value != target_value
+            ]
+            yield RowDifference(
+                "changed", key, changed_columns, source=source_row, target=target_row
+            )
+
+
+def get_diff_columns(
+    source_engine: Engine,
+    target_engine: Engine,
+    table_name: str,
+    schema: str | None,
+) -> tuple[Table, Table, list[str], list[str]]:
+    """Reflect the light tables of both sides, and get the compared columns,
+    those on both sides, and the primary key of the source.
+
+    Raises:
+        ValueError: if the source table has no primary key.
+    """
+    if "." in table_name:
+        schema, table_name = table_name.split(".")
+    source_inspector = inspect(source_engine)
+    table_schema = get_table_schema_object(source_inspector, table_name, schema)
+    key_columns = table_schema.pk.columns
+    if not key_columns:
+        raise ValueError(f"Table '{table_name}' has no primary key")
+    source_table = get_light_table(source_inspector, table_name, schema)
+    target_table = get_light_table(inspect(target_engine), table_name, schema)
+    columns = [c.name for c in source_table.columns if c.name in target_table.c]
+    missing_keys = [name for name in key_columns if name not in target_table.c]
+    if missing_keys:
+        raise ValueError(f"Primary key columns not in target: {missing_keys}")
+    return source_table, target_table, columns, key_columns
+
+
+def diff_table_data(
+    source_engine: Engine,
+    target_engine: Engine,
+    table_name: str,
+    schema: str | None = None,
+    chunks: int = DEFAULT_CHUNKS,
+    leaf_rows: int = DEFAULT_LEAF_ROWS,
+    on_chunk: Callable[[KeyRange, ChunkChecksum, ChunkChecksum], None] | None = None,
+) -> DataDiffResult:
+    """Find the rows that differ between the same table in two databases.
+
+    The table is split in ranges of its primary key, and every
+    range is summarized on each server by its row count and the sum of its
+    row hashes. Ranges with different summaries are split in two at their
+    median key until they have at most `leaf_rows` rows, which are then
+    fetched from both sides and compared. Only summaries of matching ranges
+    travel over the network.
+
+    Row hashes are computed from the text representation of the values, so
+    both databases must use the same dialect.
+
+    Raises:
+        ValueError: if the dialects differ or the table has no primary key.
+        UnsupportedDialectError: for unsupported dialects.
+    """
+    if source_engine.dialect.name != target_engine.dialect.name:
+        raise ValueError("Source and target databases must use the same dialect")
+    source_table, target_table, columns, key_columns = get_diff_columns(
+        source_engine, target_engine, table_name, schema
+    )
+    source = TableSide(source_engine, source_table, columns, key_columns)
+    target = TableSide(target_engine, target_table, columns, key_columns)
+    result = DataDiffResult(columns=columns, key_columns=key_columns)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+
+        def on_both(method: str, *args) -> tuple[Any, Any]:
+            source_future = executor.submit(getattr(source, method), *args)
+            target_future = executor.submit(getattr(target, method), *args)
+            return source_future.result(), target_future.result()
+
+        bounds = source.chunk_bounds(chunks) if chunks > 1 else []
+        pending = [
+            KeyRange(lower, upper)
+            for lower, upper in zip([None] + bounds, bounds + [None])
+        ]
+        pending.reverse()
+        initial_ranges = set(pending)
+        while pending:
+            key_range = pending.pop()
+            source_checksum, target_checksum = on_both("checksum", key_range)
+            result.chunks_compared += 1
+            if key_range in initial_ranges:
+                result.source_rows += source_checksum.count
+                result.target_rows += target_checksum.count
+            if on_chunk:
+                on_chunk(key_range, source_checksum, target_checksum)
+            if source_checksum == target_checksum:
+                continue
+            count = max(source_checksum.count, target_checksum.count)
+            median = None
+            if count > leaf_rows:
+                side = (
+                    source if source_checksum.count >= target_checksum.count else target
+                )
+                median = side.median_key(key_range, count)
+            if median is None or median == key_range.upper:
+                # small enough: compare the rows
+                source_rows, target_rows = on_both("rows", key_range)
+                result.rows_fetched += len(source_rows) + len(target_rows)
+                result.differences += compare_rows(columns, source_rows, target_rows)
+                continue
+            pending.append(KeyRange(median, key_range.upper))
+            pending.append(KeyRange(key_range.lower, median))
+
+    return result
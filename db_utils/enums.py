@@ -11,3 +11,19 @@ class OutputFormat(StrEnum):
     TSV = "tsv"
     TABLE = "table"
     JSON = "json"
+    CSV = "csv"
+    JSONL = "jsonl"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+class IfTableExists(StrEnum):
+    fail = "fail"
+    append = "append"
+    replace = "replace"
+
+
+class LoadFileFormat(StrEnum):
+    csv = "csv"
+    jsonl = "jsonl"
+    parquet = "parquet"
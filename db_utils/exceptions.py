@@ -1,2 +1,6 @@
 class NoDBUrlFoundException(Exception):
     pass
+
+
+class UnsupportedDialectError(Exception):
+    """A feature has no implementation for the dialect of a database."""
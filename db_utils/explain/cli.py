@@ -0,0 +1,188 @@
+import pathlib
+from typing import Annotated, Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from rich.tree import Tree
+
+from db_utils.cli_utils import typer_error_msg_to_stdout
+from db_utils.exceptions import UnsupportedDialectError
+from db_utils.explain.main import (
+    PlanNode,
+    capture_plan,
+    diff_plans,
+    list_snapshots,
+    load_snapshots,
+    new_snapshot,
+    save_snapshot,
+)
+from db_utils.run.queries import get_query_index, read_query
+
+app = typer.Typer()
+
+console = Console()
+
+DIFF_STATUS_STYLES = {"changed": "yellow", "added": "green", "removed": "red"}
+
+
+@app.callback()
+def callback():
+    """
+    Capture and compare query execution plans.
+    """
+
+
+def _node_label(node: PlanNode) -> str:
+    label = f"[bold]{node.operator}[/bold] {node.detail}".rstrip()
+    figures = [
+        f"{name}={value:g}"
+        for name, value in [
+            ("est", node.estimated_rows),
+            ("actual", node.actual_rows),
+            ("cost", node.cost),
+        ]
+        if value is not None
+    ]
+    return f"{label} [dim]{' '.join(figures)}[/dim]" if figures else label
+
+
+def _add_plan_nodes(tree: Tree, node: PlanNode) -> None:
+    branch = tree.add(_node_label(node))
+    for child in node.children:
+        _add_plan_nodes(branch, child)
+
+
+@app.command()
+def capture(
+    ctx: typer.Context,
+    query: Annotated[Optional[str], typer.Argument(help="SQL query")] = None,
+    sql_file: Annotated[
+        Optional[str],
+        typer.Option("--sql-file", "-f", help="File with named queries"),
+    ] = None,
+    query_name: Annotated[
+        Optional[str], typer.Option("--query-name", "-q", help="Name of the query")
+    ] = None,
+    name: Annotated[
+        Optional[str],
+        typer.Option("--name", "-n", help="Snapshot name, the query name by default"),
+    ] = None,
+    analyze: Annotated[
+        bool,
+        typer.Option(
+            "--analyze/--no-analyze", help="Execute the query to get actual rows"
+        ),
+    ] = True,
+    save: Annotated[
+        bool, typer.Option("--save/--no-save", help="Store the plan as a snapshot")
+    ] = True,
+):
+    """
+    Capture the execution plan of a query and store it as a snapshot.
+    """
+    from sqlalchemy import create_engine
+
+    from db_utils.run.main import get_query_bind_names
+
+    if sql_file:
+        if not query_name:
+            typer_error_msg_to_stdout("A query name is required with a SQL file")
+        sql_path = pathlib.Path(sql_file)
+        entries = [e for e in get_query_index(sql_path) if e["name"] == query_name]
+        if not entries:
+            typer_error_msg_to_stdout(f"No query named '{query_name}'")
+        query = read_query(sql_path, entries[0])["query"]
+    if not query:
+        typer_error_msg_to_stdout("Give a query or a SQL file and query name")
+    snapshot_name = name or query_name
+    if save and not snapshot_name:
+        typer_error_msg_to_stdout("A snapshot name is required to save the plan")
+
+    params = {bind: typer.prompt(bind) for bind in get_query_bind_names(query)}
+    engine = create_engine(ctx.obj.db_url)
+    try:
+        plan, raw = capture_plan(engine, query, params, analyze)
+    except (UnsupportedDialectError, ValueError) as e:
+        typer_error_msg_to_stdout(e)
+    tree = Tree("Plan")
+    _add_plan_nodes(tree, plan)
+    console.print(tree)
+    if save:
+        assert snapshot_name
+        # SQLite plans are never executed
+        analyzed = analyze and engine.dialect.name != "sqlite"
+        snapshot = new_snapshot(
+            snapshot_name, query, engine.dialect.name, analyzed, plan, raw
+        )
+        path = save_snapshot(snapshot)
+        typer.secho(f"Snapshot saved at '{path}'", fg=typer.colors.GREEN)
+
+
+@app.command("list")
+def list_plans():
+    """
+    List the stored plan snapshots.
+    """
+    snapshots_table = Table(show_header=True, header_style="bold magenta")
+    snapshots_table.add_column("Snapshot")
+    snapshots_table.add_column("Dialect")
+    snapshots_table.add_column("Analyze")
+    snapshots_table.add_column("Query")
+    for snapshot in list_snapshots():
+        snapshots_table.add_row(
+            snapshot.snapshot_id,
+            snapshot.dialect,
+            "yes" if snapshot.analyze else "no",
+            " ".join(snapshot.query.split())[:60],
+        )
+    console.print(snapshots_table)
+
+
+@app.command()
+def diff(
+    snapshots: Annotated[
+        list[str],
+        typer.Argument(
+            help="Two snapshots (file, id or name) or one name to compare its "
+            "two latest snapshots"
+        ),
+    ],
+    all_nodes: Annotated[
+        bool, typer.Option("--all", "-a", help="Show unchanged nodes too")
+    ] = False,
+):
+    """
+    Compare two plan snapshots node by node.
+    """
+    try:
+        old, new = load_snapshots(snapshots)
+    except ValueError as e:
+        typer_error_msg_to_stdout(e)
+    diffs = diff_plans(old.plan, new.plan)
+    diff_table = Table(
+        show_header=True,
+        header_style="bold magenta",
+        title=f"{old.snapshot_id} → {new.snapshot_id}",
+    )
+    diff_table.add_column("Node")
+    diff_table.add_column("Status")
+    diff_table.add_column("Changes")
+    for node_diff in diffs:
+        if node_diff.status == "same" and not all_nodes:
+            continue
+        node = node_diff.new or node_diff.old
+        assert node
+        style = DIFF_STATUS_STYLES.get(node_diff.status, "")
+        diff_table.add_row(
+            "  " * node_diff.depth + f"{node.operator} {node.detail}".rstrip(),
+            node_diff.status,
+            "\n".join(node_diff.changes),
+            style=style,
+        )
+    console.print(diff_table)
+    changed = sum(1 for d in diffs if d.status != "same")
+    typer.secho(
+        f"{changed} of {len(diffs)} plan nodes differ",
+        fg=typer.colors.YELLOW if changed else typer.colors.GREEN,
+    )
@@ -0,0 +1,355 @@
+import json
+import pathlib
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Iterator
+
+from db_utils.config import plan_snapshots_dirname
+from db_utils.exceptions import UnsupportedDialectError
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+SHOWPLAN_NAMESPACE = "{http://schemas.microsoft.com/sqlserver/2004/07/showplan}"
+# operators of SQLite `EXPLAIN QUERY PLAN` details, longest first
+SQLITE_PLAN_OPERATOR_REGEX = re.compile(
+    r"(SCAN CONSTANT ROW|SCAN|SEARCH"
+    r"|USE TEMP B-TREE FOR (?:(?:RIGHT PART|LAST TERM) OF )?"
+    r"(?:ORDER BY|GROUP BY|DISTINCT)"
+    r"|(?:UNION|EXCEPT|INTERSECT) USING TEMP B-TREE|UNION ALL|MERGE \([A-Z ]+\)"
+    r"|CO-ROUTINE|MATERIALIZE|COMPOUND QUERY|LEFT-MOST SUBQUERY|MULTI-INDEX OR"
+    r"|INDEX|(?:CORRELATED )?(?:SCALAR|LIST) SUBQUERY|BLOOM FILTER ON"
+    r"|RECURSIVE STEP|SETUP)(?= |$)"
+)
+
+
+@dataclass
+class PlanNode:
+    operator: str
+    detail: str = ""
+    estimated_rows: float | None = None
+    actual_rows: float | None = None
+    cost: float | None = None
+    children: list["PlanNode"] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PlanNode":
+        return cls(
+            **{key: value for key, value in data.items() if key != "children"},
+            children=[cls.from_dict(child) for child in data.get("children", [])],
+        )
+
+    def walk(self, path: str = "0") -> Iterator[tuple[str, "PlanNode"]]:
+        """Yield the nodes in pre-order with their path of child indices."""
+        yield path, self
+        for index, child in enumerate(self.children):
+            yield from child.walk(f"{path}.{index}")
+
+
+@dataclass
+class PlanSnapshot:
+    name: str
+    query: str
+    dialect: str
+    analyze: bool
+    created_at: str
+    plan: PlanNode
+    raw: str
+
+    @property
+    def snapshot_id(self) -> str:
+        return f"{self.name}@{self.created_at.replace(':', '').replace('-', '')}"
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PlanSnapshot":
+        return cls(**{**data, "plan": PlanNode.from_dict(data["plan"])})
+
+
+@dataclass
+class PlanNodeDiff:
+    path: str
+    status: str  # "same", "changed", "added" or "removed"
+    old: PlanNode | None
+    new: PlanNode | None
+    changes: list[str] = field(default_factory=list)
+
+    @property
+    def depth(self) -> int:
+        return self.path.count(".")
+
+
+# SECTION: Plan capture
+
+
+def _parse_postgresql_node(plan: dict[str, Any]) -> PlanNode:
+    detail = " ".join(
+        str(plan[key])
+        for key in ["Relation Name", "Index Name", "Join Type", "Strategy"]
+        if key in plan
+    )
+    actual_rows = None
+    if "Actual Rows" in plan:
+        actual_rows = plan["Actual Rows"] * plan.get("Actual Loops", 1)
+    return PlanNode(
+        operator=plan["Node Type"],
+        detail=detail,
+        estimated_rows=plan.get("Plan Rows"),
+        actual_rows=actual_rows,
+        cost=plan.get("Total Cost"),
+        children=[_parse_postgresql_node(child) for child in plan.get("Plans", [])],
+    )
+
+
+def parse_postgresql_plan(raw: str) -> PlanNode:
+    """Parse the output of `EXPLAIN (FORMAT JSON)`."""
+    return _parse_postgresql_node(json.loads(raw)[0]["Plan"])
+
+
+def _child_rel_ops(element: ET.Element) -> Iterator[ET.Element]:
+    # RelOp elements are nested in operator specific elements, e.g. Hash
+    for child in element:
+        if child.tag == f"{SHOWPLAN_NAMESPACE}RelOp":
+            yield child
+        else:
+            yield from _child_rel_ops(child)
+
+
+def _parse_mssql_rel_op(rel_op: ET.Element) -> PlanNode:
+    counters = rel_op.findall(
+        f"{SHOWPLAN_NAMESPACE}RunTimeInformation/{SHOWPLAN_NAMESPACE}RunTimeCountersPerThread"
+    )
+    objects = {
+        obj.get("Table", "").strip("[]")
+        for obj in rel_op.iterfind(f".//{SHOWPLAN_NAMESPACE}Object")
+    }
+    return PlanNode(
+        operator=rel_op.get("PhysicalOp", ""),
+        detail=" ".join(sorted(filter(None, objects))) if objects else "",
+        estimated_rows=float(rel_op.get("EstimateRows", 0)),
+        actual_rows=(
+            sum(float(c.get("ActualRows", 0)) for c in counters) if counters else None
+        ),
+        cost=float(rel_op.get("EstimatedTotalSubtreeCost", 0)),
+        children=[_parse_mssql_rel_op(child) for child in _child_rel_ops(rel_op)],
+    )
+
+
+def parse_mssql_plan(raw: str) -> PlanNode:
+    """Parse a showplan XML document, using the plan of its first statement."""
+    root = ET.fromstring(raw)
+    statement = root.find(f".//{SHOWPLAN_NAMESPACE}QueryPlan")
+    if statement is None:
+        raise ValueError("No query plan in showplan XML")
+    rel_op = next(_child_rel_ops(statement), None)
+    if rel_op is None:
+        raise ValueError("No operators in showplan XML")
+    return _parse_mssql_rel_op(rel_op)
+
+
+def parse_sqlite_plan(rows: list[tuple[int, int, str]]) -> PlanNode:
+    """Build the tree of the `(id, parent, detail)` rows of `EXPLAIN QUERY PLAN`."""
+    root = PlanNode(operator="QUERY PLAN")
+    nodes = {0: root}
+    for node_id, parent_id, detail in rows:
+        # e.g. "SEARCH a USING INTEGER PRIMARY KEY (rowid=?)"
+        match = SQLITE_PLAN_OPERATOR_REGEX.match(detail)
+        operator = match.group(0) if match else detail
+        node = PlanNode(operator=operator, detail=detail[len(operator) :].strip())
+        nodes[node_id] = node
+        nodes.get(parent_id, root).children.append(node)
+    return root
+
+
+def capture_plan(
+    engine: "Engine", query: str, params: dict[str, Any] | None = None, analyze=True
+) -> tuple[PlanNode, str]:
+    """Get the plan of a query in the native format of the dialect.
+
+    With `analyze`, the query is executed to get actual row counts, in a
+    transaction that is rolled back. SQLite plans have no rows nor costs.
+    """
+    from sqlalchemy import text
+
+    params = params or {}
+    with engine.connect() as connection:
+        match engine.dialect.name:
+            case "postgresql":
+                options = "ANALYZE, FORMAT JSON" if analyze else "FORMAT JSON"
+                plan = connection.execute(
+                    text(f"EXPLAIN ({options}) {query}"), params
+                ).scalar_one()
+                raw = plan if isinstance(plan, str) else json.dumps(plan)
+                return parse_postgresql_plan(raw), raw
+            case "mssql":
+                setting = "STATISTICS XML" if analyze else "SHOWPLAN_XML"
+                connection.exec_driver_sql(f"SET {setting} ON")
+                # the result of an INSERT, UPDATE or DELETE has no cursor left,
+                # the showplan sets are read on a cursor of the DBAPI connection
+                compiled = text(query).compile(dialect=connection.dialect)
+                bound = compiled.construct_params(params)
+                if compiled.positional:
+                    bound = [bound[name] for name in compiled.positiontup]
+                cursor = connection.connection.cursor()
+                try:
+                    cursor.execute(str(compiled), bound)
+                    raw = ""
+                    while True:
+                        if cursor.description and cursor.description[0][0].endswith(
+                            "XML Showplan"
+                        ):
+                            raw = cursor.fetchone()[0]
+                        if not cursor.nextset():
+                            break
+                finally:
+                    cursor.close()
+                    connection.exec_driver_sql(f"SET {setting} OFF")
+                if not raw:
+                    raise ValueError("The server returned no showplan")
+                return parse_mssql_plan(raw), raw
+            case "sqlite":
+                rows = connection.execute(
+                    text(f"EXPLAIN QUERY PLAN {query}"), params
+                ).all()
+                plan_rows = [(row[0], row[1], row[3]) for row in rows]
+                return parse_sqlite_plan(plan_rows), json.dumps(plan_rows)
+            case _:
+                raise UnsupportedDialectError(
+                    f"Plans are not supported for dialect '{engine.dialect.name}'"
+                )
+
+
+# SECTION: Snapshots
+
+
+def get_snapshots_dir() -> pathlib.Path:
+    return pathlib.Path(plan_snapshots_dirname)
+
+
+def save_snapshot(
+    snapshot: PlanSnapshot, snapshots_dir: pathlib.Path | None = None
+) -> pathlib.Path:
+    snapshots_dir = snapshots_dir or get_snapshots_dir()
+    snapshots_dir.mkdir(exist_ok=True)
+    path = snapshots_dir / f"{snapshot.snapshot_id}.json"
+    with open(path, "w") as f:
+        json.dump(asdict(snapshot), f, indent=2)
+    return path
+
+
+def new_snapshot(
+    name: str, query: str, dialect: str, analyze: bool, plan: PlanNode, raw: str
+) -> PlanSnapshot:
+    return PlanSnapshot(
+        name=name,
+        query=query,
+        dialect=dialect,
+        analyze=analyze,
+        # microseconds keep the ids of snapshots taken in a row distinct
+        created_at=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        plan=plan,
+        raw=raw,
+    )
+
+
+def list_snapshots(snapshots_dir: pathlib.Path | None = None) -> list[PlanSnapshot]:
+    """Get the saved snapshots, oldest first."""
+    snapshots_dir = snapshots_dir or get_snapshots_dir()
+    if not snapshots_dir.exists():
+        return []
+    snapshots = []
+    for path in snapshots_dir.glob("*.json"):
+        with open(path, "r") as f:
+            snapshots.append(PlanSnapshot.from_dict(json.load(f)))
+    return sorted(snapshots, key=lambda s: (s.created_at, s.name))
+
+
+def load_snapshots(
+    references: list[str], snapshots_dir: pathlib.Path | None = None
+) -> tuple[PlanSnapshot, PlanSnapshot]:
+    """Get the two snapshots to compare.
+
+    A reference is a snapshot file, a snapshot id (`name@timestamp`) or a
+    name, meaning its latest snapshot. A single name gives its two latest
+    snapshots.
+    """
+    snapshots = list_snapshots(snapshots_dir)
+
+    def find(reference: str) -> list[PlanSnapshot]:
+        if pathlib.Path(reference).is_file():
+            with open(reference, "r") as f:
+                return [PlanSnapshot.from_dict(json.load(f))]
+        return [s for s in snapshots if reference in (s.snapshot_id, s.name)]
+
+    if len(references) == 1:
+        found = find(references[0])
+        if len(found) < 2:
+            raise ValueError(f"Less than two snapshots of '{references[0]}'")
+        return found[-2], found[-1]
+    if len(references) != 2:
+        raise ValueError("Give one snapshot name or two snapshots to compare")
+    selected = []
+    for reference in references:
+        found = find(reference)
+        if not found:
+            raise ValueError(f"No snapshot '{reference}'")
+        selected.append(found[-1])
+    return selected[0], selected[1]
+
+
+# SECTION: Diff
+
+
+def _format_value(value: float | None) -> str:
+    return "-" if value is None else f"{value:g}"
+
+
+def _format_change(label: str, old: float | None, new: float | None) -> str | None:
+    if old == new:
+        return None
+    change = f"{label} {_format_value(old)} → {_format_value(new)}"
+    if old and new is not None:
+        change += f" ({(new - old) / old:+.0%})"
+    return change
+
+
+def diff_plans(old: PlanNode, new: PlanNode) -> list[PlanNodeDiff]:
+    """Compare two plans node by node, matching nodes by their path."""
+    old_nodes = dict(old.walk())
+    new_nodes = dict(new.walk())
+    paths = sorted(
+        old_nodes.keys() | new_nodes.keys(),
+        key=lambda path: [int(index) for index in path.split(".")],
+    )
+    diffs = []
+    for path in paths:
+        old_node, new_node = old_nodes.get(path), new_nodes.get(path)
+        if old_node is None:
+            diffs.append(PlanNodeDiff(path, "added", None, new_node))
+            continue
+        if new_node is None:
+            diffs.append(PlanNodeDiff(path, "removed", old_node, None))
+            continue
+        changes = []
+        if (old_node.operator, old_node.detail) != (new_node.operator, new_node.detail):
+            changes.append(
+                f"operator {old_node.operator} {old_node.detail}".rstrip()
+                + f" → {new_node.operator} {new_node.detail}".rstrip()
+            )
+        for label, attribute in [
+            ("estimated rows", "estimated_rows"),
+            ("actual rows", "actual_rows"),
+            ("cost", "cost"),
+        ]:
+            change = _format_change(
+                label, getattr(old_node, attribute), getattr(new_node, attribute)
+            )
+            if change:
+                changes.append(change)
+        diffs.append(
+            PlanNodeDiff(
+                path, "changed" if changes else "same", old_node, new_node, changes
+            )
+        )
+    return diffs
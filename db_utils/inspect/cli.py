@@ -1,13 +1,17 @@
-from typing import Annotated
+import json
+from dataclasses import asdict
+from typing import Annotated, Optional
 
 import typer
 from rich.console import Console
 from rich.table import Table
-from sqlalchemy import create_engine, inspect
 
+from db_utils.cli_utils import typer_error_msg_to_stdout
+from db_utils.enums import OutputFormat
+from db_utils.exceptions import UnsupportedDialectError
 from db_utils.inspect.table.cli import app as inspect_table_app
 
-from .enums import InspectDbEnum
+from .enums import InspectDbEnum, SizeSortKey
 
 app = typer.Typer()
 
@@ -29,13 +33,39 @@ def callback():
 def inspect_database(
     ctx: typer.Context,
     db_object_type: InspectDbEnum,
-    schema_name: Annotated[str, typer.Option(..., "--schema", "-s")],
+    schema_name: Annotated[Optional[str], typer.Option(..., "--schema", "-s")] = None,
+    exact: Annotated[
+        bool,
+        typer.Option(
+            ..., "--exact", help="sizes: count the rows instead of estimating them."
+        ),
+    ] = False,
+    jobs: Annotated[
+        int,
+        typer.Option(..., "--jobs", "-j", min=1, help="sizes: tables counted at once."),
+    ] = 4,
+    sort_by: Annotated[
+        SizeSortKey, typer.Option(..., "--sort-by", help="sizes: sort column.")
+    ] = SizeSortKey.total,
+    output: Annotated[
+        OutputFormat, typer.Option(..., "--output", "-o", help="sizes: output format.")
+    ] = OutputFormat.TABLE,
 ):
     """
     Inspect database objects.
+
+    sizes lists the estimated row count, data size and index size of every
+    table, read from the catalog statistics in one query.
     """
+    from sqlalchemy import create_engine, inspect
+
     db_url = ctx.obj.db_url
     engine = create_engine(db_url)
+
+    if db_object_type.value == "sizes":
+        print_table_sizes(engine, schema_name, exact, jobs, sort_by, output)
+        return
+
     inspector = inspect(engine)
 
     if db_object_type.value == "schemas":
@@ -67,7 +97,7 @@ def inspect_database(
             for view in inspector.get_view_names(schema=schema_name):
                 print(f"{schema_name}.{view}")
         else:
-            for schema in inspector.get_view_names():
+            for schema in inspector.get_schema_names():
                 if schema.startswith("db_") or schema.lower() in [
                     "sys",
                     "information_schema",
@@ -76,3 +106,72 @@ def inspect_database(
                     continue
                 for view in inspector.get_view_names(schema=schema):
                     print(f"{schema}.{view}")
+
+
+def print_table_sizes(
+    engine,
+    schema_name: str | None,
+    exact: bool,
+    jobs: int,
+    sort_by: SizeSortKey,
+    output: OutputFormat,
+):
+    from db_utils.inspect.sizes import (
+        count_rows,
+        format_size,
+        get_table_sizes,
+        sort_table_sizes,
+    )
+
+    try:
+        sizes = get_table_sizes(engine, schema_name)
+    except UnsupportedDialectError as e:
+        typer_error_msg_to_stdout(e)
+    if exact:
+        counted = 0
+        with Console(stderr=True).status("Counting rows") as status:
+
+            def on_count(_):
+                nonlocal counted
+                counted += 1
+                status.update(f"Counting rows: {counted}/{len(sizes)} tables")
+
+            count_rows(engine, sizes, jobs, on_count)
+    sizes = sort_table_sizes(sizes, sort_by)
+
+    match output:
+        case OutputFormat.TSV:
+            print("table\trows\tdata_bytes\tindex_bytes\ttotal_bytes")
+            for size in sizes:
+                values = [size.rows, size.data_bytes, size.index_bytes]
+                values.append(size.total_bytes)
+                print(
+                    "\t".join(
+                        [f"{size.schema}.{size.name}"]
+                        + ["" if value is None else str(value) for value in values]
+                    )
+                )
+        case OutputFormat.TABLE:
+            table.add_column("table")
+            for header in ["rows", "data", "index", "total"]:
+                table.add_column(header, justify="right")
+            for size in sizes:
+                rows = "" if size.rows is None else f"{size.rows:,}"
+                if rows and not size.exact:
+                    rows = f"~{rows}"
+                table.add_row(
+                    f"{size.schema}.{size.name}",
+                    rows,
+                    format_size(size.data_bytes),
+                    format_size(size.index_bytes),
+                    format_size(size.total_bytes),
+                )
+            console.print(table)
+        case OutputFormat.JSON:
+            print(
+                json.dumps(
+                    [asdict(size) | {"total_bytes": size.total_bytes} for size in sizes]
+                )
+            )
+        case _:
+            typer_error_msg_to_stdout(f"Output format {output} not supported.")
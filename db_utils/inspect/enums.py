@@ -5,3 +5,19 @@ class InspectDbEnum(StrEnum):
     tables = "tables"
     schemas = "schemas"
     views = "views"
+    sizes = "sizes"
+
+
+class SampleStrategy(StrEnum):
+    first = "first"
+    random = "random"
+    tablesample = "tablesample"
+    stratified = "stratified"
+
+
+class SizeSortKey(StrEnum):
+    name = "name"
+    rows = "rows"
+    data = "data"
+    index = "index"
+    total = "total"
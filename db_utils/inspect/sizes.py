@@ -0,0 +1,206 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import func, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from db_utils.catalog.main import select_schemas
+from db_utils.exceptions import UnsupportedDialectError
+from db_utils.inspect.enums import SizeSortKey
+
+DEFAULT_COUNT_JOBS = 4
+SIZE_UNITS = ["B", "KiB", "MiB", "GiB", "TiB"]
+
+
+@dataclass
+class TableSize:
+    schema: str
+    name: str
+    # estimated from statistics unless `exact`, None when there are none
+    rows: int | None = None
+    data_bytes: int | None = None
+    index_bytes: int | None = None
+    exact: bool = False
+
+    @property
+    def total_bytes(self) -> int | None:
+        if self.data_bytes is None:
+            return None
+        return self.data_bytes + (self.index_bytes or 0)
+
+
+def format_size(size: int | None) -> str:
+    """Format a number of bytes with binary units, e.g. `1.5 MiB`."""
+    if size is None:
+        return ""
+    value = float(size)
+    for unit in SIZE_UNITS[:-1]:
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} {SIZE_UNITS[-1]}"
+
+
+def _get_postgresql_sizes(engine: Engine, schema: str | None) -> list[TableSize]:
+    # reltuples is -1 for tables never vacuumed or analyzed (Postgres 14+)
+    query = text(
+        """
+        SELECT n.nspname, c.relname,
+               CASE WHEN c.reltuples >= 0 THEN c.reltuples::bigint END,
+               pg_total_relation_size(c.oid) - pg_indexes_size(c.oid),
+               pg_indexes_size(c.oid)
+          FROM pg_class c
+          JOIN pg_namespace n ON n.oid = c.relnamespace
+         WHERE c.relkind IN ('r', 'p', 'm')
+           AND n.nspname NOT LIKE 'pg\\_%'
+           AND (CAST(:schema AS text) IS NULL OR n.nspname = :schema)
+        """
+    )
+    with engine.connect() as connection:
+        return [
+            TableSize(*row) for row in connection.execute(query, {"schema": schema})
+        ]
+
+
+def _get_mssql_sizes(engine: Engine, schema: str | None) -> list[TableSize]:
+    # index 0 is the heap and 1 the clustered index, both hold the rows
+    query = text(
+        """
+        SELECT s.name, t.name,
+               SUM(CASE WHEN ps.index_id < 2 THEN ps.row_count ELSE 0 END),
+               SUM(CASE WHEN ps.index_id < 2 THEN ps.used_page_count ELSE 0 END)
+                   * 8192,
+               SUM(CASE WHEN ps.index_id > 1 THEN ps.used_page_count ELSE 0 END)
+                   * 8192
+          FROM sys.dm_db_partition_stats ps
+          JOIN sys.tables t ON t.object_id = ps.object_id
+          JOIN sys.schemas s ON s.schema_id = t.schema_id
+         WHERE t.is_ms_shipped = 0
+           AND (:schema IS NULL OR s.name = :schema)
+         GROUP BY s.name, t.name
+        """
+    )
+    with engine.connect() as connection:
+        return [
+            TableSize(*row) for row in connection.execute(query, {"schema": schema})
+        ]
+
+
+def _get_sqlite_sizes(engine: Engine, schema: str | None) -> list[TableSize]:
+    schema = schema or "main"
+    quoted_schema = engine.dialect.identifier_preparer.quote_schema(schema)
+    master = f"{quoted_schema}.sqlite_master"
+    sizes: dict[str, TableSize] = {}
+    with engine.connect() as connection:
+        for (table_name,) in connection.execute(
+            text(
+                f"SELECT name FROM {master} "
+                "WHERE type = 'table' AND name NOT LIKE 'sqlite~_%' ESCAPE '~'"
+            )
+        ):
+            sizes[table_name] = TableSize(schema, table_name)
+        try:
+            # one row per b-tree with the aggregate argument of dbstat
+            page_sizes = connection.execute(
+                text(
+                    f"SELECT m.tbl_name, m.type, SUM(d.pgsize) "
+                    f"FROM dbstat(:schema, 1) d JOIN {master} m ON m.name = d.name "
+                    "GROUP BY m.tbl_name, m.type"
+                ),
+                {"schema": schema},
+            ).all()
+        except OperationalError:
+            # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+            page_sizes = []
+        for table_name, object_type, size in page_sizes:
+            if table_name not in sizes:
+                continue
+            if object_type == "table":
+                sizes[table_name].data_bytes = size
+            else:
+                sizes[table_name].index_bytes = size
+        has_stats = connection.execute(
+            text(f"SELECT 1 FROM {master} WHERE name = 'sqlite_stat1'")
+        ).first()
+        if has_stats:
+            # the first number of every statistic of a table is its row count
+            for table_name, stat in connection.execute(
+                text(f"SELECT tbl, stat FROM {quoted_schema}.sqlite_stat1")
+            ):
+                if table_name in sizes and stat:
+                    sizes[table_name].rows = int(stat.split()[0])
+    for size in sizes.values():
+        if size.data_bytes is not None and size.index_bytes is None:
+            size.index_bytes = 0
+    return list(sizes.values())
+
+
+def get_table_sizes(engine: Engine, schema: str | None = None) -> list[TableSize]:
+    """Get the estimated row count, data size and index size of every table.
+
+    The figures are read from the statistics of the system catalog in one
+    query per database, without scanning the tables: `pg_class` on Postgres,
+    `sys.dm_db_partition_stats` on MSSQL and the `dbstat` virtual table and
+    `sqlite_stat1` on SQLite, whose row counts are only known after `ANALYZE`.
+    System schemas are skipped unless `schema` names one.
+
+    Raises:
+        UnsupportedDialectError: for unsupported dialects.
+    """
+    match engine.dialect.name:
+        case "postgresql":
+            sizes = _get_postgresql_sizes(engine, schema)
+        case "mssql":
+            sizes = _get_mssql_sizes(engine, schema)
+        case "sqlite":
+            sizes = _get_sqlite_sizes(engine, schema)
+        case _:
+            raise UnsupportedDialectError(
+                f"Table sizes are not supported for dialect '{engine.dialect.name}'"
+            )
+    schemas = set(
+        select_schemas({size.schema for size in sizes}, [schema] if schema else None)
+    )
+    return [size for size in sizes if size.schema in schemas]
+
+
+def count_rows(
+    engine: Engine,
+    sizes: list[TableSize],
+    jobs: int = DEFAULT_COUNT_JOBS,
+    on_count: Callable[[TableSize], None] | None = None,
+) -> None:
+    """Replace the estimated row counts with `COUNT(*)` results, counting at
+    most `jobs` tables at once."""
+
+    def count(size: TableSize) -> TableSize:
+        query = select(func.count()).select_from(table(size.name, schema=size.schema))
+        with engine.connect() as connection:
+            size.rows = connection.execute(query).scalar_one()
+        size.exact = True
+        return size
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for size in executor.map(count, sizes):
+            if on_count:
+                on_count(size)
+
+
+def sort_table_sizes(sizes: list[TableSize], sort_by: SizeSortKey) -> list[TableSize]:
+    """Sort table sizes by name, or by decreasing figure with unknowns last."""
+    if sort_by == SizeSortKey.name:
+        return sorted(sizes, key=lambda size: (size.schema, size.name))
+    attribute = {
+        SizeSortKey.rows: "rows",
+        SizeSortKey.data: "data_bytes",
+        SizeSortKey.index: "index_bytes",
+        SizeSortKey.total: "total_bytes",
+    }[sort_by]
+
+    def key(size: TableSize) -> tuple:
+        value = getattr(size, attribute)
+        return (value is None, -(value or 0), size.schema, size.name)
+
+    return sorted(sizes, key=key)
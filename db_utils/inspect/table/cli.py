@@ -5,13 +5,12 @@ from typing import Annotated, Optional
 import typer
 from rich.console import Console
 from rich.table import Table
-from sqlalchemy import MetaData
-from sqlalchemy import Table as SqlTable
-from sqlalchemy import create_engine, inspect, select
 
 from db_utils.cli_utils import typer_error_msg_to_stdout
 from db_utils.enums import OutputFormat
-from db_utils.inspect.table.main import get_table_schema_object
+from db_utils.exceptions import UnsupportedDialectError
+from db_utils.inspect.enums import SampleStrategy
+from db_utils.output import STREAM_WRITERS
 from db_utils.utils import autocomplete_tables
 
 app = typer.Typer()
@@ -32,22 +31,60 @@ def inspect_table_columns(
     output: Annotated[
         OutputFormat, typer.Option(..., "--output", "-o")
     ] = OutputFormat.TSV,
+    refresh: Annotated[
+        bool,
+        typer.Option(
+            ..., "--refresh", "-r", help="Reflect the table ignoring the local cache."
+        ),
+    ] = False,
 ):
     """
     Inspect the schema for a table.
     """
+    from sqlalchemy import create_engine, inspect
+
+    from db_utils.catalog.cache import CatalogCache
+    from db_utils.daemon.client import get_daemon_client
+    from db_utils.daemon.protocol import DaemonError
+    from db_utils.inspect.table.main import (
+        get_table_schema_object,
+        table_schema_from_dict,
+    )
+
     db_url = ctx.obj.db_url
-    engine = create_engine(db_url)
 
     if "." in table_name:
         db_schema, table_name = table_name.split(".")
     if not db_schema:
         typer_error_msg_to_stdout("Schema name is required")
 
-    inspector = inspect(engine)
-    table_schema = get_table_schema_object(
-        inspector, table_name=table_name, db_schema=db_schema, extra=extra
-    )
+    with CatalogCache() as catalog_cache:
+        table_schema = None
+        if not refresh:
+            table_schema = catalog_cache.get_table_schema(
+                db_url, db_schema, table_name, extra=extra
+            )
+        if table_schema is None:
+            # a running daemon reflects on its warm connections
+            daemon_client = get_daemon_client()
+            if daemon_client:
+                try:
+                    table_schema = table_schema_from_dict(
+                        daemon_client.get_table_schema(db_url, db_schema, table_name),
+                        extra=True,
+                    )
+                except DaemonError as e:
+                    typer_error_msg_to_stdout(e)
+            else:
+                table_schema = get_table_schema_object(
+                    inspect(create_engine(db_url)),
+                    table_name=table_name,
+                    db_schema=db_schema,
+                    extra=True,
+                )
+            catalog_cache.set_table_schema(db_url, db_schema, table_schema)
+            if not extra:
+                table_schema = table_schema_from_dict(asdict(table_schema))
     match output:
         case OutputFormat.TSV:
             max_len_name = max([len(column.name) for column in table_schema.columns])
@@ -76,28 +113,210 @@ def table_sample(
         OutputFormat, typer.Option(..., "--output", "-o")
     ] = OutputFormat.TSV,
     schema_name: Annotated[Optional[str], typer.Option(..., "--schema", "-s")] = None,
-    limit: Annotated[Optional[int], typer.Option(..., "--size", "-n")] = 5,
+    size: Annotated[
+        str, typer.Option(..., "--size", "-n", help="Number of rows or 'all'.")
+    ] = "5",
+    batch_size: Annotated[
+        int,
+        typer.Option(..., "--batch-size", help="Rows fetched from the server at once."),
+    ] = 1000,
+    output_file: Annotated[
+        Optional[str],
+        typer.Option(..., "--output-file", "-f", help="File for parquet/arrow output."),
+    ] = None,
+    strategy: Annotated[
+        SampleStrategy,
+        typer.Option(
+            ...,
+            "--strategy",
+            help="first rows, random rows, server-side table sample or random "
+            "rows per value of --by.",
+        ),
+    ] = SampleStrategy.first,
+    percent: Annotated[
+        Optional[float],
+        typer.Option(
+            ...,
+            "--percent",
+            "-p",
+            min=0,
+            max=100,
+            help="Percent of the table pages (tablesample) or rows (random) sampled.",
+        ),
+    ] = None,
+    by: Annotated[
+        Optional[str],
+        typer.Option(..., "--by", help="Column to stratify by, --size rows each."),
+    ] = None,
 ):
+    from sqlalchemy import create_engine, inspect
+
+    from db_utils.arrow_output import arrow_schema_from_columns, write_arrow_output
+    from db_utils.daemon.client import get_daemon_client
+    from db_utils.daemon.protocol import DaemonError
+    from db_utils.inspect.table.sampling import build_sample_query, get_sample_table
+    from db_utils.run.main import open_query_stream
+
+    if size.lower() == "all":
+        limit = None
+    elif size.isdigit():
+        limit = int(size)
+    else:
+        typer_error_msg_to_stdout(f"Invalid size {size!r}, expected a number or 'all'")
     db_url = ctx.obj.db_url
     engine = create_engine(db_url)
     if "." in table_name:
         schema_name, table_name = table_name.split(".")
-    metadata = MetaData(schema=schema_name)
-    table = SqlTable(table_name, metadata, autoload_with=engine)
-    with engine.connect() as connection:
-        results = connection.execute(select(table).limit(limit)).all()
+    # only column types for arrow outputs and names for strata are reflected
+    arrow_output = output in (OutputFormat.PARQUET, OutputFormat.ARROW)
+    reflect = arrow_output or strategy == SampleStrategy.stratified
+    # a running daemon samples on its warm connections, arrow outputs need
+    # the column types reflected here
+    daemon_client = None if arrow_output else get_daemon_client()
+    if daemon_client:
+        query_stream = daemon_client.sample_stream(
+            db_url,
+            table_name,
+            schema_name,
+            strategy.value,
+            limit,
+            percent,
+            by,
+            reflect,
+            batch_size,
+        )
+    else:
+        table = get_sample_table(
+            table_name, schema_name, inspect(engine) if reflect else None
+        )
+        try:
+            query = build_sample_query(
+                engine.dialect.name, table, strategy, limit, percent, by
+            )
+        except (ValueError, UnsupportedDialectError) as e:
+            typer_error_msg_to_stdout(e)
+        query_stream = open_query_stream(engine, query, batch_size=batch_size)
+    try:
+        with query_stream as stream:
+            if arrow_output:
+                try:
+                    row_count = write_arrow_output(
+                        output,
+                        stream.columns,
+                        stream.batches(),
+                        output_file,
+                        arrow_schema_from_columns(table.columns),
+                    )
+                except (ImportError, ValueError) as e:
+                    typer_error_msg_to_stdout(e)
+                typer.secho(f"{row_count} rows written", err=True)
+                return
+            if output in STREAM_WRITERS:
+                STREAM_WRITERS[output](stream.columns, stream.batches())
+                return
+            for key in stream.columns:
+                rich_table.add_column(key, style="dim", no_wrap=False)
+            for batch in stream.batches():
+                for row in batch:
+                    rich_table.add_row(*[str(x) for x in row])
+            console.print(rich_table)
+    except DaemonError as e:
+        typer_error_msg_to_stdout(e)
+
+
+def _format_profile_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
 
-    results_as_dict: list[dict] = [row._asdict() for row in results]
-    column_names = results_as_dict[0].keys()
+@app.command("profile", help="Profile the columns of a table.")
+def table_profile(
+    ctx: typer.Context,
+    table_name: Annotated[
+        str, typer.Argument(..., help="Table name", autocompletion=autocomplete_tables)
+    ],
+    schema_name: Annotated[Optional[str], typer.Option(..., "--schema", "-s")] = None,
+    output: Annotated[
+        OutputFormat, typer.Option(..., "--output", "-o")
+    ] = OutputFormat.TABLE,
+    sample: Annotated[
+        Optional[float],
+        typer.Option(
+            ...,
+            "--sample",
+            min=0,
+            max=1,
+            help="Fraction of the rows profiled, all of them by default.",
+        ),
+    ] = None,
+    top: Annotated[
+        int, typer.Option(..., "--top", "-k", help="Most frequent values per column.")
+    ] = 5,
+):
+    """
+    Profile the columns of a table: null fraction, distinct count, min, max,
+    average length and most frequent values, computed by the server in two
+    queries for all the columns.
+    """
+    from sqlalchemy import create_engine, inspect
+    from sqlalchemy.exc import NoSuchTableError
+
+    from db_utils.daemon.client import get_daemon_client
+    from db_utils.daemon.protocol import DaemonError
+    from db_utils.inspect.table.profile import profile_table, table_profile_from_dict
+
+    db_url = ctx.obj.db_url
+    try:
+        # a running daemon profiles on its warm connections
+        daemon_client = get_daemon_client()
+        if daemon_client:
+            profile = table_profile_from_dict(
+                daemon_client.profile_table(
+                    db_url, table_name, schema_name, sample, top
+                )
+            )
+        else:
+            profile = profile_table(
+                inspect(create_engine(db_url)), table_name, schema_name, sample, top
+            )
+    except (ValueError, DaemonError) as e:
+        typer_error_msg_to_stdout(e)
+    except NoSuchTableError:
+        typer_error_msg_to_stdout(f"Table '{table_name}' not found")
+
+    headers = ["column", "type", "null_fraction", "distinct", "min", "max"]
+    headers += ["avg_length", "top_values"]
+    rows = [
+        [
+            column.name,
+            column.type,
+            _format_profile_value(column.null_fraction),
+            _format_profile_value(column.distinct),
+            _format_profile_value(column.min),
+            _format_profile_value(column.max),
+            _format_profile_value(column.avg_length),
+            ", ".join(f"{value} ({count})" for value, count in column.top_values),
+        ]
+        for column in profile.columns
+    ]
+    sampled = f", {profile.sample:.0%} sample" if profile.sample else ""
     match output:
         case OutputFormat.TSV:
-            print("\t".join(column_names))
-            for row in results:
-                print("\t".join([str(x) for x in row]))
+            print("\t".join(headers))
+            for row in rows:
+                print("\t".join(row))
         case OutputFormat.TABLE:
-            for key in column_names:
-                rich_table.add_column(key, style="dim", no_wrap=False)
-            for row in results_as_dict:
-                results_to_str = [str(x) for x in row.values()]
-                rich_table.add_row(*results_to_str)
+            for header in headers:
+                rich_table.add_column(header)
+            for row in rows:
+                rich_table.add_row(*row)
             console.print(rich_table)
+        case OutputFormat.JSON:
+            print(json.dumps(asdict(profile), default=str))
+        case _:
+            typer_error_msg_to_stdout(f"Output format {output} not supported.")
+    if output != OutputFormat.JSON:
+        Console(stderr=True).print(f"{profile.rows} rows{sampled}")
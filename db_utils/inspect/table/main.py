@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Optional
 
 from sqlalchemy import Inspector
 
@@ -48,19 +48,43 @@ def get_table_schema_object(
     """Get the schema of a database table."""
     if "." in table_name:
         db_schema, table_name = table_name.split(".")
+    return build_table_schema(
+        table_name,
+        columns=inspector.get_columns(table_name, schema=db_schema),
+        pk=inspector.get_pk_constraint(table_name, schema=db_schema),
+        fks=inspector.get_foreign_keys(table_name, schema=db_schema),
+        extra=extra,
+    )
+
+
+def build_table_schema(
+    table_name: str,
+    columns: list[dict[str, Any]],
+    pk: dict[str, Any] | None = None,
+    fks: list[dict[str, Any]] | None = None,
+    extra: bool = False,
+) -> TableSchema:
+    """Build a table schema from reflected column, PK and FK records.
+
+    The records follow the format returned by the SQLAlchemy inspector
+    (`get_columns`, `get_pk_constraint` and `get_foreign_keys`), so they can
+    come from single-table calls as well as from the `get_multi_*` variants.
+    """
     # PK
-    pk_object = inspector.get_pk_constraint(table_name, schema=db_schema)
-    table_pk = TablePk(name=pk_object["name"], columns=pk_object["constrained_columns"])
+    pk = pk or {}
+    table_pk = TablePk(
+        name=pk.get("name"), columns=list(pk.get("constrained_columns") or [])
+    )
 
     # FK
     table_fks: list[TableFk] = []
-    for fk in inspector.get_foreign_keys(table_name, schema=db_schema):
+    for fk in fks or []:
         fk_ref = FkReference(name=fk["referred_table"], columns=fk["referred_columns"])
         table_fks.append(TableFk(columns=fk["constrained_columns"], references=fk_ref))
 
     # Columns
     table_columns: list[TableColumn] = []
-    for column in inspector.get_columns(table_name, schema=db_schema):
+    for column in columns:
         col = TableColumn(
             name=column["name"], type=str(column["type"]), nullable=column["nullable"]
         )
@@ -79,5 +103,22 @@ def get_table_schema_object(
     return table_schema
 
 
+def table_schema_from_dict(data: dict[str, Any], extra: bool = False) -> TableSchema:
+    """Rebuild a table schema from its dictionary representation (`asdict`)."""
+    columns = [TableColumn(**column) for column in data["columns"]]
+    if not extra:
+        for column in columns:
+            column.is_pk = column.is_fk = None
+    return TableSchema(
+        name=data["name"],
+        columns=columns,
+        pk=TablePk(**data["pk"]),
+        fks=[
+            TableFk(columns=fk["columns"], references=FkReference(**fk["references"]))
+            for fk in data["fks"]
+        ],
+    )
+
+
 if __name__ == "__main__":
     pass
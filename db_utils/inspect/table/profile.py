@@ -0,0 +1,291 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Inspector,
+    MetaData,
+    Table,
+    Text,
+    Unicode,
+    case,
+    cast,
+    func,
+    insert,
+    literal,
+    select,
+)
+from sqlalchemy import types as sqltypes
+from sqlalchemy import union_all
+from sqlalchemy.engine import Connection, Dialect
+from sqlalchemy.sql.expression import ColumnElement, FromClause
+
+from db_utils.inspect.enums import SampleStrategy
+from db_utils.inspect.table.main import get_table_schema_object
+from db_utils.inspect.table.sampling import build_sample_query, get_light_table
+
+DEFAULT_TOP_VALUES = 5
+
+
+@dataclass
+class ColumnProfile:
+    name: str
+    type: str
+    nulls: int = 0
+    null_fraction: float = 0.0
+    distinct: int | None = None
+    min: Any = None
+    max: Any = None
+    avg_length: float | None = None
+    top_values: list[tuple[str, int]] = field(default_factory=list)
+
+
+@dataclass
+class TableProfile:
+    name: str
+    rows: int
+    sample: float | None
+    columns: list[ColumnProfile]
+
+
+def table_profile_from_dict(data: dict[str, Any]) -> TableProfile:
+    """Rebuild a table profile from its dictionary representation (`asdict`)."""
+    columns = [
+        ColumnProfile(
+            **{**column, "top_values": [tuple(v) for v in column["top_values"]]}
+        )
+        for column in data["columns"]
+    ]
+    return TableProfile(**{**data, "columns": columns})
+
+
+def _generic_type(column: ColumnElement) -> sqltypes.TypeEngine | None:
+    try:
+        return column.type.as_generic()
+    except NotImplementedError:
+        return None
+
+
+def is_groupable(dialect_name: str, column: ColumnElement) -> bool:
+    """Whether the values of a column can be grouped and counted distinctly."""
+    match _generic_type(column):
+        case sqltypes.Text() if dialect_name == "mssql":
+            # TEXT and NTEXT can not be compared on MSSQL
+            return False
+        case (
+            sqltypes.Boolean()
+            | sqltypes.Integer()
+            | sqltypes.Numeric()
+            | sqltypes.String()
+            | sqltypes.Date()
+            | sqltypes.DateTime()
+            | sqltypes.Time()
+            | sqltypes.Enum()
+        ):
+            return True
+    return False
+
+
+def is_comparable(dialect_name: str, column: ColumnElement) -> bool:
+    """Whether `MIN` and `MAX` apply to the values of a column."""
+    if isinstance(_generic_type(column), sqltypes.Boolean):
+        # no MIN on Postgres booleans and MSSQL bits
+        return False
+    return is_groupable(dialect_name, column)
+
+
+def is_string(dialect_name: str, column: ColumnElement) -> bool:
+    """Whether the length of the values of a column can be measured."""
+    match _generic_type(column):
+        case sqltypes.Text() if dialect_name == "mssql":
+            # no LEN of TEXT and NTEXT on MSSQL
+            return False
+        case sqltypes.String():
+            return True
+    return False
+
+
+def _non_null_count(dialect_name: str, column: ColumnElement) -> ColumnElement:
+    if dialect_name == "mssql" and isinstance(
+        _generic_type(column), (sqltypes.Text, sqltypes.LargeBinary)
+    ):
+        # no COUNT of TEXT, NTEXT and IMAGE on MSSQL, SUM is NULL without rows
+        return func.coalesce(func.sum(case((column.is_not(None), 1), else_=0)), 0)
+    return func.count(column)
+
+
+def _distinct_count(dialect: Dialect, column: ColumnElement) -> ColumnElement:
+    if dialect.name == "mssql" and (dialect.server_version_info or (0,)) >= (15,):
+        # HyperLogLog estimate, without sorting the values (SQL Server 2019+)
+        return func.approx_count_distinct(column)
+    return func.count(column.distinct())
+
+
+def _text(dialect_name: str, column: ColumnElement) -> ColumnElement:
+    return cast(column, Unicode() if dialect_name == "mssql" else Text())
+
+
+def build_profile_query(dialect: Dialect, source: FromClause) -> Any:
+    """Build the single aggregated query profiling every column of a source.
+
+    The result has the row count first, then per column its non-null count,
+    and its distinct count, min, max and average length where they apply,
+    labelled by column position. The dialect must have connected once, the
+    server version picks the distinct count function.
+    """
+    dialect_name = dialect.name
+    aggregates: list[ColumnElement] = [func.count().label("rows")]
+    for index, column in enumerate(source.columns):
+        aggregates.append(
+            _non_null_count(dialect_name, column).label(f"non_null_{index}")
+        )
+        if is_groupable(dialect_name, column):
+            aggregates.append(
+                _distinct_count(dialect, column).label(f"distinct_{index}")
+            )
+        if is_comparable(dialect_name, column):
+            aggregates.append(func.min(column).label(f"min_{index}"))
+            aggregates.append(func.max(column).label(f"max_{index}"))
+        if is_string(dialect_name, column):
+            aggregates.append(
+                func.avg(cast(func.length(column), Float)).label(f"avg_length_{index}")
+            )
+    return select(*aggregates).select_from(source)
+
+
+def build_top_values_query(dialect_name: str, source: FromClause, top: int) -> Any:
+    """Build the query of the `top` most frequent values of every groupable
+    column of a source, one `UNION ALL` member per column.
+
+    Returns None when no column can be grouped.
+    """
+    members = []
+    for index, column in enumerate(source.columns):
+        if not is_groupable(dialect_name, column):
+            continue
+        counts = (
+            select(column.label("value"), func.count().label("count"))
+            .where(column.is_not(None))
+            .group_by(column)
+            .order_by(func.count().desc(), column)
+            .limit(top)
+            .subquery()
+        )
+        members.append(
+            select(
+                literal(index).label("position"),
+                _text(dialect_name, counts.c.value).label("value"),
+                counts.c["count"],
+            )
+        )
+    if not members:
+        return None
+    return union_all(*members)
+
+
+def create_sample_table(connection: Connection, table: Table, sample: float) -> Table:
+    """Copy a Bernoulli sample of a fraction of the rows of a table to a
+    temporary table.
+
+    Both profile statements read the same sample, drawn once, where a CTE
+    would be drawn again by every statement, and on MSSQL by every member of
+    the top values query.
+    """
+    dialect_name = connection.dialect.name
+    sample_table = Table(
+        "#profile_sample" if dialect_name == "mssql" else "profile_sample",
+        MetaData(),
+        *[Column(column.name, column.type) for column in table.columns],
+        prefixes=[] if dialect_name == "mssql" else ["TEMPORARY"],
+    )
+    sample_table.create(connection)
+    sample_query = build_sample_query(
+        dialect_name, table, SampleStrategy.random, percent=sample * 100
+    )
+    connection.execute(
+        insert(sample_table).from_select(
+            [column.name for column in table.columns], sample_query
+        )
+    )
+    return sample_table
+
+
+def _number(value: Any) -> float | None:
+    return None if value is None else float(value)
+
+
+def profile_table(
+    inspector: Inspector,
+    table_name: str,
+    schema: str | None = None,
+    sample: float | None = None,
+    top: int = DEFAULT_TOP_VALUES,
+) -> TableProfile:
+    """Profile the columns of a table in two statements.
+
+    A single aggregated query gets the null counts, distinct counts, min, max
+    and average lengths of all the columns, and a `UNION ALL` query their
+    most frequent values. With `sample`, a fraction between 0 and 1, only that
+    fraction of the rows is read, with a Bernoulli sample copied to a
+    temporary table, and the figures are those of the sample. Distinct counts
+    are estimates on SQL Server 2019 and later.
+
+    Raises:
+        ValueError: for a sample fraction out of (0, 1].
+    """
+    if "." in table_name:
+        schema, table_name = table_name.split(".")
+    if sample is not None and not 0 < sample <= 1:
+        raise ValueError(f"Sample fraction must be in (0, 1], got {sample}")
+    table_schema = get_table_schema_object(inspector, table_name, schema)
+    table: Table = get_light_table(inspector, table_name, schema)
+    dialect_name = inspector.engine.dialect.name
+
+    with inspector.engine.connect() as connection:
+        source: Table = table
+        if sample is not None and sample < 1:
+            source = create_sample_table(connection, table, sample)
+        try:
+            aggregates = (
+                connection.execute(build_profile_query(connection.dialect, source))
+                .one()
+                ._mapping
+            )
+            top_values_query = build_top_values_query(dialect_name, source, top)
+            top_values = (
+                connection.execute(top_values_query).all()
+                if top_values_query is not None
+                else []
+            )
+        finally:
+            if source is not table:
+                # the pooled connection must not keep the table
+                try:
+                    source.drop(connection)
+                    connection.commit()
+                except Exception:
+                    # after a failed statement, temporary tables go with the
+                    # discarded connection
+                    connection.invalidate()
+
+    rows = aggregates["rows"]
+    profiles = []
+    for index, column in enumerate(table_schema.columns):
+        non_null = aggregates[f"non_null_{index}"]
+        profiles.append(
+            ColumnProfile(
+                name=column.name,
+                type=column.type,
+                nulls=rows - non_null,
+                null_fraction=(rows - non_null) / rows if rows else 0.0,
+                distinct=aggregates.get(f"distinct_{index}"),
+                min=aggregates.get(f"min_{index}"),
+                max=aggregates.get(f"max_{index}"),
+                avg_length=_number(aggregates.get(f"avg_length_{index}")),
+            )
+        )
+    # the order of UNION ALL members is not guaranteed
+    for position, value, count in sorted(top_values, key=lambda r: (r[0], -r[2])):
+        profiles[position].top_values.append((value, count))
+    return TableProfile(name=table_name, rows=rows, sample=sample, columns=profiles)
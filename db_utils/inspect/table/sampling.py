@@ -0,0 +1,173 @@
+from sqlalchemy import (
+    Column,
+    Inspector,
+    MetaData,
+    Select,
+    Table,
+    column,
+    func,
+    literal,
+    literal_column,
+    select,
+    table,
+    tablesample,
+)
+from sqlalchemy.sql.expression import ColumnElement, FromClause, TableClause
+
+from db_utils.exceptions import UnsupportedDialectError
+from db_utils.inspect.enums import SampleStrategy
+
+# rows sampled by TABLESAMPLE when no percent is given
+DEFAULT_SAMPLE_PERCENT = 1.0
+
+
+def get_light_table(inspector: Inspector, table_name: str, schema: str | None) -> Table:
+    """Get a table with only its column names, types and nullability.
+
+    It costs a single catalog query, instead of the several needed to reflect
+    constraints and indexes with `autoload_with`.
+    """
+    return Table(
+        table_name,
+        MetaData(),
+        *[
+            Column(c["name"], c["type"], nullable=c["nullable"])
+            for c in inspector.get_columns(table_name, schema=schema)
+        ],
+        schema=schema,
+    )
+
+
+def _random_order(dialect_name: str) -> ColumnElement:
+    return func.newid() if dialect_name == "mssql" else func.random()
+
+
+def _bernoulli_filter(dialect_name: str, percent: float) -> ColumnElement:
+    """Condition keeping each row with a `percent` probability."""
+    match dialect_name:
+        case "mssql":
+            random_int = func.abs(func.checksum(func.newid()))
+        case _:
+            random_int = func.abs(func.random())
+    return random_int % 10000 < literal(int(percent * 100))
+
+
+def _select_all(source: FromClause, sample_table: Table | TableClause) -> Select:
+    if sample_table.columns:
+        return select(*[source.c[c.name] for c in sample_table.columns])
+    return select(literal_column("*")).select_from(source)
+
+
+def build_sample_query(
+    dialect_name: str,
+    sample_table: Table | TableClause,
+    strategy: SampleStrategy = SampleStrategy.first,
+    size: int | None = None,
+    percent: float | None = None,
+    by: str | None = None,
+) -> Select:
+    """Build the query sampling `size` rows of a table with a strategy.
+
+    - first: the first rows the server returns.
+    - random: uniformly random rows. With `percent`, rows are kept with that
+      probability (Bernoulli) before picking `size` of them, avoiding a sort
+      of the whole table.
+    - tablesample: server-side block sampling of `percent` of the pages,
+      `TABLESAMPLE SYSTEM` on Postgres and MSSQL. On SQLite, a block of
+      consecutive rows starting at a random rowid.
+    - stratified: `size` random rows for every value of the `by` column.
+
+    `sample_table` can be a `table()` without columns, selecting `*`, except
+    for stratified samples which need the column names.
+
+    Raises:
+        ValueError: for stratified samples without `by` column or columns.
+        UnsupportedDialectError: for table samples on unsupported dialects.
+    """
+    query: Select
+    match strategy:
+        case SampleStrategy.first:
+            query = _select_all(sample_table, sample_table)
+        case SampleStrategy.random:
+            query = _select_all(sample_table, sample_table)
+            if percent is not None and dialect_name == "postgresql":
+                sampled = tablesample(sample_table, func.bernoulli(percent))
+                query = _select_all(sampled, sample_table)
+            elif percent is not None:
+                query = query.where(_bernoulli_filter(dialect_name, percent))
+            if size is not None:
+                if dialect_name == "sqlite" and percent is None:
+                    # pick the rowids first, from the smallest index of the table
+                    rowids = (
+                        select(column("rowid"))
+                        .select_from(sample_table)
+                        .order_by(func.random())
+                        .limit(size)
+                    )
+                    return query.where(column("rowid").in_(rowids))
+                query = query.order_by(_random_order(dialect_name))
+        case SampleStrategy.tablesample:
+            sample_percent = DEFAULT_SAMPLE_PERCENT if percent is None else percent
+            match dialect_name:
+                case "postgresql":
+                    sampled = tablesample(sample_table, func.system(sample_percent))
+                    query = _select_all(sampled, sample_table)
+                case "mssql":
+                    sampled = tablesample(
+                        sample_table,
+                        func.system(literal_column(f"{float(sample_percent)} PERCENT")),
+                    )
+                    query = _select_all(sampled, sample_table)
+                case "sqlite" if percent is not None:
+                    query = _select_all(sample_table, sample_table).where(
+                        _bernoulli_filter(dialect_name, percent)
+                    )
+                case "sqlite":
+                    # seek to a random rowid, leaving room for `size` rows
+                    max_start = func.max(func.max(column("rowid")) - (size or 0), 1)
+                    start = (
+                        select(func.abs(func.random()) % max_start)
+                        .select_from(sample_table)
+                        .scalar_subquery()
+                    )
+                    query = (
+                        _select_all(sample_table, sample_table)
+                        .where(column("rowid") >= start)
+                        .order_by(column("rowid"))
+                    )
+                case _:
+                    raise UnsupportedDialectError(
+                        f"Table samples are not supported for dialect '{dialect_name}'"
+                    )
+        case SampleStrategy.stratified:
+            if not by:
+                raise ValueError("Stratified samples need a column to stratify by")
+            if not sample_table.columns:
+                raise ValueError("Stratified samples need the table columns")
+            if by not in sample_table.c:
+                raise ValueError(f"No column '{by}' in table '{sample_table.name}'")
+            ranked = select(
+                *sample_table.columns,
+                func.row_number()
+                .over(
+                    partition_by=sample_table.c[by],
+                    order_by=_random_order(dialect_name),
+                )
+                .label("sample_rank"),
+            ).subquery()
+            query = _select_all(ranked, sample_table)
+            if size is not None:
+                query = query.where(ranked.c.sample_rank <= size)
+            return query
+    if size is not None:
+        query = query.limit(size)
+    return query
+
+
+def get_sample_table(
+    table_name: str, schema: str | None, inspector: Inspector | None = None
+) -> Table | TableClause:
+    """Get the table to sample, reflecting its columns only with an inspector."""
+    if inspector is None:
+        return table(table_name, schema=schema)
+    return get_light_table(inspector, table_name, schema)
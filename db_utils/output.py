@@ -0,0 +1,77 @@
+import csv
+import json
+import sys
+from typing import Any, Iterable, Sequence, TextIO
+
+from db_utils.enums import OutputFormat
+
+
+def write_tsv(
+    columns: Sequence[str],
+    batches: Iterable[Sequence[Sequence[Any]]],
+    file: TextIO = sys.stdout,
+) -> int:
+    """Write rows as tab separated values as they arrive. Return the row count."""
+    row_count = 0
+    file.write("\t".join(columns) + "\n")
+    for batch in batches:
+        file.write("".join("\t".join(str(x) for x in row) + "\n" for row in batch))
+        row_count += len(batch)
+    return row_count
+
+
+def write_json_array(
+    columns: Sequence[str],
+    batches: Iterable[Sequence[Sequence[Any]]],
+    file: TextIO = sys.stdout,
+) -> int:
+    """Write rows as a JSON array of objects as they arrive. Return the row count."""
+    row_count = 0
+    file.write("[")
+    for batch in batches:
+        for row in batch:
+            separator = ",\n  " if row_count else "\n  "
+            file.write(separator + json.dumps(dict(zip(columns, row)), default=str))
+            row_count += 1
+    file.write("\n]\n" if row_count else "]\n")
+    return row_count
+
+
+def write_csv(
+    columns: Sequence[str],
+    batches: Iterable[Sequence[Sequence[Any]]],
+    file: TextIO = sys.stdout,
+) -> int:
+    """Write rows as comma separated values as they arrive. Return the row count."""
+    row_count = 0
+    writer = csv.writer(file, lineterminator="\n")
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        row_count += len(batch)
+    return row_count
+
+
+def write_jsonl(
+    columns: Sequence[str],
+    batches: Iterable[Sequence[Sequence[Any]]],
+    file: TextIO = sys.stdout,
+) -> int:
+    """Write rows as JSON Lines as they arrive. Return the row count."""
+    row_count = 0
+    for batch in batches:
+        file.write(
+            "".join(
+                json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in batch
+            )
+        )
+        row_count += len(batch)
+    return row_count
+
+
+STREAM_WRITERS = {
+    OutputFormat.TSV: write_tsv,
+    OutputFormat.CSV: write_csv,
+    OutputFormat.JSON: write_json_array,
+    OutputFormat.JSONL: write_jsonl,
+}
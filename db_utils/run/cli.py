@@ -1,17 +1,16 @@
-import json
 import pathlib
-import re
-import subprocess
 import sys
+from contextlib import nullcontext
 from typing import Optional
-from urllib.parse import quote_plus
 
-import sqlparse
 import typer
-from pyfzf.pyfzf import FzfPrompt
 from rich import print, print_json
 
-from db_utils.run.datatable import TableApp as DataTable
+from db_utils.cli_utils import typer_error_msg_to_stdout
+from db_utils.enums import OutputFormat
+from db_utils.output import STREAM_WRITERS
+from db_utils.run.enums import QueryBackend
+from db_utils.run.queries import get_query_index, read_query
 from db_utils.run.schemas import QueryData
 
 app = typer.Typer()
@@ -24,19 +23,52 @@ def query(
     query_name: Optional[str] = typer.Option(
         None, "--query-name", "-q", help="Name of the query to run"
     ),
-    output: str = typer.Option(
-        "table", "--output", "-o", help="Output format: table, json"
+    output: OutputFormat = typer.Option(
+        OutputFormat.TABLE, "--output", "-o", help="Output format"
+    ),
+    backend: QueryBackend = typer.Option(
+        QueryBackend.NATIVE, "--backend", "-b", help="Engine used to run the query"
+    ),
+    batch_size: int = typer.Option(
+        1000, "--batch-size", help="Rows fetched from the server per round trip"
+    ),
+    load_all: bool = typer.Option(
+        False,
+        "--load-all",
+        "-a",
+        help="Load the whole result in the table viewer to sort, filter and search",
+    ),
+    output_file: Optional[str] = typer.Option(
+        None, "--output-file", "-f", help="File for parquet/arrow output"
     ),
 ):
     """
     Run SQL script from file and show results in a table.
     """
+    from sqlalchemy import create_engine
+
+    from db_utils.daemon.client import get_daemon_client
+    from db_utils.daemon.protocol import DaemonError
+    from db_utils.run.main import (
+        RerunnableQuerySource,
+        get_query_bind_names,
+        is_select_query,
+        open_query_stream,
+        run_query_with_usql,
+    )
+
     db_url = ctx.obj.db_url
 
-    # select file from fzf prompt
-    queries_data = get_queries_from_sql_file(pathlib.Path(sql_file))
+    # select query from fzf prompt, only the selected statement is read
+    sql_path = pathlib.Path(sql_file)
+    try:
+        queries_index = get_query_index(sql_path)
+    except ValueError as e:
+        typer_error_msg_to_stdout(e)
     if not query_name:
-        queries_names = [q["name"] for q in queries_data]
+        from pyfzf.pyfzf import FzfPrompt
+
+        queries_names = [q["name"] for q in queries_index]
         selected_query_name = str(
             FzfPrompt().prompt(
                 queries_names, "--prompt='Select SQL query: ' --reverse --height=50%"
@@ -44,61 +76,111 @@ def query(
         )
     else:
         selected_query_name = query_name
-    selected_query = [q for q in queries_data if q["name"] == selected_query_name][0]
-    if not selected_query_name:
-        print("[red]No query selected[/red]", file=sys.stderr)
-    # obtain text query from file
+    selected_queries = [q for q in queries_index if q["name"] == selected_query_name]
+    if not selected_queries:
+        typer_error_msg_to_stdout(f"No query named '{selected_query_name}'")
+    query_str = read_query(sql_path, selected_queries[0])["query"]
     if db_url.drivername == "sqlite":
         if not pathlib.Path(db_url.database).exists():
             raise ValueError(f"Database file {db_url.database} does not exist")
-        db_url_str = f"{db_url.drivername}://{db_url.database}"
-    else:
-        db_url_str = f"{db_url.drivername.split('+')[0]}://{db_url.username}:{quote_plus(db_url.password)}@{db_url.host}:{db_url.port}/{db_url.database}"
-    query_str = selected_query["query"]
-    # Read json results
-    cmd_args = ["usql", "-c", query_str, db_url_str, "--json", "-q"]
 
-    print(f"Running: {' '.join(cmd_args)}", file=sys.stderr)
+    if backend == QueryBackend.USQL:
+        query_results = run_query_with_usql(db_url, query_str)
+        if not query_results:
+            print("[red]No results[/red]", file=sys.stderr)
+            return
+        columns = list(query_results[0])
+        batches = [[list(row.values()) for row in query_results]]
+        match output:
+            case OutputFormat.TABLE:
+                from db_utils.run.columnar import ColumnStore, ColumnStoreSource
+                from db_utils.run.datatable import TableApp as DataTable
 
-    run_results = subprocess.run(cmd_args, capture_output=True)
-    if run_results.returncode != 0:
-        raise ValueError(run_results.stderr.decode())
-    try:
-        query_results = json.loads(run_results.stdout.decode())
-    except json.JSONDecodeError:
-        print(run_results.stdout)
-        raise ValueError("Invalid JSON output")
-    if not query_results:
-        print("[red]No results[/red]", file=sys.stderr)
-        return
-    if output == "json":
-        print_json(data=query_results)
+                store = ColumnStore.from_rows(query_results)
+                DataTable(ColumnStoreSource(store)).run()
+            case OutputFormat.JSON:
+                print_json(data=query_results)
+            case OutputFormat.PARQUET | OutputFormat.ARROW:
+                from db_utils.arrow_output import write_arrow_output
+
+                try:
+                    row_count = write_arrow_output(
+                        output, columns, batches, output_file
+                    )
+                except (ImportError, ValueError) as e:
+                    typer_error_msg_to_stdout(e)
+                print(f"{row_count} rows written", file=sys.stderr)
+            case _:
+                STREAM_WRITERS[output](columns, batches)
         return
-    elif output == "table":
-        datatable_app = DataTable(query_results)
-        datatable_app.run()
-    else:
-        raise ValueError("Invalid output type")
+
+    params = {name: typer.prompt(name) for name in get_query_bind_names(query_str)}
+    # a running daemon holds warm connections
+    daemon_client = get_daemon_client()
+    engine = None if daemon_client else create_engine(db_url)
+
+    def open_stream():
+        if daemon_client:
+            return daemon_client.query_stream(db_url, query_str, params, batch_size)
+        return open_query_stream(engine, query_str, params, batch_size)
+
+    try:
+        with open_stream() as stream:
+            if not stream.returns_rows:
+                print(f"{stream.rowcount} rows affected", file=sys.stderr)
+                return
+            match output:
+                case OutputFormat.TABLE if load_all:
+                    from db_utils.run.columnar import ColumnStore, ColumnStoreSource
+                    from db_utils.run.datatable import TableApp as DataTable
+
+                    store = ColumnStore.from_batches(stream.columns, stream.batches())
+                    if not len(store):
+                        print("[red]No results[/red]", file=sys.stderr)
+                        return
+                    DataTable(ColumnStoreSource(store)).run()
+                case OutputFormat.TABLE:
+                    from db_utils.run.datatable import TableApp as DataTable
+
+                    # rows evicted from the viewer are fetched again by running
+                    # the query again, only when it has no side effects
+                    source = (
+                        RerunnableQuerySource(stream, open_stream, batch_size)
+                        if is_select_query(query_str)
+                        else nullcontext(stream)
+                    )
+                    with source as rows:
+                        first_page = rows.fetch(batch_size)
+                        if not first_page:
+                            print("[red]No results[/red]", file=sys.stderr)
+                            return
+                        DataTable(
+                            rows, page_size=batch_size, first_page=first_page
+                        ).run()
+                case OutputFormat.PARQUET | OutputFormat.ARROW:
+                    from db_utils.arrow_output import (
+                        arrow_schema_from_description,
+                        write_arrow_output,
+                    )
+
+                    try:
+                        row_count = write_arrow_output(
+                            output,
+                            stream.columns,
+                            stream.batches(),
+                            output_file,
+                            arrow_schema_from_description(
+                                stream.columns, getattr(stream, "description", None)
+                            ),
+                        )
+                    except (ImportError, ValueError) as e:
+                        typer_error_msg_to_stdout(e)
+                    print(f"{row_count} rows written", file=sys.stderr)
+                case _:
+                    STREAM_WRITERS[output](stream.columns, stream.batches())
+    except DaemonError as e:
+        typer_error_msg_to_stdout(e)
 
 
 def get_queries_from_sql_file(sql_file: pathlib.Path) -> list[QueryData]:
-    queries: list[QueryData] = list()
-    with open(sql_file, "r") as f:
-        statements = sqlparse.parse(f.read())
-        for st in statements:
-            try:
-                comments = [t for t in st.tokens if isinstance(t, sqlparse.sql.Comment)]
-            except IndexError:
-                raise ValueError("No comment found")
-            comment_match = re.search(r"name: (\w+) :(\w+)", comments[0].value)
-            if not comment_match:
-                raise ValueError("No query name found")
-            name, _ = comment_match.groups()
-            query = "".join(
-                [t.value for t in st.tokens if not isinstance(t, sqlparse.sql.Comment)]
-            ).strip()
-            placeholders = list(set(re.findall(r":(\w+)", query)))
-            queries.append(QueryData(name=name, query=query, placeholders=placeholders))
-    if not queries:
-        raise ValueError("No queries found")
-    return queries
+    return [read_query(sql_file, entry) for entry in get_query_index(sql_file)]
@@ -0,0 +1,238 @@
+import datetime
+import decimal
+import operator
+import re
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+
+FILTER_OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _to_utc(
+    values: list[Any],
+) -> tuple[list[Any], datetime.tzinfo | None] | None:
+    """Convert timezone aware datetimes to naive UTC ones.
+
+    Returns the converted values and the timezone to display them in, the
+    common timezone of the values or UTC when their offsets differ. Returns
+    None when aware and naive datetimes are mixed.
+    """
+    timezones = {
+        v.utcoffset() is not None and v.tzinfo for v in values if v is not None
+    }
+    if not timezones or False in timezones:
+        return None
+    tz = timezones.pop() if len(timezones) == 1 else datetime.timezone.utc
+    return [
+        None if v is None else v.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        for v in values
+    ], tz
+
+
+def _to_array(values: list[Any]) -> np.ndarray:
+    """Convert column values to the narrowest numpy array that holds them.
+
+    Nulls are kept apart in a mask, so they are replaced here by a filler of
+    the column type.
+    """
+    non_null = [v for v in values if v is not None]
+    types = {type(v) for v in non_null}
+    if types == {bool}:
+        return np.array([bool(v) for v in values], dtype=bool)
+    if types == {int}:
+        try:
+            return np.array([0 if v is None else v for v in values], dtype=np.int64)
+        except OverflowError:
+            pass
+    if types and types <= {int, float}:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    if types == {datetime.datetime} and any(v.tzinfo is not None for v in non_null):
+        # aware datetimes go through `_to_utc` first, mixed ones stay objects
+        return np.array(values, dtype=object)
+    if types == {datetime.datetime} or types == {datetime.date}:
+        return np.array(
+            [np.datetime64("NaT") if v is None else v for v in values],
+            dtype="datetime64[us]" if types == {datetime.datetime} else "datetime64[D]",
+        )
+    return np.array(values, dtype=object)
+
+
+@dataclass
+class Column:
+    name: str
+    values: np.ndarray
+    nulls: np.ndarray
+    # timezone of aware datetimes, stored as naive UTC values
+    tz: datetime.tzinfo | None = None
+    _text: np.ndarray | None = field(default=None, repr=False)
+
+    @classmethod
+    def from_values(cls, name: str, values: list[Any]) -> "Column":
+        nulls = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+        tz = None
+        if any(isinstance(v, datetime.datetime) for v in values):
+            converted = _to_utc(values)
+            if converted is not None:
+                values, tz = converted
+        return cls(name=name, values=_to_array(values), nulls=nulls, tz=tz)
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.values.dtype.kind in "biufM"
+
+    @property
+    def text(self) -> np.ndarray:
+        """Lower case string representation of the values, used to search."""
+        if self._text is None:
+            if self.tz is not None:
+                values = np.array(
+                    [str(self.display(i)) for i in range(len(self.values))]
+                )
+            else:
+                values = self.values.astype(str)
+            self._text = np.char.lower(values)
+            self._text[self.nulls] = ""
+        return self._text
+
+    def sort_key(self) -> np.ndarray:
+        if self.is_numeric:
+            return self.values
+        if all(isinstance(v, decimal.Decimal) for v in self.values[~self.nulls]):
+            return np.where(self.nulls, 0, self.values).astype(np.float64)
+        return self.values.astype(str)
+
+    def parse(self, value: str) -> Any:
+        """Convert a string to the type of the column values."""
+        match self.values.dtype.kind:
+            case "b":
+                return value.lower() in ("1", "true", "t", "yes", "y")
+            case "i" | "u" | "f":
+                return float(value)
+            case "M" if self.tz is not None:
+                parsed = datetime.datetime.fromisoformat(value)
+                if parsed.tzinfo is None:
+                    parsed = parsed.replace(tzinfo=self.tz)
+                return np.datetime64(
+                    parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+                )
+            case "M":
+                return np.datetime64(value)
+        if all(isinstance(v, decimal.Decimal) for v in self.values[~self.nulls]):
+            return decimal.Decimal(value)
+        return value
+
+    def display(self, index: int) -> Any:
+        if self.nulls[index]:
+            return None
+        if self.tz is not None:
+            utc_value = self.values[index].astype("datetime64[us]").item()
+            return utc_value.replace(tzinfo=datetime.timezone.utc).astimezone(self.tz)
+        return self.values[index]
+
+
+class ColumnStore:
+    """Query results held as one typed array per column."""
+
+    def __init__(self, columns: list[Column]):
+        self.columns = columns
+        self.column_names = [column.name for column in columns]
+
+    @classmethod
+    def from_batches(
+        cls, column_names: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]]
+    ) -> "ColumnStore":
+        values: list[list[Any]] = [[] for _ in column_names]
+        for batch in batches:
+            for column_values, batch_values in zip(values, zip(*batch)):
+                column_values.extend(batch_values)
+        return cls(
+            [
+                Column.from_values(name, column_values)
+                for name, column_values in zip(column_names, values)
+            ]
+        )
+
+    @classmethod
+    def from_rows(cls, rows: list[dict[str, Any]]) -> "ColumnStore":
+        column_names = list(rows[0].keys()) if rows else []
+        return cls.from_batches(column_names, [[tuple(row.values()) for row in rows]])
+
+    def __len__(self) -> int:
+        return len(self.columns[0].values) if self.columns else 0
+
+    def row(self, index: int) -> tuple:
+        return tuple(column.display(index) for column in self.columns)
+
+    def argsort(self, column_index: int, descending: bool = False) -> np.ndarray:
+        """Get the row order sorted by a column, nulls last."""
+        column = self.columns[column_index]
+        order = np.argsort(column.sort_key(), kind="stable")
+        if descending:
+            order = order[::-1]
+        # stable partition moving nulls to the end
+        return np.concatenate([order[~column.nulls[order]], order[column.nulls[order]]])
+
+    def filter(self, column_index: int, predicate: str) -> np.ndarray:
+        """Get a mask of the rows matching a predicate on a column.
+
+        The predicate is an operator followed by a value, e.g. `>= 10`, where
+        the operator is one of `=`, `!=`, `<`, `<=`, `>`, `>=` or `~`
+        (contains, case insensitive). Without operator `~` is assumed.
+        """
+        column = self.columns[column_index]
+        match = re.match(r"^\s*(!=|<=|>=|=|<|>|~)?\s*(.*?)\s*$", predicate, re.DOTALL)
+        if not match:
+            raise ValueError(f"Invalid filter {predicate!r}")
+        op, value = match.groups()
+        if value.lower() == "null" and op in ("=", "!="):
+            return column.nulls if op == "=" else ~column.nulls
+        if not op or op == "~":
+            return self.search(column_index, value)
+        try:
+            parsed_value = column.parse(value)
+        except (ValueError, decimal.InvalidOperation):
+            raise ValueError(f"Invalid value {value!r} for column {column.name!r}")
+        compare = FILTER_OPERATORS[op]
+        if column.values.dtype == object:
+            values = column.sort_key()
+            if values.dtype.kind != "f":
+                parsed_value = str(parsed_value)
+            mask = compare(values, parsed_value)
+        else:
+            mask = compare(column.values, parsed_value)
+        return np.asarray(mask, dtype=bool) & ~column.nulls
+
+    def search(self, column_index: int, text: str) -> np.ndarray:
+        """Get a mask of the rows whose value contains a text, case insensitive."""
+        column = self.columns[column_index]
+        return np.char.find(column.text, text.lower()) >= 0
+
+
+class ColumnStoreSource:
+    """Row source over a `ColumnStore` following a given row order."""
+
+    def __init__(self, store: ColumnStore, order: np.ndarray | None = None):
+        self.store = store
+        self.order = np.arange(len(store)) if order is None else order
+        self.columns = store.column_names
+        self.position = 0
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def seek(self, position: int) -> None:
+        self.position = max(0, min(position, len(self.order)))
+
+    def fetch(self, size: int) -> list[tuple]:
+        indices = self.order[self.position : self.position + size]
+        self.position += len(indices)
+        return [self.store.row(index) for index in indices]
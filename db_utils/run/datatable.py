@@ -1,11 +1,16 @@
 import logging
-from typing import Any
+from collections import deque
+from typing import Any, Protocol, Sequence, runtime_checkable
 
+import numpy as np
 import pyperclip
 from rich.text import Text
 from textual.app import App, ComposeResult
 from textual.binding import Binding
-from textual.widgets import DataTable, Footer
+from textual.widgets import DataTable, Footer, Input
+from textual.widgets.data_table import RowKey
+
+from db_utils.run.columnar import ColumnStoreSource
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -14,21 +19,79 @@ logging.basicConfig(
 )
 
 
+class RowSource(Protocol):
+    columns: list[str]
+
+    def fetch(self, size: int) -> Sequence[Sequence[Any]]:
+        """Get up to `size` next rows, fewer only when there are no more rows."""
+        ...
+
+
+@runtime_checkable
+class SeekableRowSource(RowSource, Protocol):
+    position: int
+
+    def seek(self, position: int) -> None:
+        """Move to a position of the rows, the next fetch starts there."""
+        ...
+
+
+class ListRowSource:
+    def __init__(self, rows: list[dict[str, Any]]):
+        self.rows = rows
+        self.columns: list[str] = list(rows[0].keys()) if rows else []
+        self.position = 0
+
+    def seek(self, position: int) -> None:
+        self.position = max(0, min(position, len(self.rows)))
+
+    def fetch(self, size: int) -> list[tuple]:
+        batch = self.rows[self.position : self.position + size]
+        self.position += len(batch)
+        return [tuple(row.values()) for row in batch]
+
+
 class TableApp(App):
     BINDINGS = [
         ("c", "copy_cell_contents", "Copy"),
         ("b", "log_string", "Log"),
         ("ctrl+d", "down_ten", "Down 10"),
         ("ctrl+u", "up_ten", "Up 10"),
-        # vim style bindings
-        Binding("j", "down", "", show=False, priority=True),
-        Binding("k", "up", "", show=False, priority=True),
-        Binding("h", "left", "", show=False, priority=True),
-        Binding("l", "right", "", show=False, priority=True),
+        ("s", "sort", "Sort"),
+        ("f", "filter", "Filter"),
+        ("slash", "search", "Search"),
+        ("n", "next_match", "Next"),
+        ("r", "reset", "Reset"),
+        # vim style bindings, not priority so they can be typed in the prompt
+        Binding("j", "down", "", show=False),
+        Binding("k", "up", "", show=False),
+        Binding("h", "left", "", show=False),
+        Binding("l", "right", "", show=False),
     ]
 
-    def __init__(self, rows: list, **kwargs):
-        self.rows: list[dict[str, Any]] = rows
+    def __init__(
+        self,
+        rows: "list[dict[str, Any]] | RowSource",
+        page_size: int = 200,
+        max_rows: int = 2000,
+        first_page: Sequence[Sequence[Any]] | None = None,
+        **kwargs,
+    ):
+        self.source: RowSource = ListRowSource(rows) if isinstance(rows, list) else rows
+        # rows already fetched from the source, shown before fetching more
+        self.first_page = first_page
+        # rows fetched per page and rows kept in the table at most
+        self.page_size = page_size
+        self.max_rows = max(max_rows, 2 * page_size)
+        self.exhausted = False
+        self.rows_loaded = 0
+        self.row_keys: deque[RowKey] = deque()
+        # sort, filter and search state, only for results in a column store
+        self.sort_column: int | None = None
+        self.sort_descending = False
+        self.row_mask: np.ndarray | None = None
+        self.matches: np.ndarray = np.array([], dtype=np.int64)
+        self.prompt_action: str | None = None
         super().__init__(**kwargs)
 
     def compose(self) -> ComposeResult:
@@ -39,13 +102,173 @@ class TableApp(App):
         table = self.query_one(DataTable)
         table.cursor_type = "cell"
         table.zebra_stripes = True
-        table.add_columns(*self.rows[0].keys())
-        row_tuples = [tuple(row.values()) for row in self.rows]
-        for row in row_tuples:
+        table.add_columns(*self.source.columns)
+        self.load_page()
+
+    @property
+    def window_start(self) -> int:
+        """Position in the source of the first row in the table."""
+        return self.rows_loaded - len(self.row_keys)
+
+    def reset_source(self, source: RowSource, start: int = 0) -> None:
+        """Show rows of a new source starting at a position (if it can seek)."""
+        table = self.query_one(DataTable)
+        column = table.cursor_coordinate.column
+        table.clear()
+        self.row_keys.clear()
+        self.first_page = None
+        self.source = source
+        self.exhausted = False
+        self.rows_loaded = 0
+        if isinstance(source, SeekableRowSource):
+            source.seek(start)
+            self.rows_loaded = source.position
+        self.load_page()
+        table.move_cursor(column=column)
+
+    def move_to_position(self, position: int) -> None:
+        """Move the cursor to a position of the source, reloading the window if needed."""
+        table = self.query_one(DataTable)
+        if not self.window_start <= position < self.rows_loaded:
+            self.reset_source(self.source, start=max(position - self.page_size // 2, 0))
+        table.move_cursor(row=position - self.window_start)
+
+    def load_page(self) -> None:
+        """Fetch and style the next page of rows, evicting the oldest ones.
+
+        Evicted rows are fetched again by `load_previous_rows` when the cursor
+        goes back up to them.
+        """
+        if self.exhausted:
+            return
+        rows = self.first_page or self.source.fetch(self.page_size)
+        self.first_page = None
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        table = self.query_one(DataTable)
+        for row in rows:
             styled_row = [
                 Text(str(cell), style="italic #03AC13", justify="right") for cell in row
             ]
-            table.add_row(*styled_row)
+            self.rows_loaded += 1
+            self.row_keys.append(
+                table.add_row(*styled_row, label=str(self.rows_loaded))
+            )
+
+        excess = len(self.row_keys) - self.max_rows
+        if excess > 0:
+            cursor_row = table.cursor_coordinate.row
+            for _ in range(excess):
+                table.remove_row(self.row_keys.popleft())
+            table.move_cursor(row=max(cursor_row - excess, 0))
+
+    def load_previous_rows(self) -> None:
+        """Reload the window centered on the cursor, once the rows above it
+        were evicted.
+
+        Sources that can not seek have lost the evicted rows.
+        """
+        table = self.query_one(DataTable)
+        if not isinstance(self.source, SeekableRowSource):
+            if table.cursor_coordinate.row == 0:
+                self.notify("Rows above were dropped, use --load-all to scroll back")
+            return
+        position = self.window_start + table.cursor_coordinate.row
+        self.reset_source(self.source, start=max(position - self.max_rows // 2, 0))
+        while not self.exhausted and self.rows_loaded < position + self.page_size:
+            self.load_page()
+        table.move_cursor(row=position - self.window_start)
+
+    def on_data_table_cell_highlighted(self, event: DataTable.CellHighlighted) -> None:
+        table = self.query_one(DataTable)
+        # the cursor, not the event, as the table may have been reloaded since
+        row = table.cursor_coordinate.row
+        if row >= table.row_count - self.page_size // 2:
+            self.load_page()
+        elif row < self.page_size // 2 and self.window_start > 0:
+            self.load_previous_rows()
+
+    def get_column_store_source(self) -> ColumnStoreSource | None:
+        if isinstance(self.source, ColumnStoreSource):
+            return self.source
+        self.notify("Load the whole result (--load-all) to sort, filter or search")
+        return None
+
+    def apply_order(self) -> None:
+        """Show the rows of the store following the current sort and filter."""
+        source = self.get_column_store_source()
+        if source is None:
+            return
+        store = source.store
+        if self.sort_column is None:
+            order = np.arange(len(store))
+        else:
+            order = store.argsort(self.sort_column, self.sort_descending)
+        if self.row_mask is not None:
+            order = order[self.row_mask[order]]
+        self.matches = np.array([], dtype=np.int64)
+        self.reset_source(ColumnStoreSource(store, order))
+        self.sub_title = f"{len(order)} of {len(store)} rows"
+
+    def action_sort(self) -> None:
+        if self.get_column_store_source() is None:
+            return
+        column = self.query_one(DataTable).cursor_coordinate.column
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = column, False
+        self.apply_order()
+
+    def action_filter(self) -> None:
+        self.open_prompt("filter", "Filter column, e.g. '>= 10', '= null', '~ text'")
+
+    def action_search(self) -> None:
+        self.open_prompt("search", "Search text in column")
+
+    def open_prompt(self, action: str, placeholder: str) -> None:
+        if self.get_column_store_source() is None:
+            return
+        self.prompt_action = action
+        prompt = Input(placeholder=placeholder)
+        self.mount(prompt, before=self.query_one(Footer))
+        prompt.focus()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        event.input.remove()
+        table = self.query_one(DataTable)
+        table.focus()
+        source = self.get_column_store_source()
+        if source is None or not event.value:
+            return
+        column = table.cursor_coordinate.column
+        if self.prompt_action == "filter":
+            try:
+                self.row_mask = source.store.filter(column, event.value)
+            except ValueError as e:
+                self.notify(str(e), severity="error")
+                return
+            self.apply_order()
+        elif self.prompt_action == "search":
+            mask = source.store.search(column, event.value)
+            # positions of the matches in the order shown
+            self.matches = np.flatnonzero(mask[source.order])
+            if not len(self.matches):
+                self.notify(f"No match for {event.value!r}")
+                return
+            self.action_next_match()
+
+    def action_next_match(self) -> None:
+        if not len(self.matches):
+            return
+        table = self.query_one(DataTable)
+        current = self.window_start + table.cursor_coordinate.row
+        next_index = np.searchsorted(self.matches, current, side="right")
+        self.move_to_position(int(self.matches[next_index % len(self.matches)]))
+
+    def action_reset(self) -> None:
+        self.sort_column, self.row_mask = None, None
+        self.apply_order()
 
     def action_copy_cell_contents(self) -> None:
         table = self.query_one(DataTable)
@@ -0,0 +1,6 @@
+from enum import StrEnum
+
+
+class QueryBackend(StrEnum):
+    NATIVE = "native"
+    USQL = "usql"
@@ -0,0 +1,139 @@
+import json
+import subprocess
+import sys
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Sequence
+from urllib.parse import quote_plus
+
+from sqlalchemy import Executable, Row, text
+from sqlalchemy.engine import CursorResult, Engine
+from sqlalchemy.engine.url import URL
+
+
+@dataclass
+class QueryStream:
+    result: CursorResult
+
+    @property
+    def returns_rows(self) -> bool:
+        return self.result.returns_rows
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.result.keys())
+
+    @property
+    def rowcount(self) -> int:
+        return self.result.rowcount
+
+    @property
+    def description(self) -> Sequence[Sequence[Any]] | None:
+        """DBAPI description of the result columns, with their type codes."""
+        return self.result.cursor.description if self.result.cursor else None
+
+    def fetch(self, size: int) -> Sequence[Row]:
+        return self.result.fetchmany(size)
+
+    def batches(self) -> Iterator[Sequence[Row]]:
+        """Yield the rows fetched from the server-side cursor in batches."""
+        yield from self.result.partitions()
+
+
+class RerunnableQuerySource:
+    """Row source over a query stream that can seek back by running the query again.
+
+    A server-side cursor only moves forward, so going back to rows already
+    fetched opens a new stream with `open_stream` and skips the rows before
+    the position. Streams opened here are closed with the source, the first
+    one is left to its caller.
+    """
+
+    def __init__(
+        self,
+        stream: "QueryStream",
+        open_stream: Callable[[], AbstractContextManager],
+        batch_size: int = 1000,
+    ):
+        self.columns: list[str] = stream.columns
+        self.position = 0
+        self.batch_size = batch_size
+        self._stream = stream
+        self._open_stream = open_stream
+        self._exit_stack = ExitStack()
+
+    def fetch(self, size: int) -> Sequence[Sequence[Any]]:
+        rows = self._stream.fetch(size)
+        self.position += len(rows)
+        return rows
+
+    def seek(self, position: int) -> None:
+        if position < self.position:
+            self._exit_stack.close()
+            self._stream = self._exit_stack.enter_context(self._open_stream())
+            self.position = 0
+        while self.position < position:
+            if not self.fetch(min(position - self.position, self.batch_size)):
+                break
+
+    def close(self) -> None:
+        self._exit_stack.close()
+
+    def __enter__(self) -> "RerunnableQuerySource":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def is_select_query(query: str) -> bool:
+    """Whether a query only reads rows, so that it can be run again."""
+    import sqlparse
+
+    statements = sqlparse.parse(query)
+    return len(statements) == 1 and statements[0].get_type() == "SELECT"
+
+
+def get_query_bind_names(query: str) -> list[str]:
+    """Get the names of the `:name` bind parameters of a query."""
+    return list(text(query).compile().params)
+
+
+@contextmanager
+def open_query_stream(
+    engine: Engine,
+    query: str | Executable,
+    params: dict[str, Any] | None = None,
+    batch_size: int = 1000,
+) -> Iterator[QueryStream]:
+    """Execute a query on a server-side cursor that fetches `batch_size` rows at a time.
+
+    Statements that do not return rows are committed when the context exits.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=batch_size
+        ).execute(text(query) if isinstance(query, str) else query, params or {})
+        yield QueryStream(result)
+        if not result.returns_rows:
+            connection.commit()
+
+
+def run_query_with_usql(db_url: URL, query: str) -> list[dict[str, Any]]:
+    """Run a query with usql and return the rows parsed from its JSON output."""
+    if db_url.drivername == "sqlite":
+        db_url_str = f"{db_url.drivername}://{db_url.database}"
+    else:
+        db_url_str = f"{db_url.drivername.split('+')[0]}://{db_url.username}:{quote_plus(db_url.password)}@{db_url.host}:{db_url.port}/{db_url.database}"
+    cmd_args = ["usql", "-c", query, db_url_str, "--json", "-q"]
+
+    print(f"Running: {' '.join(cmd_args)}", file=sys.stderr)
+
+    run_results = subprocess.run(cmd_args, capture_output=True)
+    if run_results.returncode != 0:
+        raise ValueError(run_results.stderr.decode())
+    try:
+        return json.loads(run_results.stdout.decode())
+    except json.JSONDecodeError:
+        print(run_results.stdout)
+        raise ValueError("Invalid JSON output")
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import pathlib
+import re
+from typing import TypedDict
+
+from db_utils.run.schemas import QueryData
+from db_utils.utils import get_cache_dir
+
+QUERY_HEADER_REGEX = re.compile(
+    rb"^[ \t]*--[ \t]*name:[ \t]*(\w+)[ \t]*:(\w+).*$", re.M
+)
+# a semicolon ending a line, optionally followed by a comment
+STATEMENT_END_REGEX = re.compile(rb";[ \t]*(--[^\n]*)?$", re.M)
+COMMENT_LINE_REGEX = re.compile(r"^[ \t]*--.*(\n|$)", re.M)
+# `:name`, but not the `::type` casts of Postgres
+PLACEHOLDER_REGEX = re.compile(r"(?<!:):(\w+)")
+# bumped when the scan changes, so indexes of older scans are rebuilt
+QUERY_INDEX_VERSION = 2
+
+
+class QueryIndexEntry(TypedDict):
+    name: str
+    kind: str
+    # byte range of the statement in the file
+    start: int
+    end: int
+    placeholders: list[str]
+
+
+class QueryIndex(TypedDict):
+    version: int
+    path: str
+    mtime_ns: int
+    size: int
+    sha256: str
+    queries: list[QueryIndexEntry]
+
+
+def clean_query_text(statement: str) -> str:
+    """Remove comment lines and surrounding whitespace from a statement."""
+    return COMMENT_LINE_REGEX.sub("", statement).strip()
+
+
+def scan_sql_queries(content: bytes) -> list[QueryIndexEntry]:
+    """Find the named queries of a SQL file from their `-- name: foo :kind` headers.
+
+    Only header lines and line-ending semicolons are matched: the statement
+    of a query goes up to its first line ending with `;`, or to the next
+    header, so the SQL itself is never parsed.
+
+    Raises:
+        ValueError: if the file has no queries, or a statement has no header.
+    """
+    headers = list(QUERY_HEADER_REGEX.finditer(content))
+    if not headers:
+        raise ValueError("No queries found")
+    if clean_query_text(content[: headers[0].start()].decode()):
+        raise ValueError("No query name found")
+    entries: list[QueryIndexEntry] = []
+    for header, next_header in zip(headers, headers[1:] + [None]):
+        start = header.end()
+        end = next_header.start() if next_header else len(content)
+        statement_end = STATEMENT_END_REGEX.search(content, start, end)
+        if statement_end:
+            if clean_query_text(content[statement_end.end() : end].decode()):
+                raise ValueError(
+                    f"No query name found for the statement after query "
+                    f"'{header.group(1).decode()}'"
+                )
+            end = statement_end.start() + 1
+        query = clean_query_text(content[start:end].decode())
+        entries.append(
+            QueryIndexEntry(
+                name=header.group(1).decode(),
+                kind=header.group(2).decode(),
+                start=start,
+                end=end,
+                placeholders=list(dict.fromkeys(PLACEHOLDER_REGEX.findall(query))),
+            )
+        )
+    return entries
+
+
+def _get_index_path(sql_file: pathlib.Path) -> pathlib.Path:
+    path_hash = hashlib.sha1(str(sql_file.resolve()).encode()).hexdigest()
+    index_dir = get_cache_dir() / "queries"
+    index_dir.mkdir(exist_ok=True)
+    return index_dir / f"{path_hash}.json"
+
+
+def get_query_index(sql_file: pathlib.Path) -> list[QueryIndexEntry]:
+    """Get the named queries of a SQL file, using an on-disk index.
+
+    The index is reused while the file modification time and size do not
+    change, or while its content hash is the same.
+    """
+    index_path = _get_index_path(sql_file)
+    stat = os.stat(sql_file)
+    index: QueryIndex | None = None
+    if index_path.exists():
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        if index and index.get("version") != QUERY_INDEX_VERSION:
+            index = None
+        if index and (index["mtime_ns"], index["size"]) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            return index["queries"]
+
+    with open(sql_file, "rb") as f:
+        content = f.read()
+    sha256 = hashlib.sha256(content).hexdigest()
+    if index and index["sha256"] == sha256:
+        queries = index["queries"]
+    else:
+        queries = scan_sql_queries(content)
+    index = QueryIndex(
+        version=QUERY_INDEX_VERSION,
+        path=str(sql_file.resolve()),
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        sha256=sha256,
+        queries=queries,
+    )
+    with open(index_path, "w") as f:
+        json.dump(index, f)
+    return queries
+
+
+def read_query(sql_file: pathlib.Path, entry: QueryIndexEntry) -> QueryData:
+    """Read only the statement of an indexed query from its file."""
+    with open(sql_file, "rb") as f:
+        f.seek(entry["start"])
+        statement = f.read(entry["end"] - entry["start"]).decode()
+    return QueryData(
+        name=entry["name"],
+        query=clean_query_text(statement),
+        placeholders=entry["placeholders"],
+    )
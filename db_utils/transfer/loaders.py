@@ -0,0 +1,359 @@
+import csv
+import datetime
+import decimal
+import json
+import os
+import pathlib
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from sqlalchemy import Table, inspect
+from sqlalchemy import types as sqltypes
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import NoSuchTableError
+
+from db_utils.enums import LoadFileFormat
+from db_utils.inspect.table.sampling import get_light_table
+from db_utils.transfer.main import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_COMMIT_ROWS,
+    DEFAULT_QUEUE_SIZE,
+    TransferResult,
+    iter_in_thread,
+    write_batches,
+)
+
+FILE_FORMAT_SUFFIXES = {
+    ".csv": LoadFileFormat.csv,
+    ".tsv": LoadFileFormat.csv,
+    ".jsonl": LoadFileFormat.jsonl,
+    ".ndjson": LoadFileFormat.jsonl,
+    ".parquet": LoadFileFormat.parquet,
+}
+TRUE_VALUES = {"1", "t", "true", "y", "yes", "on"}
+FALSE_VALUES = {"0", "f", "false", "n", "no", "off"}
+
+
+def get_file_format(path: pathlib.Path) -> LoadFileFormat:
+    """Get the format of a file from its extension.
+
+    Raises:
+        ValueError: for unknown extensions.
+    """
+    try:
+        return FILE_FORMAT_SUFFIXES[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown file format '{path.suffix}', choose a format with --format"
+        )
+
+
+def get_column_kind(sqla_type: sqltypes.TypeEngine) -> str:
+    """Get the conversion applied to the file values of a column type."""
+    try:
+        generic_type = sqla_type.as_generic()
+    except NotImplementedError:
+        return "str"
+    match generic_type:
+        case sqltypes.Boolean():
+            return "bool"
+        case sqltypes.Integer():
+            return "int"
+        case sqltypes.Float():
+            return "float"
+        case sqltypes.Numeric(asdecimal=True):
+            return "decimal"
+        case sqltypes.Numeric():
+            return "float"
+        case sqltypes.DateTime():
+            return "datetime"
+        case sqltypes.Date():
+            return "date"
+        case sqltypes.Time():
+            return "time"
+        case sqltypes.JSON():
+            return "json"
+        case sqltypes.LargeBinary() | sqltypes.BINARY() | sqltypes.VARBINARY():
+            return "bytes"
+    return "str"
+
+
+def _parse_bool(value: str) -> bool:
+    lower_value = value.strip().lower()
+    if lower_value in TRUE_VALUES:
+        return True
+    if lower_value in FALSE_VALUES:
+        return False
+    raise ValueError(f"Invalid boolean {value!r}")
+
+
+def _parse_bytes(value: str) -> bytes:
+    for prefix in ("\\x", "0x"):
+        if value.startswith(prefix):
+            value = value[len(prefix) :]
+    return bytes.fromhex(value)
+
+
+STRING_PARSERS: dict[str, Callable[[str], Any]] = {
+    "bool": _parse_bool,
+    "int": int,
+    "float": float,
+    "decimal": decimal.Decimal,
+    "datetime": datetime.datetime.fromisoformat,
+    "date": datetime.date.fromisoformat,
+    "time": datetime.time.fromisoformat,
+    "json": json.loads,
+    "bytes": _parse_bytes,
+}
+
+
+def coerce_value(kind: str, value: Any) -> Any:
+    """Convert a file value to the Python type of its column.
+
+    Strings are parsed, values of typed formats are only converted when the
+    column type needs it.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        parser = STRING_PARSERS.get(kind)
+        return parser(value) if parser else value
+    match kind:
+        case "decimal" if isinstance(value, float):
+            return decimal.Decimal(str(value))
+        case "str" if not isinstance(value, str):
+            return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+        case "datetime" if type(value) is datetime.date:
+            return datetime.datetime.combine(value, datetime.time())
+    return value
+
+
+def coerce_rows(
+    kinds: Sequence[str], null_value: str | None, rows: Iterable[Sequence[Any]]
+) -> list[tuple]:
+    """Convert the values of rows, `null_value` strings being nulls.
+
+    Raises:
+        ValueError: for rows with another number of values than columns, and
+            values that can not be converted.
+    """
+    coerced_rows = []
+    for row in rows:
+        if len(row) != len(kinds):
+            raise ValueError(f"Expected {len(kinds)} values in row {list(row)!r}")
+        values = []
+        for index, (kind, value) in enumerate(zip(kinds, row)):
+            if value == null_value:
+                values.append(None)
+                continue
+            try:
+                values.append(coerce_value(kind, value))
+            except (ValueError, TypeError, decimal.InvalidOperation) as e:
+                raise ValueError(
+                    f"Invalid {kind} value {value!r} in column {index + 1} of row "
+                    f"{list(row)!r}: {e}"
+                )
+        coerced_rows.append(tuple(values))
+    return coerced_rows
+
+
+def parse_jsonl_rows(
+    columns: Sequence[str], kinds: Sequence[str], lines: Sequence[str]
+) -> list[tuple]:
+    """Parse JSON lines, picking the values of the columns of every object.
+
+    Missing keys are nulls, JSON has its own, so no string is read as null.
+
+    Raises:
+        ValueError: for keys that are not columns, which would be dropped.
+    """
+    objects = [json.loads(line) for line in lines if line.strip()]
+    column_set = set(columns)
+    for obj in objects:
+        if not column_set.issuperset(obj):
+            unknown = ", ".join(key for key in obj if key not in column_set)
+            raise ValueError(
+                f"Keys not in the first object of the file: {unknown}. "
+                "The columns of JSON lines are the keys of the first object."
+            )
+    return coerce_rows(
+        kinds, None, ([obj.get(name) for name in columns] for obj in objects)
+    )
+
+
+def _batched(iterable: Iterable[Any], batch_size: int) -> Iterator[list[Any]]:
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def read_csv_batches(
+    path: pathlib.Path, batch_size: int, delimiter: str
+) -> tuple[list[str], Iterator[list[list[str]]]]:
+    """Get the header of a CSV file and an iterator of its row batches."""
+    f = open(path, newline="", encoding="utf-8")
+    reader = csv.reader(f, delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        f.close()
+        raise ValueError(f"File '{path}' is empty")
+
+    def batches() -> Iterator[list[list[str]]]:
+        with f:
+            yield from _batched(reader, batch_size)
+
+    return header, batches()
+
+
+def read_jsonl_batches(
+    path: pathlib.Path, batch_size: int
+) -> tuple[list[str], Iterator[list[str]]]:
+    """Get the keys of the first object of a JSON lines file and an iterator
+    of its line batches."""
+    with open(path, encoding="utf-8") as f:
+        first_line = next((line for line in f if line.strip()), None)
+    if first_line is None:
+        raise ValueError(f"File '{path}' is empty")
+
+    def batches() -> Iterator[list[str]]:
+        with open(path, encoding="utf-8") as f:
+            yield from _batched(f, batch_size)
+
+    return list(json.loads(first_line)), batches()
+
+
+def read_parquet_batches(
+    path: pathlib.Path, batch_size: int
+) -> tuple[list[str], Iterator[list[tuple]]]:
+    """Get the columns of a Parquet file and an iterator of its row batches."""
+    from db_utils.arrow_output import import_pyarrow
+
+    import_pyarrow()
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    columns = parquet_file.schema_arrow.names
+
+    def batches() -> Iterator[list[tuple]]:
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield list(zip(*(column.to_pylist() for column in record_batch.columns)))
+
+    return columns, batches()
+
+
+def map_in_order(
+    executor: Executor | None,
+    function: Callable[..., Any],
+    batches: Iterable[Any],
+    max_pending: int,
+    *args: Any,
+) -> Iterator[Any]:
+    """Apply a function to batches in an executor, keeping at most
+    `max_pending` batches in flight and yielding results in input order."""
+    if executor is None:
+        for batch in batches:
+            yield function(*args, batch)
+        return
+    pending: deque = deque()
+    for batch in batches:
+        pending.append(executor.submit(function, *args, batch))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _check_columns(header: Sequence[str], table: Table) -> None:
+    unknown = [name for name in header if name not in table.c]
+    if unknown:
+        raise ValueError(f"Columns not in table '{table.name}': {', '.join(unknown)}")
+
+
+def load_file(
+    engine: Engine,
+    path: pathlib.Path,
+    table_name: str,
+    schema: str | None = None,
+    file_format: LoadFileFormat | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    commit_rows: int = DEFAULT_COMMIT_ROWS,
+    jobs: int | None = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    delimiter: str | None = None,
+    null_value: str | None = "",
+    on_progress: Callable[[int], None] | None = None,
+) -> TransferResult:
+    """Load a CSV, JSON lines or Parquet file into an existing table.
+
+    CSV and JSON lines batches are parsed and converted to the column types
+    of the table in `jobs` worker processes, all the CPUs by default, while
+    the main thread writes the converted batches with the bulk path of the
+    dialect, committing every `commit_rows` rows. The file columns are
+    matched to the table columns by name. The columns of a JSON lines file
+    are the keys of its first object: later objects may lack some of them,
+    but not have others. `null_value` only applies to CSV files.
+
+    Raises:
+        ValueError: for unknown formats, empty files, file columns that are
+            not in the table and values that can not be converted.
+    """
+    if "." in table_name:
+        schema, table_name = table_name.split(".")
+    file_format = file_format or get_file_format(path)
+    try:
+        table = get_light_table(inspect(engine), table_name, schema)
+    except NoSuchTableError:
+        raise ValueError(f"Table '{table_name}' not found")
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    header: list[str]
+    batches: Iterator[Any]
+    match file_format:
+        case LoadFileFormat.csv:
+            if delimiter is None:
+                delimiter = "\t" if path.suffix.lower() == ".tsv" else ","
+            header, batches = read_csv_batches(path, batch_size, delimiter)
+        case LoadFileFormat.jsonl:
+            header, batches = read_jsonl_batches(path, batch_size)
+        case LoadFileFormat.parquet:
+            header, batches = read_parquet_batches(path, batch_size)
+    _check_columns(header, table)
+    kinds = [get_column_kind(table.c[name].type) for name in header]
+
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        match file_format:
+            case LoadFileFormat.csv:
+                rows = map_in_order(
+                    executor, coerce_rows, batches, jobs * 2, kinds, null_value
+                )
+            case LoadFileFormat.jsonl:
+                rows = map_in_order(
+                    executor,
+                    parse_jsonl_rows,
+                    batches,
+                    jobs * 2,
+                    header,
+                    kinds,
+                )
+            case LoadFileFormat.parquet:
+                # values are typed already, converting them in process is cheap
+                rows = map_in_order(None, coerce_rows, batches, 1, kinds, None)
+        return write_batches(
+            engine,
+            table,
+            header,
+            iter_in_thread(rows, queue_size),
+            commit_rows,
+            on_progress,
+        )
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,229 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Sequence, TypeVar
+
+from sqlalchemy import Column, MetaData, Table, inspect, select
+from sqlalchemy.engine import Engine
+
+from db_utils.autogen.ddl_generator import generate_table_ddl_string
+from db_utils.enums import IfTableExists
+from db_utils.run.main import open_query_stream
+from db_utils.transfer.writers import get_batch_writer
+
+DEFAULT_BATCH_SIZE = 10000
+# batches read ahead of the writer
+DEFAULT_QUEUE_SIZE = 4
+DEFAULT_COMMIT_ROWS = 100000
+
+T = TypeVar("T")
+
+
+@dataclass
+class TransferResult:
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class _ProducerError:
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+_DONE = object()
+
+
+def iter_in_thread(iterable: Iterable[T], queue_size: int) -> Iterator[T]:
+    """Iterate in a background thread, `queue_size` items ahead of the consumer.
+
+    Errors of the producer are raised in the consumer. The producer stops
+    when the consumer stops iterating.
+    """
+    items: queue.Queue = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_ProducerError(e))
+        else:
+            put(_DONE)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _ProducerError):
+                raise item.exception
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
+
+def write_batches(
+    engine: Engine,
+    table: Table,
+    columns: Sequence[str],
+    batches: Iterable[Sequence[Sequence[Any]]],
+    commit_rows: int = DEFAULT_COMMIT_ROWS,
+    on_progress: Callable[[int], None] | None = None,
+) -> TransferResult:
+    """Write batches of rows to a table, committing every `commit_rows` rows.
+
+    Rows of the uncommitted batches are rolled back on errors.
+    """
+    rows = 0
+    uncommitted_rows = 0
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        writer = get_batch_writer(connection, table, columns)
+        transaction = connection.begin()
+        for batch in batches:
+            writer.write(batch)
+            rows += len(batch)
+            uncommitted_rows += len(batch)
+            if uncommitted_rows >= commit_rows:
+                transaction.commit()
+                transaction = connection.begin()
+                uncommitted_rows = 0
+            if on_progress:
+                on_progress(rows)
+        transaction.commit()
+    return TransferResult(rows=rows, seconds=time.perf_counter() - start)
+
+
+def read_batches(
+    engine: Engine, table: Table, columns: Sequence[str], batch_size: int
+) -> Iterator[list[tuple]]:
+    """Read the rows of a table from a server-side cursor."""
+    query = select(*[table.c[name] for name in columns])
+    with open_query_stream(engine, query, batch_size=batch_size) as stream:
+        for batch in stream.batches():
+            yield [tuple(row) for row in batch]
+
+
+def reflect_table(engine: Engine, table_name: str, schema: str | None) -> Table:
+    """Reflect a table with its primary key, without the tables it references."""
+    return Table(
+        table_name, MetaData(), schema=schema, autoload_with=engine, resolve_fks=False
+    )
+
+
+def build_target_table(
+    source_table: Table, table_name: str, schema: str | None, generic: bool
+) -> Table:
+    """Copy the columns and primary key of a table for another database.
+
+    With `generic`, the column types are converted to their generic
+    SQLAlchemy types, so they compile on another dialect.
+    """
+    columns = []
+    for column in source_table.columns:
+        column_type = column.type
+        if generic:
+            try:
+                column_type = column_type.as_generic()
+            except NotImplementedError:
+                pass
+        columns.append(
+            Column(
+                column.name,
+                column_type,
+                nullable=column.nullable,
+                primary_key=column.primary_key,
+                autoincrement=False,
+            )
+        )
+    return Table(table_name, MetaData(), *columns, schema=schema)
+
+
+def prepare_target_table(
+    source_table: Table,
+    target_engine: Engine,
+    table_name: str,
+    schema: str | None,
+    if_exists: IfTableExists,
+    generic: bool,
+) -> Table:
+    """Get the target table of a copy, creating it from the source DDL.
+
+    Raises:
+        ValueError: if the table exists and `if_exists` is fail.
+    """
+    exists = inspect(target_engine).has_table(table_name, schema=schema)
+    if exists and if_exists == IfTableExists.fail:
+        raise ValueError(f"Table '{table_name}' already exists in the target")
+    if exists and if_exists == IfTableExists.append:
+        return reflect_table(target_engine, table_name, schema)
+
+    target_table = build_target_table(source_table, table_name, schema, generic)
+    with target_engine.begin() as connection:
+        if exists:
+            target_table.drop(connection)
+        connection.exec_driver_sql(
+            generate_table_ddl_string(target_table, target_engine)
+        )
+    return target_table
+
+
+def copy_table(
+    source_engine: Engine,
+    target_engine: Engine,
+    table_name: str,
+    schema: str | None = None,
+    target_table_name: str | None = None,
+    target_schema: str | None = None,
+    if_exists: IfTableExists = IfTableExists.fail,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    commit_rows: int = DEFAULT_COMMIT_ROWS,
+    on_progress: Callable[[int], None] | None = None,
+) -> TransferResult:
+    """Copy a table between databases.
+
+    Rows are read from a server-side cursor in a reader thread, up to
+    `queue_size` batches ahead of the writer, which uses the bulk path of the
+    target dialect.
+
+    Raises:
+        ValueError: if the target table exists and `if_exists` is fail.
+    """
+    if "." in table_name:
+        schema, table_name = table_name.split(".")
+    source_table = reflect_table(source_engine, table_name, schema)
+    target_table = prepare_target_table(
+        source_table,
+        target_engine,
+        target_table_name or table_name,
+        target_schema if target_schema is not None else schema,
+        if_exists,
+        generic=source_engine.dialect.name != target_engine.dialect.name,
+    )
+    columns = [c.name for c in source_table.columns if c.name in target_table.c]
+    batches = iter_in_thread(
+        read_batches(source_engine, source_table, columns, batch_size), queue_size
+    )
+    return write_batches(
+        target_engine, target_table, columns, batches, commit_rows, on_progress
+    )
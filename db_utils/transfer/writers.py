@@ -0,0 +1,182 @@
+import datetime
+import io
+import json
+from typing import Any, Sequence
+
+from sqlalchemy import Table, insert
+from sqlalchemy import types as sqltypes
+from sqlalchemy.engine import Connection
+
+COPY_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _text_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex input
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return f"{value.total_seconds()} seconds"
+    return str(value)
+
+
+def array_literal(values: Sequence[Any]) -> str:
+    """Format a list as a Postgres array literal, e.g. `{"a",NULL}`."""
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append("NULL")
+        elif isinstance(value, (list, tuple)):
+            elements.append(array_literal(value))
+        else:
+            text = _text_value(value).replace("\\", "\\\\").replace('"', '\\"')
+            elements.append(f'"{text}"')
+    return "{" + ",".join(elements) + "}"
+
+
+def copy_text_value(value: Any, array: bool = False) -> str:
+    """Format a value for the text format of Postgres `COPY`.
+
+    Lists are array literals for `array` columns, JSON otherwise.
+    """
+    if value is None:
+        return "\\N"
+    if array and isinstance(value, (list, tuple)):
+        text = array_literal(value)
+    else:
+        text = _text_value(value)
+    # backslashes of the value escaped for the text format
+    return text.translate(COPY_TEXT_ESCAPES)
+
+
+class BatchWriter:
+    """Insert batches of rows in a table with `executemany`."""
+
+    def __init__(self, connection: Connection, table: Table, columns: Sequence[str]):
+        self.connection = connection
+        self.table = table
+        self.columns = list(columns)
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        self.connection.execute(
+            insert(self.table), [dict(zip(self.columns, row)) for row in rows]
+        )
+
+
+class PostgresCopyWriter(BatchWriter):
+    """Write batches with `COPY ... FROM STDIN` in the text format."""
+
+    def __init__(self, connection: Connection, table: Table, columns: Sequence[str]):
+        super().__init__(connection, table, columns)
+        preparer = connection.dialect.identifier_preparer
+        quoted_columns = ", ".join(preparer.quote(name) for name in self.columns)
+        self.copy_sql = (
+            f"COPY {preparer.format_table(table)} ({quoted_columns}) FROM STDIN"
+        )
+        self.array_columns = [
+            isinstance(table.c[name].type, sqltypes.ARRAY) for name in self.columns
+        ]
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        data = "".join(
+            "\t".join(
+                copy_text_value(value, array)
+                for value, array in zip(row, self.array_columns)
+            )
+            + "\n"
+            for row in rows
+        )
+        dbapi_connection = self.connection.connection.driver_connection
+        with dbapi_connection.cursor() as cursor:
+            if hasattr(cursor, "copy_expert"):
+                # psycopg2
+                cursor.copy_expert(self.copy_sql, io.StringIO(data))
+            else:
+                with cursor.copy(self.copy_sql) as copy:
+                    copy.write(data)
+
+
+class MssqlFastExecutemanyWriter(BatchWriter):
+    """Write batches with the array parameter binding of pyodbc."""
+
+    def __init__(self, connection: Connection, table: Table, columns: Sequence[str]):
+        super().__init__(connection, table, columns)
+        preparer = connection.dialect.identifier_preparer
+        quoted_columns = ", ".join(preparer.quote(name) for name in self.columns)
+        placeholders = ", ".join("?" for _ in self.columns)
+        self.insert_sql = (
+            f"INSERT INTO {preparer.format_table(table)} ({quoted_columns}) "
+            f"VALUES ({placeholders})"
+        )
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        cursor = self.connection.connection.driver_connection.cursor()
+        try:
+            cursor.fast_executemany = True
+            cursor.executemany(self.insert_sql, [tuple(row) for row in rows])
+        finally:
+            cursor.close()
+
+
+class SQLiteExecutemanyWriter(BatchWriter):
+    """Write batches with `executemany` of the DBAPI cursor.
+
+    Values are converted by the bind processors of the column types, as
+    SQLAlchemy would, without building a parameter dictionary per row.
+    """
+
+    def __init__(self, connection: Connection, table: Table, columns: Sequence[str]):
+        super().__init__(connection, table, columns)
+        dialect = connection.dialect
+        preparer = dialect.identifier_preparer
+        quoted_columns = ", ".join(preparer.quote(name) for name in self.columns)
+        placeholders = ", ".join("?" for _ in self.columns)
+        self.insert_sql = (
+            f"INSERT INTO {preparer.format_table(table)} ({quoted_columns}) "
+            f"VALUES ({placeholders})"
+        )
+        self.processors = [
+            (index, processor)
+            for index, name in enumerate(self.columns)
+            if (
+                processor := table.c[name]
+                .type.dialect_impl(dialect)
+                .bind_processor(dialect)
+            )
+        ]
+
+    def _process(self, row: Sequence[Any]) -> Sequence[Any]:
+        if not self.processors:
+            return row
+        values = list(row)
+        for index, processor in self.processors:
+            if values[index] is not None:
+                values[index] = processor(values[index])
+        return values
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        cursor = self.connection.connection.driver_connection.cursor()
+        try:
+            cursor.executemany(self.insert_sql, [self._process(row) for row in rows])
+        finally:
+            cursor.close()
+
+
+def get_batch_writer(
+    connection: Connection, table: Table, columns: Sequence[str]
+) -> BatchWriter:
+    """Get the fastest batch writer for the dialect and driver of a connection."""
+    dialect = connection.dialect
+    match dialect.name, dialect.driver:
+        case "postgresql", "psycopg2" | "psycopg":
+            return PostgresCopyWriter(connection, table, columns)
+        case "mssql", "pyodbc":
+            return MssqlFastExecutemanyWriter(connection, table, columns)
+        case "sqlite", "pysqlite":
+            return SQLiteExecutemanyWriter(connection, table, columns)
+    return BatchWriter(connection, table, columns)
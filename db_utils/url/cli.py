@@ -1,13 +1,13 @@
-from typing import Annotated, Optional
+from typing import TYPE_CHECKING, Annotated, Optional
 
-import pyperclip
 import typer
-from sqlalchemy import URL, make_url
 
 from db_utils.url.enums import SqlAlchemyDialect
-from db_utils.url.main import create_url_from_args
 from db_utils.utils import get_db_conn_template_from_url
 
+if TYPE_CHECKING:
+    from sqlalchemy import URL
+
 app = typer.Typer(help="Database URL utils")
 
 
@@ -26,9 +26,11 @@ def show(
     template: bool = typer.Option(False, "--template", "-t"),
 ):
     """Shows the database URL and copies it to clipboard."""
+    import pyperclip
+    from sqlalchemy import make_url
 
     if not url_str:
-        db_url: URL = ctx.obj.db_url
+        db_url: "URL" = ctx.obj.db_url
     else:
         db_url = make_url(url_str)
     if template:
@@ -56,6 +58,9 @@ def make(
     port: Annotated[Optional[int], typer.Option(..., "--port", "-P")] = None,
 ):
     """Creates a database URL given parameters and copies it to clipboard."""
+    import pyperclip
+
+    from db_utils.url.main import create_url_from_args
 
     url = create_url_from_args(
         dialect,
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import logging
 import os
@@ -5,25 +6,35 @@ import pathlib
 import re
 import subprocess
 import tempfile
+from functools import lru_cache
+from typing import TYPE_CHECKING
 from urllib.parse import quote_plus
 
 import typer
 from dotenv import dotenv_values, find_dotenv
-from nltk.stem import PorterStemmer
-from sqlalchemy import inspect
-from sqlalchemy.engine import Connectable, make_url
-from sqlalchemy.engine.url import URL
-from sqlalchemy.exc import ArgumentError
 
+from .catalog.completion import lookup_completion_index
+from .config import db_metadata_filename, db_metadata_index_filename, excluded_schemas
 from .exceptions import NoDBUrlFoundException
 
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connectable
+    from sqlalchemy.engine.url import URL
 
+
+@lru_cache(maxsize=None)
+def _get_stemmer():
+    from nltk.stem import PorterStemmer
+
+    return PorterStemmer()
+
+
+@lru_cache(maxsize=4096)
 def get_stem_word(word: str):
-    stemmer = PorterStemmer()
-    return stemmer.stem(word, to_lowercase=False)
+    return _get_stemmer().stem(word, to_lowercase=False)
 
 
-def get_standard_db_url_from_sqla(url: URL) -> str:
+def get_standard_db_url_from_sqla(url: "URL") -> str:
     if not url.drivername:
         return str(url)
     password = str(url.password)
@@ -36,7 +47,7 @@ def get_standard_db_url_from_sqla(url: URL) -> str:
 
 
 def get_db_conn_template_from_url(
-    db_url: URL, password_hidden: bool | None = False
+    db_url: "URL", password_hidden: bool | None = False
 ) -> str:
     """Get template connection string from SQLAlchemy URL object
 
@@ -81,9 +92,10 @@ def get_fzf_selection_from_python_list(
     return fzf_output.stdout.decode("utf-8").rstrip()
 
 
-def get_schemas_list(engine: Connectable) -> list:
+def get_schemas_list(engine: "Connectable") -> list:
+    from sqlalchemy import inspect
+
     inspector = inspect(engine)
-    excluded_schemas = ["information_schema", "pg_catalog", "sys", "guest"]
     return [
         schema
         for schema in inspector.get_schema_names()
@@ -91,28 +103,60 @@ def get_schemas_list(engine: Connectable) -> list:
     ]
 
 
-def autocomplete_tables(ctx: typer.Context) -> list:
-    if pathlib.Path(".db_metadata.json").exists():
-        with open(".db_metadata.json", "r") as f:
+def autocomplete_tables(ctx: typer.Context, incomplete: str = "") -> list:
+    if pathlib.Path(db_metadata_index_filename).exists():
+        return lookup_completion_index(incomplete)
+    if pathlib.Path(db_metadata_filename).exists():
+        with open(db_metadata_filename, "r") as f:
             metadata = json.load(f)
         table_names = []
         for schema, table_list in metadata.items():
             for table in table_list:
-                table_names.append(f"{schema}.{table}")
+                table_name = f"{schema}.{table}"
+                if table_name.casefold().startswith(incomplete.casefold()):
+                    table_names.append(table_name)
         return table_names
     return []
 
 
+def get_cache_dir() -> pathlib.Path:
+    """Get the directory for local caches, creating it if needed.
+
+    Uses `DBU_CACHE_DIR` if set, else `$XDG_CACHE_HOME/db_utils` (defaults to
+    `~/.cache/db_utils`).
+    """
+    cache_dir = os.environ.get("DBU_CACHE_DIR")
+    if not cache_dir:
+        xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        cache_dir = os.path.join(xdg_cache_home, "db_utils")
+    path = pathlib.Path(cache_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_url_fingerprint(url: "URL") -> str:
+    """Get a stable identifier of a database URL that does not include the password."""
+    return hashlib.sha256(url.render_as_string(hide_password=True).encode()).hexdigest()
+
+
 def get_db_url_key_list_from_env_file() -> list:
     """Checks if .env file exists in current directory and returns all keys
     that start with DB_ and ends with _URL or _STR from regex expression.
 
     """
-    if not os.path.exists(".env"):
+    return get_db_url_keys(".env")
+
+
+def get_db_url_keys(dotenv_filename: str = ".env") -> list:
+    """Get the database URL keys of an env-file, see
+    `get_db_url_key_list_from_env_file`."""
+    if not os.path.exists(dotenv_filename):
         raise FileNotFoundError(
-            f"'.env' file does not exists in the current directory: '{os.getcwd()}'"
+            f"'{dotenv_filename}' file does not exists in the current directory: '{os.getcwd()}'"
         )
-    dotenv_path = find_dotenv(filename=".env", usecwd=True)
+    dotenv_path = find_dotenv(filename=dotenv_filename, usecwd=True)
 
     config = dotenv_values(dotenv_path=dotenv_path)
 
@@ -122,7 +166,9 @@ def get_db_url_key_list_from_env_file() -> list:
         if re.match(r"DB_.*_(URL|STR|STRING)", key):
             db_url_keys.append(key)
     if not db_url_keys:
-        raise NoDBUrlFoundException("No database URLs found in '.env' file.")
+        raise NoDBUrlFoundException(
+            f"No database URLs found in '{dotenv_filename}' file."
+        )
     return db_url_keys
 
 
@@ -130,7 +176,7 @@ def get_db_url_from_env_file(
     dotenv_filename: str = ".env",
     db_url_key: str = "DB_CONNECTION_URL",
     interactive: bool = False,
-) -> URL:
+) -> "URL":
     """Get database URL from key DB_CONNECTION_URL in given .env file."""
     if not os.path.exists(dotenv_filename):
         raise FileNotFoundError(
@@ -166,6 +212,9 @@ def get_db_url_from_env_file(
         raise NoDBUrlFoundException(
             f"No database URL found in '{dotenv_filename}' file with key '{db_url_key}'"
         )
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.exc import ArgumentError
+
     try:
         url = make_url(db_url)
     except ArgumentError:
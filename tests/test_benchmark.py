@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import NullPool
+
+from db_utils.benchmark.load import latency_histogram, parse_duration, run_load
+from db_utils.benchmark.main import get_latency_stats, percentile, run_benchmark
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 0) == 1
+    assert percentile(values, 50) == pytest.approx(50.5)
+    assert percentile(values, 90) == pytest.approx(90.1)
+    assert percentile(values, 100) == 100
+    assert percentile([3.0], 99) == 3
+
+
+def test_latency_stats():
+    stats = get_latency_stats([0.4, 0.1, 0.3, 0.2])
+    assert (stats.count, stats.min, stats.max) == (4, 0.1, 0.4)
+    assert stats.mean == pytest.approx(0.25)
+    assert stats.p50 == pytest.approx(0.25)
+    assert stats.stddev == pytest.approx(0.1290994)
+    assert get_latency_stats([0.5]).stddev == 0
+
+
+def test_run_benchmark(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}", poolclass=NullPool)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER)"))
+        connection.execute(text("INSERT INTO t VALUES (1), (2), (3)"))
+    stream_results = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, params, context, many: stream_results.append(
+            context.execution_options.get("stream_results")
+        ),
+    )
+    result = run_benchmark(engine, "SELECT * FROM t", iterations=3, warmup=1)
+    assert stream_results == [True] * 4
+    assert len(result.samples) == 3
+    assert all(sample.rows == 3 for sample in result.samples)
+    sample = result.samples[0]
+    assert sample.total >= sample.connect + sample.execute + sample.fetch
+    data = result.to_dict()
+    assert data["dialect"] == "sqlite"
+    assert data["stats"]["total"]["count"] == 3
+
+
+def test_latency_histogram():
+    histogram = latency_histogram([0.0005, 0.001, 0.003, 20], buckets=[0.001, 0.01])
+    assert histogram == [(0.001, 2), (0.01, 1), (float("inf"), 1)]
+
+
+def test_parse_duration():
+    assert parse_duration("90") == 90
+    assert parse_duration("30s") == 30
+    assert parse_duration("2m") == 120
+    assert parse_duration("500ms") == 0.5
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+
+
+def test_run_load(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}", pool_size=2)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER)"))
+    result = run_load(engine, "SELECT * FROM t", concurrency=2, duration=0.3, rate=50)
+    assert result.count("error") == 0
+    assert 5 <= result.count("ok") <= 20
+    assert sum(interval.completed for interval in result.intervals(0.1)) == len(
+        result.outcomes
+    )
+    errors = run_load(engine, "SELECT * FROM missing", concurrency=1, duration=0.1)
+    assert errors.count("ok") == 0
+    assert errors.count("error") == len(errors.outcomes) > 0
+    assert list(errors.error_messages.values()) == [len(errors.outcomes)]
+    # the first retry waits RETRY_DELAY, the second twice as long
+    assert len(errors.outcomes) <= 2
+
+
+def test_run_load_timeout(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    slow_query = (
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+        "SELECT COUNT(*) FROM n"
+    )
+    result = run_load(engine, slow_query, concurrency=1, duration=0.3, timeout=0.05)
+    assert result.count("error") == 0
+    assert result.count("timeout") == len(result.outcomes) > 1
+    assert all(outcome.latency < 0.2 for outcome in result.outcomes)
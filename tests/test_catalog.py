@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from db_utils.catalog.cache import CatalogCache
+from db_utils.catalog.completion import lookup_completion_index, write_completion_index
+from db_utils.catalog.incremental import refresh_catalog
+from db_utils.catalog.main import reflect_catalog, reflect_metadata, select_schemas
+
+
+@pytest.fixture
+def catalog_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalog.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE parent (id INTEGER PRIMARY KEY, name TEXT)")
+        )
+        connection.execute(
+            text(
+                "CREATE TABLE child (id INTEGER PRIMARY KEY, "
+                "parent_id INTEGER REFERENCES parent(id))"
+            )
+        )
+        connection.execute(text("CREATE VIEW parent_view AS SELECT * FROM parent"))
+    return engine
+
+
+def test_select_schemas():
+    schema_names = ["dbo", "sys", "sales", "db_owner", "staging"]
+    assert select_schemas(schema_names) == ["dbo", "sales", "staging"]
+    assert select_schemas(schema_names, schemas=["sales", "sys"]) == ["sys", "sales"]
+    assert select_schemas(schema_names, exclude=["s*"]) == ["dbo"]
+
+
+def test_reflect_catalog(catalog_engine):
+    metadata, _ = reflect_catalog(catalog_engine)
+    assert list(metadata["main"]) == ["child", "parent"]
+    child = metadata["main"]["child"]
+    assert child["pk"]["columns"] == ["id"]
+    assert child["fks"][0]["references"] == {"name": "parent", "columns": ["id"]}
+    assert [c["name"] for c in child["columns"] if c["is_fk"]] == ["parent_id"]
+
+
+def test_reflect_catalog_views_and_exclude(catalog_engine):
+    metadata, _ = reflect_catalog(
+        catalog_engine, reflect_views=True, exclude=["main.child"]
+    )
+    assert list(metadata["main"]) == ["parent", "parent_view"]
+
+
+def test_reflect_catalog_in_parallel(catalog_engine):
+    metadata, reflections = reflect_catalog(catalog_engine, jobs=2)
+    assert metadata == reflect_catalog(catalog_engine)[0]
+    assert [reflection.schemas for reflection in reflections] == [["main"]]
+    assert reflections[0].table_count == 2
+
+
+def test_reflect_metadata_in_parallel(catalog_engine):
+    metadata = reflect_metadata(catalog_engine, jobs=2)
+    assert sorted(metadata.tables) == ["child", "parent"]
+    assert metadata.tables["child"].c.parent_id.references(
+        metadata.tables["parent"].c.id
+    )
+
+
+def test_catalog_cache(catalog_engine, tmp_path):
+    metadata, _ = reflect_catalog(catalog_engine)
+    with CatalogCache(tmp_path / "cache.db") as catalog_cache:
+        assert (
+            catalog_cache.get_table_schema(catalog_engine.url, "main", "child") is None
+        )
+        catalog_cache.set_catalog(catalog_engine.url, metadata)
+        child = catalog_cache.get_table_schema(
+            catalog_engine.url, "main", "child", extra=True
+        )
+        assert child.fks[0].references.name == "parent"
+        assert [column.is_fk for column in child.columns] == [False, True]
+        child = catalog_cache.get_table_schema(catalog_engine.url, "main", "child")
+        assert child.columns[1].is_fk is None
+        catalog_cache.invalidate(catalog_engine.url, "main")
+        assert (
+            catalog_cache.get_table_schema(catalog_engine.url, "main", "child") is None
+        )
+
+
+def test_refresh_catalog(catalog_engine):
+    metadata, changes = refresh_catalog(catalog_engine, {})
+    assert changes.added == ["main.child", "main.parent"]
+    metadata, changes = refresh_catalog(catalog_engine, metadata)
+    assert (changes.reflected, changes.unchanged) == ([], 2)
+
+    with catalog_engine.begin() as connection:
+        connection.execute(text("ALTER TABLE parent ADD COLUMN code TEXT"))
+        connection.execute(text("DROP TABLE child"))
+    metadata, changes = refresh_catalog(catalog_engine, metadata)
+    assert changes.changed == ["main.parent"]
+    assert changes.dropped == ["main.child"]
+    assert [c["name"] for c in metadata["main"]["parent"]["columns"]][-1] == "code"
+
+
+def test_completion_index(tmp_path):
+    index_path = tmp_path / "completion.idx"
+    write_completion_index(
+        {"dbo": ["Orders", "order_items", "customers"], "sales": {"orders": {}}},
+        index_path,
+    )
+    assert lookup_completion_index("dbo.ord", index_path) == [
+        "dbo.order_items",
+        "dbo.Orders",
+    ]
+    assert lookup_completion_index("SALES", index_path) == ["sales.orders"]
+    assert lookup_completion_index("x", index_path) == []
+    assert len(lookup_completion_index("", index_path)) == 4
+
+
+def test_refresh_catalog_keeps_other_schemas(catalog_engine):
+    previous = {"other": {"kept": {"name": "kept", "columns": []}}}
+    metadata, changes = refresh_catalog(catalog_engine, previous, ["main"], jobs=2)
+    assert metadata["other"] == previous["other"]
+    assert sorted(metadata["main"]) == ["child", "parent"]
+    assert changes.dropped == []
+    metadata, _ = refresh_catalog(catalog_engine, previous)
+    assert "other" not in metadata
@@ -0,0 +1,81 @@
+import datetime
+from decimal import Decimal
+
+from db_utils.run.columnar import ColumnStore, ColumnStoreSource
+
+rows = [
+    {
+        "id": 3,
+        "name": "Carla",
+        "amount": Decimal("10.50"),
+        "day": datetime.date(2023, 1, 3),
+    },
+    {"id": 1, "name": "alberto", "amount": None, "day": datetime.date(2023, 1, 1)},
+    {"id": 2, "name": "Bea", "amount": Decimal("2.25"), "day": None},
+]
+
+
+def test_column_types():
+    store = ColumnStore.from_rows(rows)
+    assert [column.values.dtype.kind for column in store.columns] == [
+        "i",
+        "O",
+        "O",
+        "M",
+    ]
+    assert store.row(1) == (1, "alberto", None, datetime.date(2023, 1, 1))
+
+
+def test_sort():
+    store = ColumnStore.from_rows(rows)
+    assert store.argsort(0).tolist() == [1, 2, 0]
+    assert store.argsort(0, descending=True).tolist() == [0, 2, 1]
+    # nulls last
+    assert store.argsort(2).tolist() == [2, 0, 1]
+    assert store.argsort(3, descending=True).tolist() == [0, 1, 2]
+
+
+def test_filter_and_search():
+    store = ColumnStore.from_rows(rows)
+    assert store.filter(0, ">= 2").tolist() == [True, False, True]
+    assert store.filter(2, "< 5").tolist() == [False, False, True]
+    assert store.filter(2, "= null").tolist() == [False, True, False]
+    assert store.filter(3, "> 2023-01-02").tolist() == [True, False, False]
+    assert store.filter(1, "~ BE").tolist() == [False, True, True]
+    assert store.search(1, "car").tolist() == [True, False, False]
+
+
+def test_column_store_source():
+    store = ColumnStore.from_rows(rows)
+    source = ColumnStoreSource(store, store.argsort(0))
+    assert [row[0] for row in source.fetch(2)] == [1, 2]
+    assert [row[0] for row in source.fetch(2)] == [3]
+    source.seek(1)
+    assert [row[0] for row in source.fetch(5)] == [2, 3]
+
+
+def test_timezone_aware_datetimes():
+    plus_two = datetime.timezone(datetime.timedelta(hours=2))
+    utc = datetime.timezone.utc
+    mixed_offsets = [
+        datetime.datetime(2023, 1, 1, 12, tzinfo=plus_two),
+        datetime.datetime(2023, 1, 1, 11, tzinfo=utc),
+        None,
+    ]
+    store = ColumnStore.from_batches(["ts"], [[(value,) for value in mixed_offsets]])
+    column = store.columns[0]
+    assert column.values.dtype.kind == "M"
+    assert column.tz == utc
+    # 12:00+02:00 is 10:00 UTC, before 11:00 UTC
+    assert store.argsort(0).tolist() == [0, 1, 2]
+    assert store.row(0) == (datetime.datetime(2023, 1, 1, 10, tzinfo=utc),)
+    assert store.filter(0, "> 2023-01-01T12:30+02:00").tolist() == [False, True, False]
+
+    same_zone = ColumnStore.from_batches(["ts"], [[(mixed_offsets[0],)]])
+    assert same_zone.row(0) == (mixed_offsets[0],)
+    assert same_zone.columns[0].tz == plus_two
+
+    aware_and_naive = [mixed_offsets[0], datetime.datetime(2023, 1, 1)]
+    store = ColumnStore.from_batches(["ts"], [[(v,) for v in aware_and_naive]])
+    assert store.columns[0].values.dtype == object
+    assert store.row(0) == (mixed_offsets[0],)
@@ -0,0 +1,98 @@
+import datetime
+import decimal
+import threading
+
+import pytest
+from sqlalchemy import make_url
+
+from db_utils.daemon.client import DaemonClient
+from db_utils.daemon.protocol import DaemonError, decode_value, encode_value
+from db_utils.daemon.server import run_broker
+from db_utils.inspect.table.profile import table_profile_from_dict
+
+
+def test_value_encoding_round_trip():
+    values = [
+        None,
+        1,
+        "text",
+        decimal.Decimal("1.10"),
+        datetime.datetime(2024, 1, 2, 3, 4, 5),
+        datetime.date(2024, 1, 2),
+        b"\x00\x01",
+        {"a": [1]},
+    ]
+    assert [decode_value(encode_value(value)) for value in values] == values
+
+
+@pytest.fixture
+def daemon_client(tmp_path):
+    socket_path = str(tmp_path / "daemon.sock")
+    thread = threading.Thread(target=run_broker, args=(socket_path,), daemon=True)
+    thread.start()
+    client = DaemonClient(socket_path, timeout=5)
+    for _ in range(100):
+        if client.ping():
+            break
+        thread.join(0.05)
+    yield client
+    client.call("shutdown")
+    thread.join(5)
+
+
+def test_daemon_query_and_schema(tmp_path, daemon_client):
+    db_url = make_url(f"sqlite:///{tmp_path / 'daemon.db'}")
+    with daemon_client.query_stream(
+        db_url, "CREATE TABLE t (id INTEGER PRIMARY KEY, amount NUMERIC(10, 2))"
+    ) as stream:
+        assert not stream.returns_rows
+    with daemon_client.query_stream(
+        db_url,
+        "INSERT INTO t VALUES (1, 1.5), (2, :amount), (3, NULL)",
+        {"amount": 2.25},
+    ) as stream:
+        assert stream.rowcount == 3
+    with daemon_client.query_stream(
+        db_url, "SELECT id, amount FROM t ORDER BY id", batch_size=2
+    ) as stream:
+        assert stream.columns == ["id", "amount"]
+        assert stream.fetch(1) == [(1, 1.5)]
+        assert [row for batch in stream.batches() for row in batch] == [
+            (2, 2.25),
+            (3, None),
+        ]
+    table_schema = daemon_client.get_table_schema(db_url, "main", "t")
+    assert [column["name"] for column in table_schema["columns"]] == ["id", "amount"]
+    assert table_schema["pk"]["columns"] == ["id"]
+    assert len(daemon_client.call("status")["engines"]) == 1
+
+    with pytest.raises(DaemonError, match="no such table"):
+        with daemon_client.query_stream(db_url, "SELECT * FROM missing"):
+            pass
+
+
+def test_daemon_sample_and_profile(tmp_path, daemon_client):
+    db_url = make_url(f"sqlite:///{tmp_path / 'daemon.db'}")
+    with daemon_client.query_stream(
+        db_url, "CREATE TABLE t (id INTEGER PRIMARY KEY, day DATE)"
+    ):
+        pass
+    with daemon_client.query_stream(
+        db_url, "INSERT INTO t VALUES (1, '2024-01-02'), (2, '2024-01-03'), (3, NULL)"
+    ):
+        pass
+    with daemon_client.sample_stream(db_url, "t", None, "first", size=2) as stream:
+        assert stream.columns == ["id", "day"]
+        assert len([row for batch in stream.batches() for row in batch]) == 2
+
+    profile = table_profile_from_dict(daemon_client.profile_table(db_url, "t", None))
+    assert profile.rows == 3
+    day = profile.columns[1]
+    assert (day.nulls, day.min, day.max) == (
+        1,
+        datetime.date(2024, 1, 2),
+        datetime.date(2024, 1, 3),
+    )
+
+    with pytest.raises(DaemonError, match="NoSuchTableError"):
+        daemon_client.profile_table(db_url, "missing", None)
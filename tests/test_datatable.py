@@ -0,0 +1,61 @@
+import asyncio
+from functools import partial
+
+from sqlalchemy import create_engine, text
+from textual.widgets import DataTable
+
+from db_utils.run.datatable import TableApp
+from db_utils.run.main import RerunnableQuerySource, open_query_stream
+
+QUERY = "SELECT value FROM numbers ORDER BY value"
+
+
+def _create_numbers(tmp_path, count):
+    engine = create_engine(f"sqlite:///{tmp_path / 'numbers.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE numbers (value INTEGER)"))
+        connection.execute(
+            text("INSERT INTO numbers VALUES (:value)"),
+            [{"value": value} for value in range(count)],
+        )
+    return engine
+
+
+def test_rerunnable_query_source_seeks_back(tmp_path):
+    engine = _create_numbers(tmp_path, 25)
+    open_stream = partial(open_query_stream, engine, QUERY, batch_size=10)
+    with open_stream() as stream, RerunnableQuerySource(
+        stream, open_stream, batch_size=10
+    ) as source:
+        assert [row[0] for row in source.fetch(20)] == list(range(20))
+        source.seek(5)
+        assert source.position == 5
+        assert [row[0] for row in source.fetch(3)] == [5, 6, 7]
+        source.seek(30)
+        assert source.position == 25
+        assert source.fetch(10) == []
+
+
+def test_table_scrolls_back_to_evicted_rows(tmp_path):
+    engine = _create_numbers(tmp_path, 1000)
+    open_stream = partial(open_query_stream, engine, QUERY, batch_size=50)
+
+    async def scroll():
+        with open_stream() as stream, RerunnableQuerySource(
+            stream, open_stream, batch_size=50
+        ) as source:
+            app = TableApp(source, page_size=50, max_rows=200)
+            async with app.run_test() as pilot:
+                table = app.query_one(DataTable)
+                for _ in range(60):
+                    await pilot.press("ctrl+d")
+                await pilot.pause()
+                assert app.window_start > 0
+                assert table.row_count <= 200
+                for _ in range(60):
+                    await pilot.press("ctrl+u")
+                await pilot.pause()
+                assert app.window_start == 0
+                assert table.get_row_at(table.cursor_coordinate.row)[0].plain == "0"
+
+    asyncio.run(scroll())
@@ -0,0 +1,75 @@
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    Table,
+    create_engine,
+    create_mock_engine,
+    text,
+)
+
+from db_utils.autogen.ddl_generator import generate_tables_ddl
+from db_utils.catalog.main import reflect_metadata
+
+
+def test_generate_tables_ddl_defers_foreign_key_cycles():
+    metadata = MetaData()
+    Table(
+        "child",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("parent_id", ForeignKey("parent.id")),
+        Index("ix_child_parent_id", "parent_id"),
+    )
+    Table(
+        "parent",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("favorite_child_id", ForeignKey("child.id")),
+    )
+    Table("other", metadata, Column("id", Integer, primary_key=True))
+
+    statements = list(
+        generate_tables_ddl(
+            metadata.tables.values(), create_mock_engine("postgresql://", None)
+        )
+    )
+
+    creates = [s.split("(")[0].strip() for s in statements if "CREATE TABLE" in s]
+    assert sorted(creates) == [
+        "CREATE TABLE child",
+        "CREATE TABLE other",
+        "CREATE TABLE parent",
+    ]
+    child_position = next(
+        i for i, s in enumerate(statements) if s.startswith("\nCREATE TABLE child")
+    )
+    assert "CREATE INDEX ix_child_parent_id" in statements[child_position + 1]
+    alters = [s for s in statements if s.startswith("ALTER TABLE")]
+    assert len(alters) == 2
+    assert statements[-2:] == alters
+    assert not any("FOREIGN KEY" in s for s in statements if "CREATE TABLE" in s)
+
+
+def test_generate_tables_ddl_orders_by_dependency(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ddl.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE b (id INTEGER PRIMARY KEY, a_id INTEGER REFERENCES a (id))"
+            )
+        )
+        connection.execute(text("CREATE TABLE a (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("CREATE INDEX ix_b_a_id ON b (a_id)"))
+
+    for jobs in (1, 2):
+        metadata = reflect_metadata(engine, jobs=jobs)
+        statements = list(generate_tables_ddl(metadata.tables.values(), engine))
+        assert [s.split("(")[0].strip() for s in statements] == [
+            "CREATE TABLE a",
+            "CREATE TABLE b",
+            "CREATE INDEX ix_b_a_id ON b",
+        ]
+        assert "FOREIGN KEY(a_id) REFERENCES a (id)" in statements[1]
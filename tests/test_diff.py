@@ -0,0 +1,74 @@
+import shutil
+
+from sqlalchemy import create_engine, text
+
+from db_utils.diff.main import diff_table_data
+
+
+def _create_database(path, rows: int = 1000):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, v REAL)")
+        )
+        connection.execute(
+            text("INSERT INTO items VALUES (:id, :name, :v)"),
+            [{"id": i, "name": f"n{i}", "v": i * 1.5} for i in range(1, rows + 1)],
+        )
+    engine.dispose()
+
+
+def test_diff_table_data_finds_divergent_rows(tmp_path):
+    _create_database(tmp_path / "source.db")
+    shutil.copy(tmp_path / "source.db", tmp_path / "target.db")
+    source_engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    target_engine = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+
+    result = diff_table_data(source_engine, target_engine, "items", leaf_rows=10)
+    assert result.differences == []
+    assert result.rows_fetched == 0
+    assert (result.source_rows, result.target_rows) == (1000, 1000)
+
+    with target_engine.begin() as connection:
+        connection.execute(text("UPDATE items SET name = 'x' WHERE id = 7"))
+        connection.execute(text("UPDATE items SET v = NULL WHERE id = 500"))
+        connection.execute(text("DELETE FROM items WHERE id = 999"))
+        connection.execute(text("INSERT INTO items VALUES (5000, 'new', 1)"))
+
+    result = diff_table_data(
+        source_engine, target_engine, "items", chunks=8, leaf_rows=10
+    )
+    assert [(d.status, d.key, d.columns) for d in result.differences] == [
+        ("changed", (7,), ["name"]),
+        ("changed", (500,), ["v"]),
+        ("missing", (999,), []),
+        ("extra", (5000,), []),
+    ]
+    # only the rows of the narrowed down ranges are fetched
+    assert result.rows_fetched < 100
+    assert result.summary == {"changed": 2, "missing": 1, "extra": 1}
+
+
+def test_diff_table_data_bisects_composite_keys(tmp_path):
+    engines = []
+    for name in ("source", "target"):
+        engine = create_engine(f"sqlite:///{tmp_path / f'{name}.db'}")
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    "CREATE TABLE t (tenant INTEGER, id INTEGER, v TEXT, "
+                    "PRIMARY KEY (tenant, id))"
+                )
+            )
+            # a single tenant holds most of the rows
+            connection.execute(
+                text("INSERT INTO t VALUES (:tenant, :id, 'v')"),
+                [{"tenant": int(i >= 50), "id": i} for i in range(2000)],
+            )
+        engines.append(engine)
+    with engines[1].begin() as connection:
+        connection.execute(text("UPDATE t SET v = 'x' WHERE tenant = 1 AND id = 1234"))
+
+    result = diff_table_data(*engines, "t", chunks=2, leaf_rows=10)
+    assert [(d.status, d.key) for d in result.differences] == [("changed", (1, 1234))]
+    assert result.rows_fetched <= 40
@@ -0,0 +1,133 @@
+import json
+
+from sqlalchemy import create_engine, text
+
+from db_utils.explain.main import (
+    capture_plan,
+    diff_plans,
+    load_snapshots,
+    new_snapshot,
+    parse_mssql_plan,
+    parse_postgresql_plan,
+    parse_sqlite_plan,
+    save_snapshot,
+)
+
+QUERY = "SELECT * FROM a JOIN b ON b.a_id = a.id WHERE b.z = :z"
+
+SHOWPLAN_XML = """<ShowPlanXML xmlns="http://schemas.microsoft.com/sqlserver/2004/07/showplan">
+<BatchSequence><Batch><Statements><StmtSimple><QueryPlan>
+<RelOp PhysicalOp="Hash Match" EstimateRows="10" EstimatedTotalSubtreeCost="0.5">
+  <RunTimeInformation><RunTimeCountersPerThread Thread="0" ActualRows="12"/></RunTimeInformation>
+  <Hash>
+    <RelOp PhysicalOp="Table Scan" EstimateRows="100" EstimatedTotalSubtreeCost="0.2">
+      <TableScan><Object Schema="[dbo]" Table="[a]"/></TableScan>
+    </RelOp>
+    <RelOp PhysicalOp="Index Seek" EstimateRows="10" EstimatedTotalSubtreeCost="0.1">
+      <IndexScan><Object Schema="[dbo]" Table="[b]" Index="[ix_b_z]"/></IndexScan>
+    </RelOp>
+  </Hash>
+</RelOp>
+</QueryPlan></StmtSimple></Statements></Batch></BatchSequence></ShowPlanXML>"""
+
+
+def test_sqlite_plan_diff(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plan.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE a (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("CREATE TABLE b (id INTEGER, a_id INTEGER, z TEXT)"))
+    plan, raw = capture_plan(engine, QUERY, {"z": "x"})
+    assert [child.operator for child in plan.children] == ["SCAN", "SEARCH"]
+    assert plan.children[0].detail == "b"
+    snapshots_dir = tmp_path / "plans"
+    old = new_snapshot("join", QUERY, "sqlite", False, plan, raw)
+    save_snapshot(old, snapshots_dir)
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE INDEX ix_b_z ON b (z)"))
+    plan, raw = capture_plan(engine, QUERY, {"z": "x"})
+    new = new_snapshot("join", QUERY, "sqlite", False, plan, raw)
+    new.created_at = "9999-01-01T00:00:00Z"
+    save_snapshot(new, snapshots_dir)
+
+    old, new = load_snapshots(["join"], snapshots_dir)
+    diffs = {d.path: d for d in diff_plans(old.plan, new.plan)}
+    assert diffs["0.0"].status == "changed"
+    assert diffs["0.0"].new.detail.startswith("b USING INDEX ix_b_z")
+    assert diffs["0.1"].status == "same"
+
+
+def test_parse_sqlite_plan_and_snapshot_ids(tmp_path):
+    plan = parse_sqlite_plan(
+        [
+            (2, 0, "SCAN ORDERS"),
+            (4, 0, "SEARCH CUSTOMERS USING INTEGER PRIMARY KEY (rowid=?)"),
+            (6, 0, "USE TEMP B-TREE FOR ORDER BY"),
+            (8, 0, "SCALAR SUBQUERY 1"),
+        ]
+    )
+    assert [(c.operator, c.detail) for c in plan.children] == [
+        ("SCAN", "ORDERS"),
+        ("SEARCH", "CUSTOMERS USING INTEGER PRIMARY KEY (rowid=?)"),
+        ("USE TEMP B-TREE FOR ORDER BY", ""),
+        ("SCALAR SUBQUERY", "1"),
+    ]
+    snapshots_dir = tmp_path / "plans"
+    paths = {
+        save_snapshot(
+            new_snapshot("q", "SELECT 1", "sqlite", False, plan, ""), snapshots_dir
+        )
+        for _ in range(2)
+    }
+    assert len(paths) == 2
+
+
+def test_parse_postgresql_plan():
+    raw = json.dumps(
+        [
+            {
+                "Plan": {
+                    "Node Type": "Nested Loop",
+                    "Join Type": "Inner",
+                    "Plan Rows": 5,
+                    "Total Cost": 12.5,
+                    "Actual Rows": 4,
+                    "Actual Loops": 1,
+                    "Plans": [
+                        {
+                            "Node Type": "Index Scan",
+                            "Relation Name": "b",
+                            "Index Name": "ix_b_z",
+                            "Plan Rows": 1,
+                            "Total Cost": 2.0,
+                            "Actual Rows": 2,
+                            "Actual Loops": 3,
+                        }
+                    ],
+                }
+            }
+        ]
+    )
+    plan = parse_postgresql_plan(raw)
+    assert (plan.operator, plan.detail, plan.actual_rows) == ("Nested Loop", "Inner", 4)
+    child = plan.children[0]
+    assert (child.detail, child.estimated_rows, child.actual_rows) == ("b ix_b_z", 1, 6)
+
+
+def test_parse_mssql_plan_and_diff():
+    plan = parse_mssql_plan(SHOWPLAN_XML)
+    assert (plan.operator, plan.estimated_rows, plan.actual_rows) == (
+        "Hash Match",
+        10,
+        12,
+    )
+    assert [(c.operator, c.detail) for c in plan.children] == [
+        ("Table Scan", "a"),
+        ("Index Seek", "b"),
+    ]
+    regressed = parse_mssql_plan(
+        SHOWPLAN_XML.replace('"Index Seek"', '"Table Scan"').replace('"0.5"', '"1"')
+    )
+    diffs = {d.path: d for d in diff_plans(plan, regressed)}
+    assert diffs["0"].changes == ["cost 0.5 → 1 (+100%)"]
+    assert diffs["0.1"].changes == ["operator Index Seek b → Table Scan b"]
@@ -0,0 +1,97 @@
+import datetime
+import decimal
+import json
+
+import pytest
+from sqlalchemy import Numeric, create_engine, text
+
+from db_utils.transfer.loaders import coerce_rows, get_column_kind, load_file
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, "
+                "amount NUMERIC(10, 2), created DATETIME, flag BOOLEAN)"
+            )
+        )
+    return engine
+
+
+def _rows(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT * FROM items ORDER BY id")).all()
+
+
+def test_coerce_rows():
+    kinds = ["int", "decimal", "datetime", "bool", "str"]
+    assert get_column_kind(Numeric(10, 2)) == "decimal"
+    assert coerce_rows(
+        kinds, "", [["1", "2.50", "2023-01-02T03:04:05", "yes", ""]]
+    ) == [
+        (
+            1,
+            decimal.Decimal("2.50"),
+            datetime.datetime(2023, 1, 2, 3, 4, 5),
+            True,
+            None,
+        )
+    ]
+    with pytest.raises(ValueError, match="Invalid int value 'x'"):
+        coerce_rows(kinds, "", [["x", "1", "", "", ""]])
+    with pytest.raises(ValueError, match="Expected 5 values"):
+        coerce_rows(kinds, "", [["1"]])
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_load_csv(tmp_path, engine, jobs):
+    path = tmp_path / "items.csv"
+    lines = ["id,name,amount,created,flag"] + [
+        f"{i},n{i},{i / 4},2023-01-02 03:04:05,{'true' if i % 2 else 'false'}"
+        for i in range(1, 251)
+    ]
+    path.write_text("\n".join(lines) + "\n251,,,,\n")
+
+    result = load_file(engine, path, "items", batch_size=16, commit_rows=100, jobs=jobs)
+    assert result.rows == 251
+    rows = _rows(engine)
+    assert len(rows) == 251
+    assert tuple(rows[0]) == (1, "n1", 0.25, "2023-01-02 03:04:05.000000", 1)
+    assert tuple(rows[-1]) == (251, None, None, None, None)
+
+
+def test_load_jsonl(tmp_path, engine):
+    path = tmp_path / "items.jsonl"
+    path.write_text(
+        "".join(
+            json.dumps({"id": i, "name": f"j{i}", "flag": i % 2 == 0}) + "\n"
+            for i in range(1, 11)
+        )
+    )
+    result = load_file(engine, path, "main.items", jobs=1)
+    assert result.rows == 10
+    assert tuple(_rows(engine)[1]) == (2, "j2", None, None, 1)
+
+    # empty strings are values, later objects may lack keys of the first
+    path.write_text('{"id": 11, "name": ""}\n{"id": 12}\n')
+    assert load_file(engine, path, "main.items", jobs=1).rows == 2
+    assert [tuple(row)[:2] for row in _rows(engine)[-2:]] == [(11, ""), (12, None)]
+    path.write_text('{"id": 13}\n{"id": 14, "name": "x"}\n')
+    with pytest.raises(
+        ValueError, match="Keys not in the first object of the file: name"
+    ):
+        load_file(engine, path, "main.items", jobs=1)
+
+
+def test_load_file_errors(tmp_path, engine):
+    path = tmp_path / "items.csv"
+    path.write_text("id,unknown\n1,2\n")
+    with pytest.raises(ValueError, match="Columns not in table 'items': unknown"):
+        load_file(engine, path, "items", jobs=1)
+    with pytest.raises(ValueError, match="Unknown file format"):
+        load_file(engine, tmp_path / "items.txt", "items", jobs=1)
+    with pytest.raises(ValueError, match="Table 'missing' not found"):
+        load_file(engine, path, "missing", jobs=1)
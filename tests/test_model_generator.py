@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from db_utils.autogen import model_generator
+from db_utils.autogen.model_generator import generate_models
+from db_utils.catalog.main import reflect_metadata
+
+
+class TableNamesGenerator:
+    """Stand-in for a sqlacodegen generator listing the tables it is given."""
+
+    def __init__(self, metadata, bind, options):
+        self.metadata = metadata
+
+    def generate(self) -> str:
+        return "\n".join(sorted(self.metadata.tables)) + "\n"
+
+
+def _create_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+
+    @event.listens_for(engine, "connect")
+    def attach(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"ATTACH DATABASE '{tmp_path / 'other.db'}' AS other")
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE a (id INTEGER PRIMARY KEY)"))
+        connection.execute(
+            text("CREATE TABLE b (id INTEGER PRIMARY KEY, a_id INTEGER REFERENCES a)")
+        )
+        connection.execute(text("CREATE TABLE other.c (id INTEGER PRIMARY KEY)"))
+    return engine
+
+
+def test_generate_models_per_schema(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        model_generator, "get_generator_class", lambda name: TableNamesGenerator
+    )
+    engine = _create_engine(tmp_path)
+    for jobs in (1, 2):
+        outfiles = generate_models(
+            engine, ["main", "other"], str(tmp_path / "models.py"), jobs=jobs
+        )
+        assert outfiles == {
+            "main": str(tmp_path / "main_models.py"),
+            "other": str(tmp_path / "other_models.py"),
+        }
+        assert open(outfiles["main"]).read() == "main.a\nmain.b\n"
+        assert open(outfiles["other"]).read() == "other.c\n"
+
+
+def test_generate_models_tables_per_schema(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        model_generator, "get_generator_class", lambda name: TableNamesGenerator
+    )
+    engine = _create_engine(tmp_path)
+    outfiles = generate_models(
+        engine, ["main", "other"], str(tmp_path / "models.py"), tables=["b", "other.c"]
+    )
+    assert open(outfiles["main"]).read() == "main.a\nmain.b\n"
+    assert open(outfiles["other"]).read() == "other.c\n"
+    with pytest.raises(ValueError, match="Tables not found: main.c"):
+        generate_models(
+            engine, ["main", "other"], str(tmp_path / "models.py"), tables=["main.c"]
+        )
+
+
+def test_get_schema_metadata_follows_foreign_keys(tmp_path):
+    engine = _create_engine(tmp_path)
+    metadata = reflect_metadata(engine, tables=["b"])
+    schema_metadata = model_generator.get_schema_metadata(metadata, None)
+    assert sorted(schema_metadata.tables) == ["a", "b"]
+    assert schema_metadata.tables["b"].c.a_id.references(
+        schema_metadata.tables["a"].c.id
+    )
@@ -0,0 +1,73 @@
+import io
+import json
+
+import pytest
+
+from db_utils.arrow_output import arrow_schema_from_description, write_parquet
+from db_utils.output import write_csv, write_json_array, write_jsonl, write_tsv
+
+columns = ["id", "name"]
+batches = [[(1, "a,b"), (2, None)], [(3, "c")]]
+
+
+def test_write_tsv_and_csv():
+    tsv, csv = io.StringIO(), io.StringIO()
+    assert write_tsv(columns, batches, tsv) == 3
+    assert tsv.getvalue().splitlines()[1] == "1\ta,b"
+    assert write_csv(columns, batches, csv) == 3
+    assert csv.getvalue().splitlines()[:3] == ["id,name", '1,"a,b"', "2,"]
+
+
+def test_write_json():
+    json_array, json_lines = io.StringIO(), io.StringIO()
+    write_json_array(columns, batches, json_array)
+    assert json.loads(json_array.getvalue())[1] == {"id": 2, "name": None}
+    write_json_array(columns, [], json_array := io.StringIO())
+    assert json.loads(json_array.getvalue()) == []
+    write_jsonl(columns, batches, json_lines)
+    assert [json.loads(line)["id"] for line in json_lines.getvalue().splitlines()] == [
+        1,
+        2,
+        3,
+    ]
+
+
+def test_write_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "rows.parquet")
+    assert write_parquet(columns, batches, path) == 3
+    table = pq.read_table(path)
+    assert table.schema.field("id").type == "int64"
+    assert table.column("name").to_pylist() == ["a,b", None, "c"]
+
+
+def test_write_parquet_widens_inferred_types(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "rows.parquet")
+    widening_batches = [[(1, None), (2, None)], [(2.5, 3)], [(None, "s")]]
+    assert write_parquet(["amount", "code"], widening_batches, path) == 4
+    table = pq.read_table(path)
+    assert table.schema.field("amount").type == "double"
+    assert table.column("amount").to_pylist() == [1.0, 2.0, 2.5, None]
+    assert table.column("code").to_pylist() == [None, None, "3", "s"]
+    assert not (tmp_path / "rows.parquet.previous").exists()
+
+
+def test_arrow_schema_from_description():
+    pa = pytest.importorskip("pyarrow")
+    description = [
+        ("id", int, None, None, None, None, True),
+        ("amount", 1700, None, None, 10, 2, True),
+        ("created", 1184, None, None, None, None, True),
+        ("other", None, None, None, None, None, True),
+    ]
+    schema = arrow_schema_from_description(
+        ["id", "amount", "created", "other"], description
+    )
+    assert schema.types[:3] == [
+        pa.int64(),
+        pa.decimal128(10, 2),
+        pa.timestamp("us", tz="UTC"),
+    ]
+    assert pa.types.is_null(schema.types[3])
+    assert arrow_schema_from_description(["id"], [description[3]]) is None
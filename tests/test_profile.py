@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, inspect, text
+from sqlalchemy.dialects import mssql
+
+from db_utils.inspect.table.profile import (
+    build_profile_query,
+    build_top_values_query,
+    profile_table,
+)
+
+
+@pytest.fixture
+def profile_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE t (id INTEGER PRIMARY KEY, grp TEXT, amount REAL)")
+        )
+        connection.execute(
+            text("INSERT INTO t (grp, amount) VALUES (:grp, :amount)"),
+            [
+                {"grp": "abc"[(i > 500) + (i > 800)] if i < 900 else None, "amount": i}
+                for i in range(1000)
+            ],
+        )
+    return engine
+
+
+def test_profile_table(profile_engine):
+    profile = profile_table(inspect(profile_engine), "main.t", top=2)
+    assert profile.rows == 1000
+    id_profile, grp_profile, amount_profile = profile.columns
+    assert (id_profile.name, id_profile.distinct) == ("id", 1000)
+    assert (id_profile.min, id_profile.max) == (1, 1000)
+    assert grp_profile.null_fraction == 0.1
+    assert grp_profile.distinct == 3
+    assert grp_profile.avg_length == 1.0
+    assert grp_profile.top_values == [("a", 501), ("b", 300)]
+    assert amount_profile.avg_length is None
+    assert amount_profile.max == 999
+
+
+def test_profile_sample(profile_engine):
+    for _ in range(2):
+        profile = profile_table(inspect(profile_engine), "t", sample=0.2)
+        assert 100 < profile.rows < 350
+        # both statements read the same sample
+        grp_profile = profile.columns[1]
+        assert (
+            sum(count for _, count in grp_profile.top_values) + grp_profile.nulls
+            == profile.rows
+        )
+    with pytest.raises(ValueError):
+        profile_table(inspect(profile_engine), "t", sample=1.5)
+
+
+def test_mssql_profile_queries():
+    big = Table(
+        "big",
+        MetaData(),
+        Column("id", Integer),
+        Column("notes", mssql.NTEXT()),
+        Column("flag", mssql.BIT()),
+        schema="dbo",
+    )
+    dialect = mssql.dialect()
+    profile_sql = str(build_profile_query(dialect, big).compile(dialect=dialect))
+    # no APPROX_COUNT_DISTINCT before SQL Server 2019
+    assert "count(DISTINCT dbo.big.id)" in profile_sql
+    assert "count(dbo.big.notes)" not in profile_sql
+    assert "CASE WHEN (dbo.big.notes IS NOT NULL) THEN" in profile_sql
+    dialect.server_version_info = (15, 0, 2000)
+    profile_sql = str(build_profile_query(dialect, big).compile(dialect=dialect))
+    assert "approx_count_distinct(dbo.big.id)" in profile_sql
+    assert "max(dbo.big.notes)" not in profile_sql
+    assert "LEN(dbo.big.notes)" not in profile_sql
+    assert "min(dbo.big.flag)" not in profile_sql
+    top_sql = str(build_top_values_query("mssql", big, 3).compile(dialect=dialect))
+    assert top_sql.count("UNION ALL") == 1
+    assert "NVARCHAR(max)" in top_sql
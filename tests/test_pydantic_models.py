@@ -0,0 +1,116 @@
+import importlib
+import sys
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, text
+
+from db_utils.autogen.pydantic_basemodel_generator import (
+    generate_pydantic_models,
+    table_to_pydantic_model,
+)
+
+
+def _create_tables(engine):
+    with engine.begin() as connection:
+        connection.execute(
+            text("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, born DATE)")
+        )
+        connection.execute(
+            text("CREATE TABLE orders (id INTEGER PRIMARY KEY, amount NUMERIC(10, 2))")
+        )
+
+
+def test_generate_module_only_changed_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    _create_tables(engine)
+    output = tmp_path / "schemas.py"
+
+    report = generate_pydantic_models(engine, output)
+    assert report.generated == ["orders", "users"]
+    content = output.read_text()
+    assert "from datetime import date" in content
+    assert "from decimal import Decimal" in content
+    assert "class UserIn(BaseModelCustom):\n    name: Optional[str] = None" in content
+
+    report = generate_pydantic_models(engine, output)
+    assert report.generated == []
+    assert report.unchanged == ["orders", "users"]
+
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE users ADD COLUMN email TEXT"))
+        connection.execute(text("DROP TABLE orders"))
+    report = generate_pydantic_models(engine, output)
+    assert report.generated == ["users"]
+    assert report.removed == ["orders"]
+    content = output.read_text()
+    assert "email: Optional[str] = None" in content
+    assert "class Order" not in content
+
+
+def test_generate_module_without_stamps(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    _create_tables(engine)
+    output = tmp_path / "schemas.py"
+    # a dialect without object stamps reflects every table on each run
+    engine.dialect.name = "mysql"
+
+    report = generate_pydantic_models(engine, output)
+    assert report.generated == ["orders", "users"]
+
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE users ADD COLUMN email TEXT"))
+    report = generate_pydantic_models(engine, output)
+    assert report.generated == ["users"]
+    assert report.unchanged == ["orders"]
+    assert "email: Optional[str] = None" in output.read_text()
+
+
+def test_generate_package_per_table(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    _create_tables(engine)
+    output = tmp_path / "schemas_pkg"
+
+    generate_pydantic_models(engine, output, per_table=True)
+    assert sorted(p.name for p in output.glob("*.py")) == [
+        "__init__.py",
+        "_base.py",
+        "orders.py",
+        "users.py",
+    ]
+    users_mtime = (output / "users.py").stat().st_mtime_ns
+
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE orders ADD COLUMN note TEXT"))
+    report = generate_pydantic_models(engine, output, per_table=True)
+    assert report.generated == ["orders"]
+    assert (output / "users.py").stat().st_mtime_ns == users_mtime
+
+    monkeypatch.syspath_prepend(str(tmp_path))
+    package = importlib.import_module("schemas_pkg")
+    try:
+        assert package.Order(Id=1, note="x").note == "x"
+        assert package.UserIn(name="a").name == "a"
+    finally:
+        for module in [m for m in sys.modules if m.startswith("schemas_pkg")]:
+            del sys.modules[module]
+
+
+def test_table_model_leaves_out_leading_id_columns():
+    metadata = MetaData()
+    table = Table(
+        "person",
+        metadata,
+        Column("id", Integer),
+        Column("tenant_id", Integer),
+        Column("identifier", String),
+        Column("parent_id", Integer),
+    )
+    source = table_to_pydantic_model(table).source
+    assert "    id:" not in source and "tenant_id" not in source
+    assert "    identifier: Optional[str] = None" in source
+    assert "    parent_id: Optional[int] = None" in source
+
+    table = Table(
+        "language", metadata, Column("code", String), Column("idioma", String)
+    )
+    source = table_to_pydantic_model(table, exclude={"code"}).source
+    assert "    idioma: Optional[str] = None" in source
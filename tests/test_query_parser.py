@@ -1,5 +1,7 @@
 import re
 import pathlib
+
+import pytest
 import sqlparse
 
 
@@ -30,3 +32,55 @@ def get_queries_from_sql_file() -> list[dict]:
 
 def test_query_parse():
     pass
+
+
+def test_query_index(tmp_path, monkeypatch):
+    from db_utils.run.cli import get_queries_from_sql_file as get_indexed_queries
+
+    monkeypatch.setenv("DBU_CACHE_DIR", str(tmp_path / "cache"))
+    sql_file = pathlib.Path(__file__).parent / "data" / "queries.sql"
+    expected = get_queries_from_sql_file()
+    for _ in range(2):  # scan, then from the index
+        queries = get_indexed_queries(sql_file)
+        assert [q["name"] for q in queries] == [q["name"] for q in expected]
+        assert [q["query"] for q in queries] == [q["query"] for q in expected]
+        assert [set(q["placeholders"]) for q in queries] == [
+            set(q.get("placeholders", [])) for q in expected
+        ]
+    assert len(list((tmp_path / "cache" / "queries").iterdir())) == 1
+
+
+def test_query_index_rescan_on_change(tmp_path, monkeypatch):
+    from db_utils.run.queries import get_query_index, read_query
+
+    monkeypatch.setenv("DBU_CACHE_DIR", str(tmp_path / "cache"))
+    sql_file = tmp_path / "q.sql"
+    sql_file.write_text("-- name: GetA :many\nSELECT * FROM a;\n")
+    assert [q["name"] for q in get_query_index(sql_file)] == ["GetA"]
+    sql_file.write_text(
+        "-- name: GetA :many\nSELECT * FROM a;\n\n"
+        "-- name: GetB :one\n-- b by id\nSELECT * FROM b WHERE id = :id;\n"
+    )
+    index = get_query_index(sql_file)
+    assert [q["name"] for q in index] == ["GetA", "GetB"]
+    query = read_query(sql_file, index[1])
+    assert query["query"] == "SELECT * FROM b WHERE id = :id;"
+    assert query["placeholders"] == ["id"]
+
+
+def test_scan_statement_boundaries_and_casts():
+    from db_utils.run.queries import scan_sql_queries
+
+    content = (
+        b"-- name: GetA :many\n"
+        b"SELECT id::text, :name FROM a WHERE created > :since::date; -- a\n"
+        b"\n-- name: GetB :one\nSELECT 1\n"
+    )
+    get_a, get_b = scan_sql_queries(content)
+    assert content[get_a["start"] : get_a["end"]].strip().endswith(b":date;")
+    assert get_a["placeholders"] == ["name", "since"]
+    assert content[get_b["start"] : get_b["end"]].strip() == b"SELECT 1"
+    with pytest.raises(ValueError, match="after query 'GetA'"):
+        scan_sql_queries(
+            b"-- name: GetA :many\nSELECT 1;\n\nSELECT 2;\n-- name: GetB :one\n"
+        )
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine, inspect, table, text
+from sqlalchemy.dialects import mssql, postgresql
+
+from db_utils.inspect.enums import SampleStrategy
+from db_utils.inspect.table.sampling import build_sample_query, get_light_table
+
+
+@pytest.fixture
+def sample_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sample.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, grp TEXT)"))
+        connection.execute(
+            text("INSERT INTO t (grp) VALUES (:grp)"),
+            [{"grp": f"g{i % 4}"} for i in range(1000)],
+        )
+    return engine
+
+
+def run_sample(engine, sample_table, strategy, size=None, percent=None, by=None):
+    query = build_sample_query("sqlite", sample_table, strategy, size, percent, by)
+    with engine.connect() as connection:
+        return connection.execute(query).all()
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [SampleStrategy.first, SampleStrategy.random, SampleStrategy.tablesample],
+)
+def test_sqlite_sample_size(sample_engine, strategy):
+    rows = run_sample(sample_engine, table("t"), strategy, size=10)
+    assert len(rows) == 10
+    assert len({row.id for row in rows}) == 10
+
+
+def test_sqlite_percent_sample(sample_engine):
+    rows = run_sample(sample_engine, table("t"), SampleStrategy.random, percent=10)
+    assert 30 < len(rows) < 200
+
+
+def test_sqlite_stratified_sample(sample_engine):
+    light_table = get_light_table(inspect(sample_engine), "t", None)
+    assert [c.name for c in light_table.columns] == ["id", "grp"]
+    rows = run_sample(
+        sample_engine, light_table, SampleStrategy.stratified, size=3, by="grp"
+    )
+    assert rows[0]._fields == ("id", "grp")
+    assert sorted(row.grp for row in rows) == [f"g{i}" for i in range(4) for _ in "abc"]
+    with pytest.raises(ValueError):
+        build_sample_query("sqlite", light_table, SampleStrategy.stratified, 3, by="x")
+
+
+def test_server_side_table_samples():
+    big = table("big", schema="dbo")
+    pg_query = build_sample_query(
+        "postgresql", big, SampleStrategy.tablesample, 5, percent=0.5
+    ).compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    assert "TABLESAMPLE system(0.5)" in str(pg_query)
+    mssql_query = build_sample_query(
+        "mssql", big, SampleStrategy.tablesample, 5
+    ).compile(dialect=mssql.dialect(), compile_kwargs={"literal_binds": True})
+    assert "SELECT TOP 5" in str(mssql_query)
+    assert "TABLESAMPLE system(1.0 PERCENT)" in str(mssql_query)
+    random_query = build_sample_query("mssql", big, SampleStrategy.random, 5).compile(
+        dialect=mssql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    assert "ORDER BY newid()" in str(random_query)
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from db_utils.inspect.enums import SizeSortKey
+from db_utils.inspect.sizes import (
+    count_rows,
+    format_size,
+    get_table_sizes,
+    sort_table_sizes,
+)
+
+
+@pytest.fixture
+def sizes_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sizes.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE big (id INTEGER PRIMARY KEY, v TEXT)"))
+        connection.execute(text("CREATE INDEX ix_big_v ON big (v)"))
+        connection.execute(text("CREATE TABLE small (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("CREATE TABLE empty (id INTEGER PRIMARY KEY)"))
+        connection.execute(
+            text("INSERT INTO big (v) VALUES (:v)"),
+            [{"v": f"value {i}" * 10} for i in range(2000)],
+        )
+        connection.execute(text("INSERT INTO small (id) VALUES (1), (2)"))
+    return engine
+
+
+def test_sqlite_table_sizes(sizes_engine):
+    sizes = {size.name: size for size in get_table_sizes(sizes_engine)}
+    assert sorted(sizes) == ["big", "empty", "small"]
+    assert sizes["big"].data_bytes > sizes["small"].data_bytes > 0
+    assert sizes["big"].index_bytes > 0
+    assert sizes["small"].index_bytes == 0
+    # no statistics before ANALYZE
+    assert sizes["big"].rows is None
+
+    with sizes_engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    sizes = {size.name: size for size in get_table_sizes(sizes_engine, "main")}
+    assert (sizes["big"].rows, sizes["big"].exact) == (2000, False)
+
+
+def test_exact_counts_and_sort(sizes_engine):
+    sizes = get_table_sizes(sizes_engine)
+    count_rows(sizes_engine, sizes, jobs=2)
+    assert all(size.exact for size in sizes)
+    by_rows = sort_table_sizes(sizes, SizeSortKey.rows)
+    assert [(size.name, size.rows) for size in by_rows] == [
+        ("big", 2000),
+        ("small", 2),
+        ("empty", 0),
+    ]
+    by_name = sort_table_sizes(sizes, SizeSortKey.name)
+    assert [size.name for size in by_name] == ["big", "empty", "small"]
+    assert sort_table_sizes(sizes, SizeSortKey.total)[0].name == "big"
+
+
+def test_format_size():
+    assert format_size(None) == ""
+    assert format_size(512) == "512 B"
+    assert format_size(1536) == "1.5 KiB"
+    assert format_size(3 * 1024**3) == "3.0 GiB"
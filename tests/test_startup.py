@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+# generous for slow CI machines, the CLI starts in ~0.15s
+STARTUP_BUDGET_SECONDS = 1.0
+
+HEAVY_MODULES = [
+    "jinja2",
+    "nltk",
+    "numpy",
+    "pyarrow",
+    "pyperclip",
+    "rich.progress",
+    "sqlalchemy",
+    "sqlparse",
+    "textual",
+]
+
+RUN_CLI = "from db_utils.cli import app; app(prog_name='dbu')"
+
+
+def run_python(code: str, env: dict[str, str] | None = None) -> tuple[str, float]:
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+    )
+    return process.stdout, time.perf_counter() - start
+
+
+def test_cli_import_is_lazy():
+    output, _ = run_python(
+        "import sys, db_utils.cli; "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert output.split() == []
+
+
+def complete(args: str) -> dict[str, str]:
+    return {"_DBU_COMPLETE": "complete_zsh", "_TYPER_COMPLETE_ARGS": args}
+
+
+@pytest.mark.parametrize(
+    "code, env, expected",
+    [
+        (f"import sys; sys.argv = ['dbu', '--help']; {RUN_CLI}", {}, "inspect"),
+        (RUN_CLI, complete("dbu "), "inspect"),
+        (RUN_CLI, complete("dbu run "), "query"),
+    ],
+    ids=["help", "completion", "subcommand-completion"],
+)
+def test_startup_budget(code, env, expected):
+    run_python(code, env)  # warm the bytecode cache
+    output, elapsed = run_python(code, env)
+    assert expected in output
+    assert elapsed < STARTUP_BUDGET_SECONDS
+
+
+def test_subcommand_completion_is_lazy():
+    output, _ = run_python(
+        "import sys\n"
+        "try:\n"
+        f"    {RUN_CLI}\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print('loaded:', *(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+        complete("dbu inspect table schema "),
+    )
+    assert output.splitlines()[-1] == "loaded:"
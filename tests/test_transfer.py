@@ -0,0 +1,95 @@
+import datetime
+import decimal
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from db_utils.enums import IfTableExists
+from db_utils.transfer.main import copy_table, iter_in_thread
+from db_utils.transfer.writers import copy_text_value
+
+
+def test_copy_text_value():
+    assert copy_text_value(None) == "\\N"
+    assert copy_text_value(True) == "t"
+    assert copy_text_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+    assert copy_text_value(b"\x00\xff") == "\\\\x00ff"
+    assert copy_text_value(datetime.date(2023, 1, 2)) == "2023-01-02"
+    assert copy_text_value(decimal.Decimal("1.50")) == "1.50"
+    assert copy_text_value({"a": 1}) == '{"a": 1}'
+    assert copy_text_value([1, "a"]) == '[1, "a"]'
+
+
+def test_copy_text_value_arrays():
+    assert copy_text_value([1, None, 2], array=True) == '{"1",NULL,"2"}'
+    assert copy_text_value([[1, 2], [3, 4]], array=True) == '{{"1","2"},{"3","4"}}'
+    # quotes and backslashes escaped for the array, then for the text format
+    assert copy_text_value(['a"b', "c\\d", "e,f"], array=True) == (
+        '{"a\\\\"b","c\\\\\\\\d","e,f"}'
+    )
+    assert copy_text_value([True, datetime.date(2023, 1, 2)], array=True) == (
+        '{"t","2023-01-02"}'
+    )
+
+
+def test_iter_in_thread():
+    assert list(iter_in_thread(range(10), queue_size=2)) == list(range(10))
+
+    def failing():
+        yield 1
+        raise RuntimeError("read failed")
+
+    with pytest.raises(RuntimeError, match="read failed"):
+        list(iter_in_thread(failing(), queue_size=2))
+
+    # the producer stops when the consumer does
+    items = iter_in_thread(iter(range(1000)), queue_size=1)
+    assert next(items) == 0
+    items.close()
+
+
+def test_copy_table(tmp_path):
+    source_engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    target_engine = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    with source_engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, "
+                "amount NUMERIC(10, 2), created DATETIME)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO items VALUES (:id, :name, :amount, :created)"),
+            [
+                {
+                    "id": i,
+                    "name": None if i % 10 == 0 else f"n{i}",
+                    "amount": i / 4,
+                    "created": "2023-01-02 03:04:05.000000",
+                }
+                for i in range(1, 1001)
+            ],
+        )
+
+    result = copy_table(
+        source_engine, target_engine, "items", batch_size=64, commit_rows=200
+    )
+    assert result.rows == 1000
+    assert inspect(target_engine).get_pk_constraint("items")["constrained_columns"] == [
+        "id"
+    ]
+    with target_engine.connect() as connection:
+        rows = connection.execute(text("SELECT * FROM items ORDER BY id")).all()
+    assert len(rows) == 1000
+    assert tuple(rows[9]) == (10, None, 2.5, "2023-01-02 03:04:05.000000")
+
+    with pytest.raises(ValueError, match="already exists"):
+        copy_table(source_engine, target_engine, "items")
+    result = copy_table(
+        source_engine,
+        target_engine,
+        "items",
+        target_table_name="items_copy",
+        if_exists=IfTableExists.replace,
+    )
+    assert result.rows == 1000